@@ -0,0 +1,105 @@
+import random, sys, time
+import core
+
+MSG_HELP = """\
+DESCRIPTION:
+    This script compares salary parsers from `core.ENGINES`.
+    Every engine must produce identical result for each of the random values. Mismatches are
+    reported and make the script fail. Parse time is measured for each engine.
+
+USAGE:
+    python bench.py [ OPTIONS ]
+
+FLAGS:
+      --count=<int>: Number of random values. 2000000 by default.
+         -h, --help: Show this message.
+       --seed=<int>: Seed for the random generator. 0 by default."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
+def random_value(rnd: random.Random) -> str:
+    """Generate random salary string.
+
+    Most of the values are valid. The rest are corner cases and broken
+    values which must be rejected by every engine.
+
+    Args:
+        rnd (Random): Random generator.
+
+    Returns:
+        str: Salary value.
+    """
+    whole = str(rnd.randrange(10 ** rnd.randint(1, 12)))
+    if rnd.random() < 0.2:
+        whole = whole.rjust(rnd.randint(1, 15), "0")
+    fraction = "".join(rnd.choices("0123456789", k=rnd.randint(0, 6)))
+    value = whole + "." + fraction if fraction else whole
+    if rnd.random() < 0.05:
+        # Break value in some way
+        pos = rnd.randint(0, len(value))
+        value = value[:pos] + rnd.choice(("", ".", "-", "+", "e", " ", "x", "١")) + value[pos:]
+    return value
+
+def parse(engine, value: str) -> int | None:
+    """Parse value with the specified engine.
+
+    Args:
+        engine (callable): Cents parser.
+        value (str): Salary value.
+
+    Returns:
+        int or None: Cents or None if value was rejected.
+    """
+    try:
+        return engine(value)
+    except ValueError:
+        return None
+
+def main():
+    count = 2_000_000
+    seed = 0
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        if arg.startswith("--count=") or arg.startswith("--seed="):
+            key, value = arg[2:].split("=", 1)
+            if not value.isascii() or not value.isdigit():
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            if key == "count":
+                count = int(value)
+            else:
+                seed = int(value)
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    rnd = random.Random(seed)
+    values = [random_value(rnd) for _ in range(count)]
+
+    results = {}
+    for name, engine in core.ENGINES.items():
+        started = time.perf_counter()
+        results[name] = [parse(engine, value) for value in values]
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {elapsed:.3f}s, {count / elapsed:,.0f} values/s")
+
+    mismatches = 0
+    reference = results["decimal"]
+    for i, value in enumerate(values):
+        for name, result in results.items():
+            if result[i] != reference[i]:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"MISMATCH: `{value}`: {name}={result[i]}, decimal={reference[i]}")
+    if mismatches:
+        print(f"ERROR: {mismatches} mismatches found.")
+        return -1
+    print(f"All engines agree on {count} values.")
+    return
+
+if __name__ == "__main__":
+    sys.exit(main())
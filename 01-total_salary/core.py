@@ -1,51 +1,158 @@
-import decimal, re
+import concurrent.futures, contextlib, decimal, hashlib, json, os, pathlib, re, sys, typing
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import reader, stages
+import sketch
 
 LINE_MAX_SIZE = 100
 CURRENCY_SIZE = 100
+# Upper bound for the byte range handled by a single worker task
+CHUNK_SIZE = 32 * 1024 * 1024
+CHECKPOINT_SUFFIX = ".ckpt"
+CHECKPOINT_VERSION = 3
+# Size of the reads which hash the scanned part of the file
+CHECKPOINT_READ_SIZE = 1024 * 1024
 
-def total_salary(path: str) -> tuple[float, float]:
-    """Calculate total and average salary.
+number_re = re.compile(r"^\d+(\.\d+)?$")
+
+def parse_cents(value: str) -> int:
+    """Convert positive decimal number string into integer cents.
+
+    Uses only string and int operations. Value is rounded half-up when it has
+    more than 2 decimal places.
 
     Args:
-        path (str): Path to the source data.
+        value (str): Number in the `\\d+(\\.\\d+)?` format.
 
     Returns:
-        tuple[Decimal, Decimal]: Total & average salaries rounded to 2dp.
+        int: Value in cents.
+
+    Raises:
+        ValueError: If value has invalid format.
+    """
+    whole, dot, fraction = value.partition(".")
+    # `isdecimal()` matches the same characters as `\d` does
+    if not whole.isdecimal() or dot and not fraction.isdecimal():
+        raise ValueError(f"Invalid number `{value}`.")
+    if len(fraction) <= 2:
+        return int(whole + fraction.ljust(2, "0"))
+    # Round half-up by the first dropped digit
+    return int(whole + fraction[:2]) + (int(fraction[2]) >= 5)
+
+def parse_cents_decimal(value: str) -> int:
+    """Convert positive decimal number string into integer cents with Decimal.
+
+    Reference implementation for `parse_cents()`.
+
+    Args:
+        value (str): Number in the `\\d+(\\.\\d+)?` format.
+
+    Returns:
+        int: Value in cents.
+
+    Raises:
+        ValueError: If value has invalid format.
+    """
+    if not re.match(number_re, value):
+        raise ValueError(f"Invalid number `{value}`.")
+    # Use Decimal and operate with cents for currency ops
+    cents = decimal.Decimal(value) * CURRENCY_SIZE
+    # Convert cents back to int for faster ops
+    return int(cents.to_integral_value(rounding=decimal.ROUND_HALF_UP))
+
+ENGINES = {"fast": parse_cents, "decimal": parse_cents_decimal}
+
+def _parse_row(line: bytes, row: int, engine: str = "fast") -> int:
+    """Validate single record and return its salary in cents.
+
+    Args:
+        line (bytes): Raw line read from the source data.
+        row (int): Row number used in error messages.
+        engine (str): Name of the cents parser from `ENGINES`.
+
+    Returns:
+        int: Salary value in cents.
 
     Raises:
-        OSError: If file can't be read.
-        UnicodeDecodeError: If file has wrong UTF-8 encoding.
         ValueError: If record has invalid format.
     """
+    # Check if row fits line length limit
+    if len(line) > LINE_MAX_SIZE:
+        raise ValueError(f"Row #{row} is longer than {LINE_MAX_SIZE} bytes.")
+    name, separator, salary = line.strip().partition(b",")
+    # Check if row has proper amount of columns
+    if not separator:
+        raise ValueError(f"Row #{row} has wrong number of columns.")
+    # Check if employee name is present
+    if not name:
+        raise ValueError(f"Row #{row}: name can't be empty.")
+    # Check if salary is valid positive number
+    try:
+        return ENGINES[engine](salary.decode("utf-8"))
+    except ValueError:
+        raise ValueError(f"Row #{row}: salary value must be a valid positive number.") from None
+
+def _sum_blocks(blocks, engine: str = "fast") -> tuple[int, int, bytes | None]:
+    """Sum salaries of the records from the blocks of lines.
+
+    Stops on the first invalid record and returns it instead of raising, so
+    the caller can report it with a proper global row number.
+
+    Args:
+        blocks (Iterable[list[bytes]]): Blocks of raw lines.
+        engine (str): Name of the cents parser from `ENGINES`.
+
+    Returns:
+        tuple[int, int, bytes | None]: Total cents, number of processed rows
+            and the invalid line (if any). Invalid line is counted in rows.
+
+    Raises:
+        OSError: If source can't be read.
+        UnicodeDecodeError: If source has wrong UTF-8 encoding.
+    """
     records_count = 0
     total_cents = 0
-    number_re = re.compile(r"^\d+(\.\d+)?$")
-    try:
-        with open(path, mode="r", encoding="utf-8", errors="strict") as fh:
-            # Safe line-by-line read with line length limit
-            for line in iter(lambda: fh.readline(LINE_MAX_SIZE), ""):
-                records_count += 1
-                line = line.strip().split(",", 1)
-                # Check if row has proper amount of columns
-                if len(line) != 2:
-                    raise ValueError(f"Row #{records_count} has wrong number of columns.")
-                # Check if employee name is present
-                if not line[0]:
-                    raise ValueError(f"Row #{records_count}: name can't be empty.")
-                # Check if salary is valid positive number
-                if not re.match(number_re, line[1]):
-                    raise ValueError(f"Row #{records_count}: salary value must be a valid positive \
-number.")
-                # Use Decimal and operate with cents for currency ops
-                cents = decimal.Decimal(line[1]) * CURRENCY_SIZE
-                # Convert cents back to int for faster ops
-                cents = int(cents.to_integral_value(rounding=decimal.ROUND_HALF_UP))
-                total_cents += cents
-    except OSError as e:
-        raise OSError(f"File `{path}` can't be read.") from e
-    except UnicodeDecodeError as e:
-        raise UnicodeDecodeError(f"File `{path}` has wrong UTF-8 encoding.") from e
+    for lines in stages.iter_stage("read", blocks, "parse"):
+        for line in lines:
+            records_count += 1
+            try:
+                total_cents += _parse_row(line, records_count, engine)
+            except ValueError:
+                return total_cents, records_count, line
+    return total_cents, records_count, None
+
+def _sum_range(path: str, start: int, end: int, engine: str = "fast") \
+        -> tuple[int, int, bytes | None]:
+    """Sum salaries of the records located in the byte range of the file.
+
+    Used as a worker task by the parallel mode. Range must be aligned to the
+    line boundaries.
+
+    Args:
+        path (str): Path to the source data.
+        start (int): Offset of the first byte.
+        end (int): Offset right after the last byte.
+        engine (str): Name of the cents parser from `ENGINES`.
 
+    Returns:
+        tuple[int, int, bytes | None]: Same as `_sum_blocks()`.
+
+    Raises:
+        OSError: If file can't be read.
+        UnicodeDecodeError: If file has wrong UTF-8 encoding.
+    """
+    return _sum_blocks(reader.iter_blocks(path, LINE_MAX_SIZE, start, end), engine)
+
+def _to_salaries(total_cents: int, records_count: int) -> tuple[float, float]:
+    """Convert total cents into total & average salaries.
+
+    Args:
+        total_cents (int): Sum of all salaries in cents.
+        records_count (int): Number of records.
+
+    Returns:
+        tuple[Decimal, Decimal]: Total & average salaries rounded to 2dp.
+    """
     # Return (0, 0) if file is empty
     if not records_count:
         return decimal.Decimal(0), decimal.Decimal(0)
@@ -54,3 +161,504 @@ number.")
     # Make sure that average salary cents are properly rounded
     average_cents = average_cents.to_integral_value(rounding=decimal.ROUND_HALF_UP)
     return decimal.Decimal(total_cents) / CURRENCY_SIZE, average_cents / CURRENCY_SIZE
+
+@contextlib.contextmanager
+def _source_errors(source: str | typing.BinaryIO):
+    """Add source name to the read errors.
+
+    Args:
+        source (str or BinaryIO): Path to the source data or binary stream.
+
+    Raises:
+        OSError: If source can't be read.
+        UnicodeDecodeError: If source has wrong UTF-8 encoding.
+    """
+    name = source if isinstance(source, str) else getattr(source, "name", "<stream>")
+    try:
+        yield
+    except OSError as e:
+        raise OSError(f"File `{name}` can't be read.") from e
+    except UnicodeDecodeError as e:
+        raise UnicodeDecodeError(
+            e.encoding, e.object, e.start, e.end, f"File `{name}` has wrong UTF-8 encoding.") from e
+
+def _sum_file(path: str, start: int = 0, end: int | None = None, workers: int | None = None,
+        engine: str = "fast", row_offset: int = 0) -> tuple[int, int]:
+    """Sum salaries of the records located in the byte range of the plain file.
+
+    Args:
+        path (str): Path to the source data.
+        start (int): Offset of the first byte. Must point to the line start.
+        end (int or None): Offset right after the last byte.
+        workers (int or None): Number of worker processes. See
+            `total_salary()`.
+        engine (str): Name of the cents parser from `ENGINES`.
+        row_offset (int): Number of rows before the range. Used in error
+            messages.
+
+    Returns:
+        tuple[int, int]: Total cents and number of rows.
+
+    Raises:
+        OSError: If file can't be read.
+        UnicodeDecodeError: If file has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    records_count = 0
+    total_cents = 0
+    executor = None
+    try:
+        if workers is None or workers == 1:
+            results = [_sum_range(path, start, end, engine)]
+        else:
+            ranges = reader.split_ranges(path, workers, CHUNK_SIZE, start, end)
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            starts, ends = zip(*ranges)
+            results = executor.map(
+                _sum_range, [path] * len(ranges), starts, ends, [engine] * len(ranges))
+        # Merge partial results in file order. Errors of the later ranges are
+        # raised only after all previous ranges are merged.
+        for cents, rows, bad_line in results:
+            if bad_line is not None:
+                # Re-validate failed line to get error with global row number
+                _parse_row(bad_line, row_offset + records_count + rows, engine)
+            records_count += rows
+            total_cents += cents
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    return total_cents, records_count
+
+def _hash_range(path: str, digest, start: int, end: int):
+    """Feed the byte range of the file to the hash object.
+
+    Args:
+        path (str): Path to the source data.
+        digest (hashlib._Hash): Hash object.
+        start (int): Offset of the first byte.
+        end (int): Offset right after the last byte.
+
+    Raises:
+        OSError: If file can't be read or it's shorter than the range.
+    """
+    with open(path, mode="rb") as fh:
+        fh.seek(start)
+        while start < end:
+            chunk = fh.read(min(CHECKPOINT_READ_SIZE, end - start))
+            if not chunk:
+                raise OSError(f"File `{path}` is shorter than {end} bytes.")
+            digest.update(chunk)
+            start += len(chunk)
+
+def _load_checkpoint(path: str) -> tuple[int, int, int, typing.Any]:
+    """Load checkpoint of the previous scan if it's still valid for the file.
+
+    Checkpoint is valid if file is the same (same inode and device) and the
+    whole scanned prefix wasn't changed. Prefix is hashed rather than parsed
+    again, which is much faster.
+
+    Args:
+        path (str): Path to the source data.
+
+    Returns:
+        tuple[int, int, int, hashlib._Hash]: Offset, number of rows and total
+            cents of the scanned part and the hash object of the prefix.
+            Zeros and the empty hash if there is no valid checkpoint.
+
+    Raises:
+        OSError: If file can't be read.
+    """
+    try:
+        with open(path + CHECKPOINT_SUFFIX, mode="r", encoding="utf-8") as fh:
+            checkpoint = json.load(fh)
+        stat = os.stat(path)
+        if checkpoint["version"] == CHECKPOINT_VERSION \
+                and checkpoint["device"] == stat.st_dev and checkpoint["inode"] == stat.st_ino \
+                and checkpoint["offset"] <= stat.st_size:
+            digest = hashlib.sha256()
+            _hash_range(path, digest, 0, checkpoint["offset"])
+            if checkpoint["hash"] == digest.hexdigest():
+                return checkpoint["offset"], checkpoint["rows"], checkpoint["total_cents"], digest
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing, broken or outdated checkpoint means full scan
+        pass
+    return 0, 0, 0, hashlib.sha256()
+
+def _save_checkpoint(path: str, offset: int, rows: int, total_cents: int, prefix_hash: str):
+    """Save checkpoint of the scanned part of the file.
+
+    Checkpoint is written to the sidecar file next to the source data.
+
+    Args:
+        path (str): Path to the source data.
+        offset (int): Offset right after the last scanned line.
+        rows (int): Number of scanned rows.
+        total_cents (int): Total cents of the scanned rows.
+        prefix_hash (str): Hex digest of the scanned part of the file.
+
+    Raises:
+        OSError: If checkpoint can't be written.
+    """
+    checkpoint_path = path + CHECKPOINT_SUFFIX
+    try:
+        stat = os.stat(path)
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "device": stat.st_dev,
+            "inode": stat.st_ino,
+            "offset": offset,
+            "rows": rows,
+            "total_cents": total_cents,
+            "hash": prefix_hash,
+        }
+        # Replace checkpoint atomically, so it's never left half-written
+        with open(checkpoint_path + ".tmp", mode="w", encoding="utf-8") as fh:
+            json.dump(checkpoint, fh)
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)
+    except OSError as e:
+        raise OSError(f"Checkpoint `{checkpoint_path}` can't be written.") from e
+
+def _sum_file_cached(path: str, workers: int | None = None, engine: str = "fast") \
+        -> tuple[int, int, tuple[int, int, int, str] | None]:
+    """Sum salaries of the plain file scanning only data added since the last run.
+
+    Args:
+        path (str): Path to the source data.
+        workers (int or None): Number of worker processes. See
+            `total_salary()`.
+        engine (str): Name of the cents parser from `ENGINES`.
+
+    Returns:
+        tuple[int, int, tuple[int, int, int, str] | None]: Total cents,
+            number of rows and the new checkpoint (offset, rows, total cents,
+            prefix hash) if there are new complete lines.
+
+    Raises:
+        OSError: If file can't be read.
+        UnicodeDecodeError: If file has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    offset, records_count, total_cents, digest = _load_checkpoint(path)
+    checkpoint = None
+    # Unfinished last line can be continued later, so it's never checkpointed
+    lines_end, size = reader.find_lines_end(path, offset)
+    if lines_end > offset:
+        cents, rows = _sum_file(path, offset, lines_end, workers, engine, records_count)
+        total_cents += cents
+        records_count += rows
+        # Hash of the prefix is continued over the new lines, which are
+        # still in the page cache
+        _hash_range(path, digest, offset, lines_end)
+        checkpoint = lines_end, records_count, total_cents, digest.hexdigest()
+    if size > lines_end:
+        cents, rows = _sum_file(path, lines_end, size, None, engine, records_count)
+        total_cents += cents
+        records_count += rows
+    return total_cents, records_count, checkpoint
+
+def total_salary(source: str | typing.BinaryIO, workers: int | None = None,
+        engine: str = "fast", cache: bool = False) -> tuple[float, float]:
+    """Calculate total and average salary.
+
+    Args:
+        source (str or BinaryIO): Path to the source data or binary stream
+            (e.g. `sys.stdin.buffer`). Gzip and Zstandard compressed data is
+            decompressed on the fly.
+        workers (int or None): Number of worker processes. File is split into
+            line-aligned byte ranges which are summed in parallel. `0` means
+            number of CPUs. `None` or `1` performs serial scan. Streams and
+            compressed files are always scanned serially.
+        engine (str): Salary parser. `fast` converts strings to cents
+            directly, `decimal` is the reference implementation based on
+            Decimal. Both produce identical results.
+        cache (bool): Store scan checkpoint in the sidecar file and scan only
+            data appended since the previous run. If file was truncated or
+            rewritten, then full scan is performed. Ignored for streams and
+            compressed files.
+
+    Returns:
+        tuple[Decimal, Decimal]: Total & average salaries rounded to 2dp.
+
+    Raises:
+        OSError: If source can't be read or checkpoint can't be written.
+        UnicodeDecodeError: If source has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine `{engine}`.")
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    checkpoint = None
+    with _source_errors(source):
+        if not isinstance(source, str) or reader.is_compressed(source):
+            total_cents, records_count, bad_line = _sum_blocks(
+                reader.read_blocks(source, LINE_MAX_SIZE), engine)
+            if bad_line is not None:
+                _parse_row(bad_line, records_count, engine)
+        elif cache:
+            total_cents, records_count, checkpoint = _sum_file_cached(source, workers, engine)
+        else:
+            total_cents, records_count = _sum_file(source, 0, None, workers, engine)
+    if checkpoint:
+        _save_checkpoint(source, *checkpoint)
+
+    return _to_salaries(total_cents, records_count)
+
+def iter_total_salary(source: str | typing.BinaryIO, every: int, engine: str = "fast"):
+    """Calculate running total and average salary.
+
+    Source is processed as a stream, so memory usage doesn't depend on its
+    size. Intermediate results are yielded as soon as rows are read.
+
+    Args:
+        source (str or BinaryIO): Same as for `total_salary()`.
+        every (int): Number of rows between intermediate results.
+        engine (str): Same as for `total_salary()`.
+
+    Yields:
+        tuple[int, Decimal, Decimal]: Number of processed rows and total &
+            average salaries. Final result is always yielded last.
+
+    Raises:
+        OSError: If source can't be read.
+        UnicodeDecodeError: If source has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine `{engine}`.")
+    if every < 1:
+        raise ValueError("Number of rows between results must be positive.")
+    records_count = 0
+    total_cents = 0
+    with _source_errors(source):
+        blocks = reader.read_blocks(source, LINE_MAX_SIZE)
+        for lines in stages.iter_stage("read", blocks, "parse"):
+            for line in lines:
+                records_count += 1
+                total_cents += _parse_row(line, records_count, engine)
+                if not records_count % every:
+                    yield records_count, *_to_salaries(total_cents, records_count)
+    if records_count % every or not records_count:
+        yield records_count, *_to_salaries(total_cents, records_count)
+
+class GroupStats:
+    """Salary statistics of the single group of records in cents."""
+
+    __slots__ = ("count", "total_cents", "min_cents", "max_cents", "sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.total_cents = 0
+        self.min_cents = None
+        self.max_cents = None
+        self.sketch = sketch.QuantileSketch()
+
+    def add(self, cents: int):
+        """Add salary to the group.
+
+        Args:
+            cents (int): Salary value in cents.
+        """
+        self.count += 1
+        self.total_cents += cents
+        if self.min_cents is None or cents < self.min_cents:
+            self.min_cents = cents
+        if self.max_cents is None or cents > self.max_cents:
+            self.max_cents = cents
+        self.sketch.add(cents)
+
+    def merge(self, other: "GroupStats"):
+        """Add statistics of the other part of the same group.
+
+        Args:
+            other (GroupStats): Statistics to merge.
+        """
+        if not other.count:
+            return
+        self.count += other.count
+        self.total_cents += other.total_cents
+        if self.min_cents is None or other.min_cents < self.min_cents:
+            self.min_cents = other.min_cents
+        if self.max_cents is None or other.max_cents > self.max_cents:
+            self.max_cents = other.max_cents
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> dict:
+        """Convert statistics into salaries rounded to 2dp.
+
+        Returns:
+            dict: Count, total, average, min, max and approximate p50 & p95
+                salaries.
+        """
+        total, average = _to_salaries(self.total_cents, self.count)
+        result = {"count": self.count, "total": total, "average": average}
+        result["min"] = decimal.Decimal(self.min_cents or 0) / CURRENCY_SIZE
+        result["max"] = decimal.Decimal(self.max_cents or 0) / CURRENCY_SIZE
+        for name, q in (("p50", 0.5), ("p95", 0.95)):
+            estimate = self.sketch.quantile(q) or 0
+            # Estimate can't be outside of the known bounds
+            cents = min(max(round(estimate), self.min_cents or 0), self.max_cents or 0)
+            result[name] = decimal.Decimal(cents) / CURRENCY_SIZE
+        return result
+
+GROUP_COLUMNS = {"name": (2, 3), "department": (3,)}
+
+def _parse_group_row(line: bytes, row: int, by: str, engine: str = "fast") -> tuple[bytes, int]:
+    """Validate single record and return its group key and salary in cents.
+
+    Records have `name,salary` or `name,salary,department` format.
+
+    Args:
+        line (bytes): Raw line read from the source data.
+        row (int): Row number used in error messages.
+        by (str): Name of the column used as the group key.
+        engine (str): Name of the cents parser from `ENGINES`.
+
+    Returns:
+        tuple[bytes, int]: Raw group key and salary value in cents.
+
+    Raises:
+        ValueError: If record has invalid format.
+    """
+    # Check if row fits line length limit
+    if len(line) > LINE_MAX_SIZE:
+        raise ValueError(f"Row #{row} is longer than {LINE_MAX_SIZE} bytes.")
+    line = line.strip().split(b",", 2)
+    # Check if row has proper amount of columns
+    if len(line) not in GROUP_COLUMNS[by]:
+        raise ValueError(f"Row #{row} has wrong number of columns.")
+    # Check if employee name is present
+    if not line[0]:
+        raise ValueError(f"Row #{row}: name can't be empty.")
+    # Check if department is present
+    if by == "department" and not line[2]:
+        raise ValueError(f"Row #{row}: department can't be empty.")
+    # Check if salary is valid positive number
+    try:
+        cents = ENGINES[engine](line[1].decode("utf-8"))
+    except ValueError:
+        raise ValueError(f"Row #{row}: salary value must be a valid positive number.") from None
+    return line[0] if by == "name" else line[2], cents
+
+def _group_blocks(blocks, by: str, engine: str = "fast") \
+        -> tuple[dict[bytes, GroupStats], int, bytes | None]:
+    """Collect group statistics of the records from the blocks of lines.
+
+    Stops on the first invalid record and returns it instead of raising, so
+    the caller can report it with a proper global row number.
+
+    Args:
+        blocks (Iterable[list[bytes]]): Blocks of raw lines.
+        by (str): Name of the column used as the group key.
+        engine (str): Name of the cents parser from `ENGINES`.
+
+    Returns:
+        tuple[dict[bytes, GroupStats], int, bytes | None]: Statistics by raw
+            group keys, number of processed rows and the invalid line (if
+            any). Invalid line is counted in rows.
+
+    Raises:
+        OSError: If source can't be read.
+        UnicodeDecodeError: If source has wrong UTF-8 encoding.
+    """
+    records_count = 0
+    groups = {}
+    for lines in stages.iter_stage("read", blocks, "aggregate"):
+        for line in lines:
+            records_count += 1
+            try:
+                key, cents = _parse_group_row(line, records_count, by, engine)
+            except ValueError:
+                return groups, records_count, line
+            stats = groups.get(key)
+            if stats is None:
+                stats = groups[key] = GroupStats()
+            stats.add(cents)
+    return groups, records_count, None
+
+def _group_range(path: str, start: int, end: int, by: str, engine: str = "fast") \
+        -> tuple[dict[bytes, GroupStats], int, bytes | None]:
+    """Collect group statistics of the records located in the byte range.
+
+    Used as a worker task by the parallel mode. Range must be aligned to the
+    line boundaries.
+
+    Args:
+        path (str): Path to the source data.
+        start (int): Offset of the first byte.
+        end (int): Offset right after the last byte.
+        by (str): Name of the column used as the group key.
+        engine (str): Name of the cents parser from `ENGINES`.
+
+    Returns:
+        tuple[dict[bytes, GroupStats], int, bytes | None]: Same as
+            `_group_blocks()`.
+
+    Raises:
+        OSError: If file can't be read.
+        UnicodeDecodeError: If file has wrong UTF-8 encoding.
+    """
+    return _group_blocks(reader.iter_blocks(path, LINE_MAX_SIZE, start, end), by, engine)
+
+def group_salary(source: str | typing.BinaryIO, by: str = "name", workers: int | None = None,
+        engine: str = "fast") -> dict[str, dict]:
+    """Calculate salary statistics grouped by the name or department column.
+
+    Records have `name,salary` or `name,salary,department` format. Source is
+    scanned in a single pass. Memory usage depends only on the number of
+    groups since quantiles are estimated with a fixed-size sketch.
+
+    Args:
+        source (str or BinaryIO): Same as for `total_salary()`.
+        by (str): Group key column: `name` or `department`.
+        workers (int or None): Same as for `total_salary()`. Partial group
+            statistics of the ranges are merged.
+        engine (str): Same as for `total_salary()`.
+
+    Returns:
+        dict[str, dict]: Statistics of the groups sorted by key. See
+            `GroupStats.summary()`.
+
+    Raises:
+        OSError: If source can't be read.
+        UnicodeDecodeError: If source has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine `{engine}`.")
+    if by not in GROUP_COLUMNS:
+        raise ValueError(f"Unknown group column `{by}`.")
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    records_count = 0
+    groups = {}
+    executor = None
+    with _source_errors(source):
+        try:
+            if workers is None or workers == 1 or not isinstance(source, str) \
+                    or reader.is_compressed(source):
+                results = [_group_blocks(reader.read_blocks(source, LINE_MAX_SIZE), by, engine)]
+            else:
+                ranges = reader.split_ranges(source, workers, CHUNK_SIZE)
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+                starts, ends = zip(*ranges)
+                results = executor.map(_group_range, [source] * len(ranges), starts, ends,
+                    [by] * len(ranges), [engine] * len(ranges))
+            # Merge partial results in file order
+            for partial_groups, rows, bad_line in results:
+                if bad_line is not None:
+                    # Re-validate failed line to get error with global row number
+                    _parse_group_row(bad_line, records_count + rows, by, engine)
+                records_count += rows
+                for key, stats in partial_groups.items():
+                    if key in groups:
+                        groups[key].merge(stats)
+                    else:
+                        groups[key] = stats
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+    # Keys are validated as UTF-8 by the reader
+    with stages.stage("aggregate"):
+        return {key.decode("utf-8"): groups[key].summary() for key in sorted(groups)}
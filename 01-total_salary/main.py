@@ -1,4 +1,7 @@
 import pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import profiling
 import core
 
 MSG_HELP = """\
@@ -6,12 +9,30 @@ DESCRIPTION:
     This script calculates total and average salary for the values from the provided file.
     If file argument isn't provided, then `test.csv` file which is shipped together with this \
 repository is used.
+    Use `-` as the file path to read data from the standard input.
+    Gzip and Zstandard compressed data is decompressed on the fly. Zstandard requires Python 3.14+
+    or `zstandard` package.
 
 USAGE:
-    python main.py [ <file_path> | -h | --help ]
+    python main.py [ OPTIONS ] [ <file_path> | - ]
 
 FLAGS:
-    -h, --help: Show this message."""
+                         --cache: Store scan checkpoint in the `<file_path>.ckpt` file and
+                                  process only rows appended since the previous run. It can't
+                                  be used with the standard input, --group-by and --progress
+                                  flags.
+         --engine=<fast|decimal>: Salary parser. `decimal` is the slower reference implementation.
+                                  `fast` is used by default.
+    --group-by=<name|department>: Print salary statistics for each group of records. Records
+                                  must have `name,salary,department` format to be grouped by
+                                  department.
+                      -h, --help: Show this message.
+                       --profile: Print cProfile, tracemalloc and stage timing summaries to the
+                                  standard error on exit.
+                --progress=<int>: Print running total and average salary every N rows. It can't
+                                  be used with --group-by and --workers flags.
+                 --workers=<int>: Number of processes for parallel calculation. `0` means number
+                                  of CPUs. Serial calculation is used by default."""
 
 MSG_FALLBACK_WARNING = """\
 WARNING: Result values are based on the `test.csv` file which is shipped together with this \
@@ -19,23 +40,91 @@ repository.
 
 To perform real calculations pass file path as the argument."""
 
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_MIX = "ERROR: {} and {} flags can't be used together."
+MSG_BAD_CACHE_SOURCE = "ERROR: --cache flag can't be used with the standard input."
+
 def main():
     path = ""
+    workers = None
+    engine = "fast"
+    progress = None
+    group_by = None
+    cache = False
     # If argument was passed to the script
-    if len(sys.argv) == 2:
-        if sys.argv[1] in ("-h", "--help"):
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
             print(MSG_HELP)
             return
-        path = sys.argv[1]
+
+        if arg == "--cache":
+            cache = True
+        elif arg.startswith("--engine="):
+            _, engine = arg.split("=", 1)
+            if engine not in core.ENGINES:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--group-by="):
+            _, group_by = arg.split("=", 1)
+            if group_by not in core.GROUP_COLUMNS:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--progress="):
+            _, progress = arg.split("=", 1)
+            if not progress.isascii() or not progress.isdigit() or not int(progress):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            progress = int(progress)
+        elif arg.startswith("--workers="):
+            _, workers = arg.split("=", 1)
+            if not workers.isascii() or not workers.isdigit():
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            workers = int(workers)
+        elif arg == "-" or not arg.startswith("-"):
+            path = arg
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    # Progress mode is serial and has no grouping
+    for flag, value in (("--group-by", group_by), ("--workers", workers)):
+        if progress and value is not None:
+            print(MSG_BAD_FLAG_MIX.format(flag, "--progress"))
+            return -1
+    # Checkpoint is kept only for the total of the whole file
+    for flag, value in (("--group-by", group_by), ("--progress", progress)):
+        if cache and value is not None:
+            print(MSG_BAD_FLAG_MIX.format("--cache", flag))
+            return -1
+    if cache and path == "-":
+        print(MSG_BAD_CACHE_SOURCE)
+        return -1
 
     # Fallback to `test.csv` if file path wasn't provided
     if not path:
         print(MSG_FALLBACK_WARNING + "\n")
         path = str(pathlib.PurePath(__file__).parent / "test.csv")
 
+    source = sys.stdin.buffer if path == "-" else path
+
     # Perform calculations
     try:
-        total_salary, average_salary = core.total_salary(path)
+        if group_by:
+            groups = core.group_salary(source, group_by, workers, engine)
+            for key, stats in groups.items():
+                print(f"{key}: count={stats['count']}, total={stats['total']}, \
+average={stats['average']}, min={stats['min']}, max={stats['max']}, p50~{stats['p50']}, \
+p95~{stats['p95']}")
+            return
+        if progress:
+            results = core.iter_total_salary(source, progress, engine)
+            for rows, total_salary, average_salary in results:
+                print(f"Rows: {rows}, total salary: {total_salary}, average salary: \
+{average_salary}")
+        else:
+            total_salary, average_salary = core.total_salary(source, workers, engine, cache)
     except (OSError, UnicodeDecodeError, ValueError) as e:
         print("ERROR:", e)
         return -1
@@ -43,4 +132,4 @@ def main():
     return
 
 if __name__ == "__main__":
-    main()
+    profiling.run(main)
@@ -0,0 +1,75 @@
+import math
+
+# Max relative error of the estimated quantile values
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+class QuantileSketch:
+    """Mergeable sketch for approximate quantiles of non-negative numbers.
+
+    Values are counted in logarithmic buckets, so every estimate is within
+    `RELATIVE_ACCURACY` of some value of the requested rank. Number of buckets
+    grows only with the logarithm of the values range (~1.7k buckets for
+    values up to 10^15). Merging two sketches gives exactly the same sketch as
+    adding all values to the single one, so partial sketches of parallel
+    chunks can be combined in any order.
+    """
+
+    __slots__ = ("count", "zeros", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.zeros = 0
+        self.buckets = {}
+
+    def add(self, value: int | float):
+        """Add value to the sketch.
+
+        Args:
+            value (int or float): Non-negative number.
+        """
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / LOG_GAMMA)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch"):
+        """Add all values of the other sketch to this one.
+
+        Args:
+            other (QuantileSketch): Sketch to merge.
+        """
+        self.count += other.count
+        self.zeros += other.zeros
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate quantile value.
+
+        Args:
+            q (float): Quantile in range [0, 1].
+
+        Returns:
+            float or None: Estimated value or None if sketch is empty.
+
+        Raises:
+            ValueError: If quantile is out of range.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be in range [0, 1].")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Middle of the bucket in terms of relative error
+                return 2 * GAMMA ** index / (GAMMA + 1)
+        return 2 * GAMMA ** max(self.buckets) / (GAMMA + 1)
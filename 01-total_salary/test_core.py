@@ -0,0 +1,48 @@
+import random, unittest
+import bench, core
+
+# Number of random values compared by the differential test
+CORPUS_SIZE = 200_000
+EDGE_VALUES = (
+    # Leading zeros
+    "0", "00", "007", "0.5", "000.005", "0001.10",
+    # Half-up ties and near-ties at the 3rd and further decimals
+    "0.005", "0.015", "0.004", "0.0049999", "0.00500", "1.125", "1.135", "2.675",
+    "99.994999", "99.995", "99.9950001", "12345678901234567890.12500000000000001",
+    # Empty fraction and other broken forms
+    "1.", ".5", ".", "", "1..2", "1.2.3", "-1", "+1", "1e3", " 1", "1 ", "1_000",
+    # Non-ASCII digits
+    "١٢٣", "١.٥", "१२.३४५", "٣.٠٠٥", "1.٥٥٥", "١x",
+)
+
+def parse(engine, value: str) -> int | None:
+    """Parse value with the engine. None means it was rejected."""
+    try:
+        return engine(value)
+    except ValueError:
+        return None
+
+class EnginesTest(unittest.TestCase):
+    """Fast cents parser must agree with the Decimal reference."""
+
+    def assert_engines_agree(self, values):
+        fast, reference = core.ENGINES["fast"], core.ENGINES["decimal"]
+        for value in values:
+            self.assertEqual(parse(fast, value), parse(reference, value), f"value `{value}`")
+
+    def test_edge_values(self):
+        self.assert_engines_agree(EDGE_VALUES)
+
+    def test_random_values(self):
+        rnd = random.Random(0)
+        self.assert_engines_agree(bench.random_value(rnd) for _ in range(CORPUS_SIZE))
+
+    def test_rounding(self):
+        fast = core.ENGINES["fast"]
+        self.assertEqual(fast("0.005"), 1)
+        self.assertEqual(fast("0.0049999"), 0)
+        self.assertEqual(fast("007.1"), 710)
+        self.assertEqual(fast("١.٥"), 150)
+
+if __name__ == "__main__":
+    unittest.main()
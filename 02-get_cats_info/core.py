@@ -1,14 +1,70 @@
+import os, pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import reader, stages
+import idindex, snapshot, table
+
 LINE_MAX_SIZE = 100
 CURRENCY_SIZE = 100
+DEDUPE_MODES = ("exact", "bloom")
+ERROR_POLICIES = ("raise", "skip", "quarantine")
+# Lower bound of the average row size used to estimate Bloom filter capacity
+ROW_SIZE_ESTIMATE = 32
+SNAPSHOT_SUFFIX = ".snap"
 
-def get_cats_info(path: str) -> list[dict]:
-    """Parse cat info records.
+def _duplicate_error(id: str) -> ValueError:
+    """Create error for the duplicate record ID."""
+    return ValueError(f"Record with id=`{id}` is aleady present. Source data must contain only \
+unique IDs.")
+
+def _parse_row(line: bytes, row: int) -> tuple[str, str, int]:
+    """Validate single record and convert it into a tuple of values.
 
     Args:
-        path (str): Path to the source data.
+        line (bytes): Raw line read from the source data.
+        row (int): Row number used in error messages.
 
     Returns:
-        list[dict]: List of cats.
+        tuple[str, str, int]: Cat ID, name and age.
+
+    Raises:
+        UnicodeDecodeError: If line has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    # Check if row fits line length limit
+    if len(line) > LINE_MAX_SIZE:
+        raise ValueError(f"Row #{row} is longer than {LINE_MAX_SIZE} bytes.")
+    line = line.decode("utf-8", errors="strict").strip().split(",", 2)
+    # Check if row has proper amount of columns
+    if len(line) != 3:
+        raise ValueError(f"Row #{row} has wrong number of columns.")
+    # Check if ID is present
+    if not line[0]:
+        raise ValueError(f"Row #{row}: ID can't be empty.")
+    # Check if name is present
+    if not line[1]:
+        raise ValueError(f"Row #{row}: name can't be empty.")
+    # Check if age is valid positive number
+    if not line[2].isascii() or not line[2].isdigit():
+        raise ValueError(f"Row #{row}: age value must be a valid positive number.")
+    # Check if age fits the table column
+    age = int(line[2])
+    if age > table.AGE_MAX:
+        raise ValueError(f"Row #{row}: age value can't be greater than {table.AGE_MAX}.")
+    return line[0], line[1], age
+
+def _iter_rows(path: str, on_error, check_unique: bool = True):
+    """Iterate over validated records of the file.
+
+    Args:
+        path (str): Path to the source data.
+        on_error (callable or None): Handler of the invalid records. It's
+            called with the raw line and the error, and can re-raise it.
+            Errors are raised if handler isn't specified.
+        check_unique (bool): Check if IDs are unique.
+
+    Yields:
+        tuple[str, str, int]: Cat ID, name and age.
 
     Raises:
         OSError: If file can't be read.
@@ -16,35 +72,213 @@ def get_cats_info(path: str) -> list[dict]:
         ValueError: If record has invalid format.
     """
     records_count = 0
-    cats = {}
+    ids = idindex.IdIndex() if check_unique else None
     try:
-        with open(path, mode="r", encoding="utf-8", errors="strict") as fh:
-            # Safe line-by-line read with line length limitation
-            for line in iter(lambda: fh.readline(LINE_MAX_SIZE), ""):
+        # Safe line-by-line read with line length limitation. Encoding is
+        # validated per row, so invalid rows can be skipped.
+        blocks = reader.iter_blocks(path, LINE_MAX_SIZE, validate=False)
+        for lines in stages.iter_stage("read", blocks, "parse"):
+            for line in lines:
                 records_count += 1
-                line = line.strip().split(",", 2)
-                # Check if row has proper amount of columns
-                if len(line) != 3:
-                    raise ValueError(f"Row #{records_count} has wrong number of columns.")
-                # Check if ID is present
-                if not line[0]:
-                    raise ValueError(f"Row #{records_count}: ID can't be empty.")
-                # Check if name is present
-                if not line[1]:
-                    raise ValueError(f"Row #{records_count}: name can't be empty.")
-                # Check if age is valid positive number
-                if not line[2].isascii() or not line[2].isdigit():
-                    raise ValueError(f"Row #{records_count}: age value must be a valid positive \
-number.")
-                # Check if record is unique
-                if line[0] in cats:
-                    raise ValueError(f"Record with id=`{line[0]}` is aleady present. Source data \
-must contain only unique IDs.")
-
-                cats[line[0]] = {"id": line[0], "name": line[1], "age": int(line[2])}
+                try:
+                    row = _parse_row(line, records_count)
+                    # Check if record is unique. It's timed as parsing, since
+                    # timing of every row would slow down the loop.
+                    if ids is not None and not ids.add(row[0]):
+                        raise _duplicate_error(row[0])
+                except UnicodeDecodeError:
+                    if not on_error:
+                        raise
+                    on_error(line, ValueError(f"Row #{records_count} has wrong UTF-8 encoding."))
+                    continue
+                except ValueError as e:
+                    if not on_error:
+                        raise
+                    on_error(line, e)
+                    continue
+                yield row
     except OSError as e:
         raise OSError(f"File `{path}` can't be read.") from e
     except UnicodeDecodeError as e:
-        raise UnicodeDecodeError(f"File `{path}` has wrong UTF-8 encoding.") from e
+        raise UnicodeDecodeError(
+            e.encoding, e.object, e.start, e.end, f"File `{path}` has wrong UTF-8 encoding.") from e
+
+def iter_cats(path: str, on_error="raise", errors: list | None = None,
+        quarantine: str | None = None, batch_size: int | None = None):
+    """Iterate over cat info records while reading the file.
 
-    return list(cats.values())
+    Records are yielded as soon as they are validated, so memory usage
+    doesn't depend on the file size (except for the compact index of IDs
+    used to check their uniqueness).
+
+    Args:
+        path (str): Path to the source data.
+        on_error (str or callable): Invalid records policy:
+            - `raise`: stop on the first invalid record with an error;
+            - `skip`: skip invalid records;
+            - `quarantine`: skip invalid records and write their raw lines
+              to the `quarantine` file;
+            - callable: custom handler which is called with the raw line
+              (bytes) and the error (ValueError). It can re-raise the error.
+        errors (list or None): List to collect errors of the skipped records.
+        quarantine (str or None): Path to the file for invalid records.
+            Required for `quarantine` policy. File is overwritten.
+        batch_size (int or None): Yield lists of up to N records instead of
+            single records.
+
+    Yields:
+        dict or list[dict]: Cat (or a batch of cats) with `id`, `name` and
+            `age` keys.
+
+    Raises:
+        OSError: If file can't be read or quarantine file can't be written.
+        UnicodeDecodeError: If file has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    if not callable(on_error) and on_error not in ERROR_POLICIES:
+        raise ValueError(f"Unknown error policy `{on_error}`.")
+    if on_error == "quarantine" and not quarantine:
+        raise ValueError("Quarantine file path is required for `quarantine` error policy.")
+    if batch_size is not None and batch_size < 1:
+        raise ValueError("Batch size must be positive.")
+
+    quarantine_fh = None
+    handler = on_error if callable(on_error) else None
+
+    def collect(line: bytes, error: ValueError):
+        if quarantine_fh:
+            quarantine_fh.write(line + b"\n")
+        if errors is not None:
+            errors.append(error)
+        if handler:
+            handler(line, error)
+
+    try:
+        if on_error == "quarantine":
+            try:
+                quarantine_fh = open(quarantine, mode="wb")
+            except OSError as e:
+                raise OSError(f"File `{quarantine}` can't be written.") from e
+        rows = _iter_rows(path, None if on_error == "raise" else collect)
+        if batch_size is None:
+            for id, name, age in rows:
+                yield {"id": id, "name": name, "age": age}
+            return
+        batch = []
+        for id, name, age in rows:
+            batch.append({"id": id, "name": name, "age": age})
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        if quarantine_fh:
+            quarantine_fh.close()
+
+def _confirm_duplicates(cats: table.CatTable, suspects: set):
+    """Check IDs reported by Bloom filter for real duplicates.
+
+    Args:
+        cats (CatTable): Parsed records.
+        suspects (set): Packed IDs which may be duplicates.
+
+    Raises:
+        ValueError: If table has duplicate IDs. The earliest repeated ID is
+            reported.
+    """
+    if not suspects:
+        return
+    seen = set()
+    for id in cats.iter_ids():
+        key = idindex.pack_id(id)
+        if key in suspects:
+            if key in seen:
+                raise _duplicate_error(id)
+            seen.add(key)
+
+def get_cats_info(path: str, dedupe: str = "exact") -> table.CatTable:
+    """Parse cat info records.
+
+    Args:
+        path (str): Path to the source data.
+        dedupe (str): Duplicate IDs detection mode. `exact` keeps all IDs in
+            the compact index. `bloom` keeps them in the fixed-size Bloom
+            filter and confirms possible duplicates with the second pass over
+            the parsed IDs. It uses several times less memory on large files.
+
+    Returns:
+        CatTable: List-like columnar table of cats. Rows are dict-like views
+            with `id`, `name` and `age` keys.
+
+    Raises:
+        OSError: If file can't be read.
+        UnicodeDecodeError: If file has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    if dedupe not in DEDUPE_MODES:
+        raise ValueError(f"Unknown dedupe mode `{dedupe}`.")
+    suspects = set()
+    cats = table.CatTable()
+    if dedupe == "exact":
+        for id, name, age in stages.iter_stage("parse", _iter_rows(path, None), "aggregate"):
+            cats.append(id, name, age)
+        return cats
+
+    try:
+        try:
+            ids = idindex.BloomFilter(os.path.getsize(path) // ROW_SIZE_ESTIMATE)
+        except OSError as e:
+            raise OSError(f"File `{path}` can't be read.") from e
+        rows = _iter_rows(path, None, check_unique=False)
+        for id, name, age in stages.iter_stage("parse", rows, "aggregate"):
+            if not ids.add(id):
+                suspects.add(idindex.pack_id(id))
+            cats.append(id, name, age)
+    finally:
+        # Duplicates precede the row which failed validation, so they are
+        # checked even if parsing has failed
+        with stages.stage("validate"):
+            _confirm_duplicates(cats, suspects)
+    return cats
+
+def load_cats_info(path: str, dedupe: str = "exact", snapshot_path: str | None = None) \
+        -> snapshot.CatSnapshot:
+    """Load cat info records from the binary snapshot, re-parsing the file if needed.
+
+    Source file is authoritative. Snapshot is used only if it matches the
+    file size and mtime (or content hash, if only mtime differs). Otherwise
+    file is parsed with `get_cats_info()` and snapshot is re-written.
+
+    Args:
+        path (str): Path to the source data.
+        dedupe (str): Duplicate IDs detection mode. See `get_cats_info()`.
+        snapshot_path (str or None): Path to the snapshot file. Sidecar file
+            next to the source data is used by default.
+
+    Returns:
+        CatSnapshot: Memory-mapped table of cats with lookup by ID. It should
+            be closed after use.
+
+    Raises:
+        OSError: If file can't be read or snapshot can't be written.
+        UnicodeDecodeError: If file has wrong UTF-8 encoding.
+        ValueError: If record has invalid format.
+    """
+    if dedupe not in DEDUPE_MODES:
+        raise ValueError(f"Unknown dedupe mode `{dedupe}`.")
+    snapshot_path = snapshot_path or path + SNAPSHOT_SUFFIX
+    cats = snapshot.load_snapshot(snapshot_path, path)
+    if cats is not None:
+        return cats
+    # Metadata is collected before parsing, so changes made in the meantime
+    # invalidate the new snapshot
+    try:
+        info = snapshot.source_info(path)
+    except OSError as e:
+        raise OSError(f"File `{path}` can't be read.") from e
+    snapshot.export_snapshot(get_cats_info(path, dedupe), snapshot_path, info)
+    try:
+        return snapshot.CatSnapshot(snapshot_path)
+    except ValueError as e:
+        raise OSError(f"Snapshot `{snapshot_path}` can't be read.") from e
@@ -0,0 +1,123 @@
+import math
+
+OBJECT_ID_SIZE = 24
+HEX_DIGITS = frozenset("0123456789abcdef")
+
+def pack_id(id: str) -> int | str:
+    """Convert ID into the compact key.
+
+    Lowercase hex ObjectIds (24 chars) are packed into 96-bit integers, which
+    take roughly half of the string size. Other IDs are kept as is. Integer
+    and string keys never collide, so the conversion is unambiguous.
+
+    Args:
+        id (str): Record ID.
+
+    Returns:
+        int or str: Packed key.
+    """
+    if len(id) == OBJECT_ID_SIZE and HEX_DIGITS.issuperset(id):
+        return int(id, 16)
+    return id
+
+def _key_bytes(key: int | str) -> bytes:
+    """Serialize packed key for hashing.
+
+    Args:
+        key (int or str): Packed key.
+
+    Returns:
+        bytes: 12 raw bytes for ObjectIds or UTF-8 encoded ID with prefix.
+    """
+    if isinstance(key, int):
+        return key.to_bytes(OBJECT_ID_SIZE // 2, "big")
+    # Prefix keeps string keys apart from the raw ObjectId bytes
+    return b"s" + key.encode("utf-8")
+
+class IdIndex:
+    """Exact set of IDs with compact keys."""
+
+    def __init__(self):
+        self._keys = set()
+
+    def add(self, id: str) -> bool:
+        """Add ID to the index.
+
+        Args:
+            id (str): Record ID.
+
+        Returns:
+            bool: False if ID was already present.
+        """
+        key = pack_id(id)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        return True
+
+    def __contains__(self, id: str) -> bool:
+        return pack_id(id) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+class BloomFilter:
+    """Probabilistic set of IDs with fixed memory usage.
+
+    Never gives false negatives. False positive rate stays near the
+    requested one until the number of IDs exceeds the capacity.
+
+    Args:
+        capacity (int): Expected number of IDs.
+        error_rate (float): Desired false positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self._size = max(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self._hashes = max(round(self._size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def _positions(self, id: str) -> list[int]:
+        """Calculate bit positions of the ID with double hashing.
+
+        Uses built-in `hash()` of the key bytes (SipHash). It's randomized per
+        process, so filter must never be persisted.
+
+        Args:
+            id (str): Record ID.
+
+        Returns:
+            list[int]: Bit positions.
+        """
+        data = _key_bytes(pack_id(id))
+        h1 = hash(data)
+        h2 = hash(data + b"\0") | 1
+        size = self._size
+        return [(h1 + i * h2) % size for i in range(self._hashes)]
+
+    def add(self, id: str) -> bool:
+        """Add ID to the filter.
+
+        Args:
+            id (str): Record ID.
+
+        Returns:
+            bool: False if ID may be already present.
+        """
+        is_new = False
+        bits = self._bits
+        for position in self._positions(id):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                is_new = True
+        return is_new
+
+    def __contains__(self, id: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(id))
+
+    @property
+    def size(self) -> int:
+        """Memory used by the bit array in bytes."""
+        return len(self._bits)
@@ -1,17 +1,27 @@
 import pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import profiling
 import core
 
 MSG_HELP = """\
 DESCRIPTION:
-    This script parses file with cat info records into Python list of dictionaries.
+    This script parses file with cat info records into a list-like table of dict-like rows.
     If file argument isn't provided, then `test.csv` file which is shipped together with this \
 repository is used.
 
 USAGE:
-    python main.py [ <file_path> | -h | --help ]
+    python main.py [ OPTIONS ] [ <file_path> ]
 
 FLAGS:
-    -h, --help: Show this message."""
+    --dedupe=<exact|bloom>: Duplicate IDs detection mode. `bloom` uses Bloom filter with the
+                            second confirmation pass. It's slower, but takes less memory on large
+                            files. `exact` is used by default.
+                -h, --help: Show this message.
+                 --profile: Print cProfile, tracemalloc and stage timing summaries to the standard
+                            error on exit.
+                --snapshot: Load records from the binary snapshot next to the file. Snapshot
+                            is (re-)created if it's missing or the file was changed."""
 
 MSG_FALLBACK_WARNING = """\
 WARNING: Result values are based on the `test.csv` file which is shipped together with this \
@@ -19,14 +29,31 @@ repository.
 
 Pass file path as the argument to get real data."""
 
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
 def main():
     path = ""
+    dedupe = "exact"
+    use_snapshot = False
     # If argument was passed to the script
-    if len(sys.argv) == 2:
-        if sys.argv[1] in ("-h", "--help"):
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
             print(MSG_HELP)
             return
-        path = sys.argv[1]
+
+        if arg.startswith("--dedupe="):
+            _, dedupe = arg.split("=", 1)
+            if dedupe not in core.DEDUPE_MODES:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg == "--snapshot":
+            use_snapshot = True
+        elif not arg.startswith("-"):
+            path = arg
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
 
     # Fallback to `test.csv` if file path wasn't provided
     if not path:
@@ -35,7 +62,11 @@ def main():
 
     # Perform calculations
     try:
-        cats = core.get_cats_info(path)
+        if use_snapshot:
+            with core.load_cats_info(path, dedupe) as cats:
+                print(f"Cats:\n{cats}")
+            return
+        cats = core.get_cats_info(path, dedupe)
     except (OSError, UnicodeDecodeError, ValueError) as e:
         print("ERROR:", e)
         return -1
@@ -43,4 +74,4 @@ def main():
     return
 
 if __name__ == "__main__":
-    main()
+    profiling.run(main)
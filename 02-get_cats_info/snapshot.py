@@ -0,0 +1,236 @@
+import array, hashlib, mmap, os, struct, sys
+import table
+
+MAGIC = b"CATSNAP\0"
+VERSION = 2
+# Magic, version, byte order, ID width, number of rows, source size, source
+# mtime (ns), source SHA-256 and offsets of 7 sections
+HEADER = struct.Struct("<8sHBBQQq32s7Q")
+# Columns are stored in the native byte order and mapped without conversion
+BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+ALIGNMENT = 8
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def source_info(path: str) -> tuple[int, int, bytes]:
+    """Collect metadata which is used to check whether snapshot is up to date.
+
+    Args:
+        path (str): Path to the source data.
+
+    Returns:
+        tuple[int, int, bytes]: Size, mtime in nanoseconds and SHA-256 digest
+            of the file.
+
+    Raises:
+        OSError: If file can't be read.
+    """
+    digest = hashlib.sha256()
+    with open(path, mode="rb") as fh:
+        stat = os.fstat(fh.fileno())
+        for block in iter(lambda: fh.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return stat.st_size, stat.st_mtime_ns, digest.digest()
+
+def export_snapshot(cats: table.CatTable, path: str, info: tuple[int, int, bytes]):
+    """Write parsed records to the binary snapshot.
+
+    Layout: header, IDs (fixed width, NUL-padded), ID sizes (uint8), name end
+    offsets (uint64), names (UTF-8), ages (uint64), then sorted IDs and their
+    row numbers (uint64) for the binary search. Sections are 8-byte aligned.
+
+    Args:
+        cats (CatTable): Parsed records.
+        path (str): Path to the snapshot file. File is replaced atomically.
+        info (tuple[int, int, bytes]): Source metadata from `source_info()`.
+            Collect it before parsing, so changes made during parsing
+            invalidate the snapshot.
+
+    Raises:
+        OSError: If snapshot can't be written.
+    """
+    width, ids, id_sizes, name_ends, names, ages = cats.columns()
+    count = len(cats)
+    rows = sorted(range(count), key=lambda i: ids[i * width:(i + 1) * width])
+    sorted_ids = b"".join(ids[i * width:(i + 1) * width] for i in rows)
+    sorted_rows = array.array("Q", rows).tobytes()
+    sections = (ids, id_sizes, name_ends, names, ages, sorted_ids, sorted_rows)
+
+    offsets = []
+    offset = HEADER.size
+    for section in sections:
+        offset += -offset % ALIGNMENT
+        offsets.append(offset)
+        offset += len(section)
+    header = HEADER.pack(MAGIC, VERSION, BYTE_ORDER, width, count, *info, *offsets)
+    try:
+        with open(path + ".tmp", mode="wb") as fh:
+            fh.write(header)
+            for section, offset in zip(sections, offsets):
+                fh.write(b"\0" * (offset - fh.tell()))
+                fh.write(section)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        raise OSError(f"Snapshot `{path}` can't be written.") from e
+
+class CatSnapshot(table.CatColumns):
+    """Read-only list-like table of cats mapped from the snapshot file.
+
+    Rows are decoded lazily from the mapped pages, so opening takes constant
+    time regardless of the number of records. Works as a context manager.
+
+    Args:
+        path (str): Path to the snapshot file.
+
+    Raises:
+        OSError: If snapshot can't be read.
+        ValueError: If snapshot is broken or was written by an incompatible
+            version.
+    """
+
+    def __init__(self, path: str):
+        try:
+            with open(path, mode="rb") as fh:
+                self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            # Empty file can't be mapped and raises ValueError
+            raise OSError(f"Snapshot `{path}` can't be read.") from e
+        self._views = []
+        try:
+            self._load(path)
+        except BaseException:
+            self.close()
+            raise
+
+    def _load(self, path: str):
+        """Parse header and map sections of the snapshot."""
+        mm = self._mm
+        if len(mm) < HEADER.size:
+            raise ValueError(f"Snapshot `{path}` is broken.")
+        magic, version, byte_order, width, count, size, mtime_ns, digest, *offsets \
+            = HEADER.unpack_from(mm)
+        if magic != MAGIC:
+            raise ValueError(f"File `{path}` isn't a cats snapshot.")
+        if version != VERSION or byte_order != BYTE_ORDER:
+            raise ValueError(f"Snapshot `{path}` has incompatible format.")
+        self._id_width = width
+        self._count = count
+        self.source = (size, mtime_ns, digest)
+
+        ids_offset, id_sizes_offset, name_ends_offset, names_offset, ages_offset, \
+            sorted_ids_offset, sorted_rows_offset = offsets
+        if name_ends_offset + count * 8 > len(mm):
+            raise ValueError(f"Snapshot `{path}` is broken.")
+        names_size = struct.unpack_from("=Q", mm, name_ends_offset + (count - 1) * 8)[0] \
+            if count else 0
+        sections = ((ids_offset, width * count), (id_sizes_offset, count),
+            (name_ends_offset, count * 8), (names_offset, names_size), (ages_offset, count * 8),
+            (sorted_ids_offset, width * count), (sorted_rows_offset, count * 8))
+        if any(offset + size > len(mm) for offset, size in sections):
+            raise ValueError(f"Snapshot `{path}` is broken.")
+
+        view = memoryview(mm)
+        self._views.append(view)
+        self._ids, self._id_sizes, name_ends, self._names, ages, _, sorted_rows \
+            = (view[offset:offset + size] for offset, size in sections)
+        self._name_ends = name_ends.cast("Q")
+        self._ages = ages.cast("Q")
+        self._sorted_rows = sorted_rows.cast("Q")
+        # Sorted IDs are sliced from mmap directly, since bytes support ordering
+        self._sorted_ids_offset = sorted_ids_offset
+        self._views.extend((self._ids, self._id_sizes, name_ends, self._names, ages, sorted_rows,
+            self._name_ends, self._ages, self._sorted_rows))
+
+    def is_fresh(self, path: str) -> bool:
+        """Check whether snapshot matches the current source file.
+
+        Size and mtime are compared first. If only mtime differs, file is
+        hashed, so touched but unchanged files don't invalidate the snapshot.
+
+        Args:
+            path (str): Path to the source data.
+
+        Returns:
+            bool: True if snapshot can be used instead of parsing the file.
+        """
+        size, mtime_ns, digest = self.source
+        try:
+            stat = os.stat(path)
+            if stat.st_size != size:
+                return False
+            if stat.st_mtime_ns == mtime_ns:
+                return True
+            return source_info(path)[2] == digest
+        except OSError:
+            return False
+
+    def close(self):
+        """Unmap the snapshot. Rows can't be accessed after that."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mm.close()
+
+    def __enter__(self) -> "CatSnapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def ages(self) -> memoryview:
+        """Read-only view of the ages column."""
+        return self._ages
+
+    def find(self, id: str) -> table.CatRow | None:
+        """Look up the row by ID with binary search over the sorted IDs.
+
+        Args:
+            id (str): Cat ID.
+
+        Returns:
+            CatRow or None: Row view or None if ID isn't present.
+        """
+        key = id.encode("utf-8")
+        width = self._id_width
+        if len(key) > width:
+            return None
+        padded = key.ljust(width, b"\0")
+        mm, start = self._mm, self._sorted_ids_offset
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if mm[start + middle * width:start + (middle + 1) * width] < padded:
+                low = middle + 1
+            else:
+                high = middle
+        # IDs which end with NUL chars have the same padded key, so the whole
+        # run of equal keys is checked
+        while low < self._count and mm[start + low * width:start + (low + 1) * width] == padded:
+            row = self._sorted_rows[low]
+            if self._id_sizes[row] == len(key):
+                return table.CatRow(self, row)
+            low += 1
+        return None
+
+    def __len__(self) -> int:
+        return self._count
+
+def load_snapshot(path: str, source: str) -> CatSnapshot | None:
+    """Open snapshot if it's valid for the source file.
+
+    Args:
+        path (str): Path to the snapshot file.
+        source (str): Path to the source data.
+
+    Returns:
+        CatSnapshot or None: Mapped snapshot or None if it's missing, broken
+            or outdated.
+    """
+    try:
+        cats = CatSnapshot(path)
+    except (OSError, ValueError):
+        return None
+    if cats.is_fresh(source):
+        return cats
+    cats.close()
+    return None
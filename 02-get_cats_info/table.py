@@ -0,0 +1,191 @@
+import array, collections.abc
+
+# Max age value which fits into the ages column
+AGE_MAX = 2 ** 64 - 1
+
+class CatRow(collections.abc.Mapping):
+    """Lazy dict-like view of the single cat record.
+
+    Values are decoded from the table columns on access. Row compares equal
+    to the dict with the same items.
+    """
+
+    __slots__ = ("_table", "_index")
+    _keys = ("id", "name", "age")
+
+    def __init__(self, table: "CatColumns", index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str) -> str | int:
+        if key == "id":
+            return self._table.get_id(self._index)
+        if key == "name":
+            return self._table.get_name(self._index)
+        if key == "age":
+            return self._table.get_age(self._index)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+class CatColumns(collections.abc.Sequence):
+    """Base of the list-like columnar tables of cats.
+
+    Subclasses supply the column buffers: `_id_width`, `_ids` (fixed-width
+    NUL-padded UTF-8), `_id_sizes`, `_names` (packed UTF-8), `_name_ends`
+    and `_ages`. Buffers can be arrays, bytearrays or memoryviews.
+    """
+
+    def _check_index(self, index: int) -> int:
+        """Normalize index of the row.
+
+        Args:
+            index (int): Row index. Negative values count from the end.
+
+        Returns:
+            int: Non-negative index.
+
+        Raises:
+            IndexError: If index is out of range.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Table index out of range.")
+        return index
+
+    def get_id(self, index: int) -> str:
+        """Return ID of the row."""
+        index = self._check_index(index)
+        start = index * self._id_width
+        return str(self._ids[start:start + self._id_sizes[index]], "utf-8")
+
+    def iter_ids(self):
+        """Iterate over IDs of all rows.
+
+        Yields:
+            str: Row ID.
+        """
+        width = self._id_width
+        # View is released when iteration stops, so mapped buffers can be closed
+        with memoryview(self._ids) as ids:
+            for i, size in enumerate(self._id_sizes):
+                yield str(ids[i * width:i * width + size], "utf-8")
+
+    def get_name(self, index: int) -> str:
+        """Return name of the row."""
+        index = self._check_index(index)
+        start = self._name_ends[index - 1] if index else 0
+        return str(self._names[start:self._name_ends[index]], "utf-8")
+
+    def get_age(self, index: int) -> int:
+        """Return age of the row."""
+        return self._ages[self._check_index(index)]
+
+    def __getitem__(self, index: int | slice) -> CatRow | list[CatRow]:
+        if isinstance(index, slice):
+            return [CatRow(self, i) for i in range(*index.indices(len(self)))]
+        return CatRow(self, self._check_index(index))
+
+    def __len__(self) -> int:
+        return len(self._ages)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, collections.abc.Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def to_list(self) -> list[dict]:
+        """Materialize table as a list of dicts.
+
+        Returns:
+            list[dict]: List of cats.
+        """
+        return [dict(row) for row in self]
+
+class CatTable(CatColumns):
+    """Columnar list-like storage of cat records.
+
+    IDs are stored as fixed-width UTF-8 bytes (width grows with the longest
+    ID), names as one packed UTF-8 buffer with end offsets and ages as an
+    unsigned 64-bit int array. Rows are returned as lazy `CatRow` views, so existing
+    code which works with the list of dicts keeps working.
+    """
+
+    def __init__(self):
+        self._id_width = 0
+        self._ids = bytearray()
+        self._id_sizes = array.array("B")
+        self._names = bytearray()
+        self._name_ends = array.array("Q")
+        self._ages = array.array("Q")
+
+    def append(self, id: str, name: str, age: int):
+        """Add cat record to the end of the table.
+
+        Args:
+            id (str): Cat ID. Must be at most 255 bytes in UTF-8.
+            name (str): Cat name.
+            age (int): Cat age in range [0, AGE_MAX].
+
+        Raises:
+            ValueError: If ID or age is too large.
+        """
+        id = id.encode("utf-8")
+        if len(id) > 255:
+            raise ValueError("ID is too long.")
+        if not 0 <= age <= AGE_MAX:
+            raise ValueError("Age is out of range.")
+        if len(id) > self._id_width:
+            self._widen_ids(len(id))
+        self._ids += id.ljust(self._id_width, b"\0")
+        self._id_sizes.append(len(id))
+        self._names += name.encode("utf-8")
+        self._name_ends.append(len(self._names))
+        self._ages.append(age)
+
+    def _widen_ids(self, width: int):
+        """Re-pack IDs column with the new fixed width.
+
+        Args:
+            width (int): New width in bytes.
+        """
+        old_width = self._id_width
+        padding = b"\0" * (width - old_width)
+        if old_width:
+            ids = memoryview(self._ids)
+            self._ids = bytearray(b"".join(
+                bytes(ids[i:i + old_width]) + padding for i in range(0, len(ids), old_width)))
+        else:
+            # All previous IDs are empty
+            self._ids = bytearray(padding * len(self))
+        self._id_width = width
+
+    @property
+    def ages(self) -> memoryview:
+        """Read-only view of the ages column.
+
+        Can be wrapped without copying, e.g. with `numpy.frombuffer()`.
+        """
+        return memoryview(self._ages).toreadonly()
+
+    def columns(self) -> tuple[int, bytes, bytes, bytes, bytes, bytes]:
+        """Return raw column buffers.
+
+        Returns:
+            tuple[int, bytes, bytes, bytes, bytes, bytes]: ID width, IDs,
+                ID sizes (uint8), name end offsets (uint64), names and ages
+                (uint64). Arrays use native byte order.
+        """
+        return (self._id_width, bytes(self._ids), self._id_sizes.tobytes(),
+            self._name_ends.tobytes(), bytes(self._names), self._ages.tobytes())
@@ -0,0 +1,163 @@
+import collections, contextlib, os, pathlib, shutil, sys, tempfile, time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import datagen
+import core
+
+MSG_HELP = """\
+DESCRIPTION:
+    This script counts metadata system calls made by the tree walker and compares them with the
+    legacy `pathlib` walker which called `is_*()` methods and `os.access()` for every node.
+    Calls are counted by wrapping `os` functions and `os.scandir()` entries. Script fails if the
+    walker makes more than one `lstat()` per entry or follows anything but symbolic links.
+    Temporary tree is generated if path isn't provided.
+
+USAGE:
+    python bench.py [ OPTIONS ] [ <path> ]
+
+FLAGS:
+         -h, --help: Show this message.
+       --size=<int>: Number of entries in the generated tree. 20000 by default."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
+def legacy_walk(path: pathlib.Path, counter: list):
+    """Walk the tree making the same calls as the legacy `print_tree()`."""
+    nodes = sorted(path.iterdir(), key=lambda node: (not node.is_dir(), node.name))
+    for node in nodes:
+        counter[0] += 1
+        if node.is_block_device() or node.is_char_device() or node.is_fifo() \
+                or node.is_socket() or node.is_mount() or node.is_dir():
+            pass
+        elif node.is_symlink():
+            node.exists()
+        elif node.is_file():
+            os.access(node, os.X_OK)
+        if node.is_dir() and not node.is_symlink():
+            os.access(node, os.R_OK)
+        if node.is_symlink():
+            node.exists()
+            node.readlink()
+        if node.is_dir() and not node.is_symlink():
+            legacy_walk(node, counter)
+
+class CountingEntry:
+    """`os.DirEntry` wrapper which counts metadata calls."""
+
+    def __init__(self, entry: os.DirEntry, calls: collections.Counter):
+        self._entry = entry
+        self._calls = calls
+        self.name = entry.name
+        self.path = entry.path
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        self._calls["entry.stat" if follow_symlinks else "entry.lstat"] += 1
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        self._calls["entry.is_dir"] += 1
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:
+        self._calls["entry.is_file"] += 1
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self) -> bool:
+        self._calls["entry.is_symlink"] += 1
+        return self._entry.is_symlink()
+
+@contextlib.contextmanager
+def count_calls():
+    """Count calls of the `os` metadata functions within the block.
+
+    Yields:
+        Counter: Number of calls by function name.
+    """
+    calls = collections.Counter()
+    originals = {name: getattr(os, name)
+        for name in ("stat", "lstat", "readlink", "access", "listdir", "scandir")}
+
+    def wrap(name, func):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    @contextlib.contextmanager
+    def scandir(path):
+        calls["scandir"] += 1
+        with originals["scandir"](path) as entries:
+            yield (CountingEntry(entry, calls) for entry in entries)
+
+    try:
+        for name, func in originals.items():
+            setattr(os, name, wrap(name, func))
+        os.scandir = scandir
+        yield calls
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+def main():
+    path = ""
+    size = 20_000
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        if arg.startswith("--size="):
+            _, size = arg.split("=", 1)
+            if not size.isascii() or not size.isdigit():
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            size = int(size)
+        elif not arg.startswith("-"):
+            path = arg
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    temp_path = ""
+    if not path:
+        temp_path = tempfile.mkdtemp()
+        datagen.make_tree(temp_path, size)
+        path = temp_path
+
+    try:
+        counter = [0]
+        started = time.perf_counter()
+        with count_calls() as legacy_calls:
+            legacy_walk(pathlib.Path(path), counter)
+        legacy_time = time.perf_counter() - started
+        entries = counter[0]
+
+        started = time.perf_counter()
+        with count_calls() as calls, open(os.devnull, mode="w", encoding="utf-8") as fh:
+            with contextlib.redirect_stdout(fh):
+                core.print_tree(path)
+        walker_time = time.perf_counter() - started
+        symlinks = calls["readlink"]
+    finally:
+        if temp_path:
+            shutil.rmtree(temp_path)
+
+    for name, counts, elapsed in (("legacy", legacy_calls, legacy_time),
+            ("scandir", calls, walker_time)):
+        total = sum(counts.values())
+        details = ", ".join(f"{key}={value}" for key, value in sorted(counts.items()))
+        print(f"{name}: {elapsed:.3f}s, {total} calls, {total / max(entries, 1):.2f} per entry \
+({details})")
+
+    print(f"Entries: {entries}, symbolic links: {symlinks}.")
+    # Root is followed once, every symbolic link is followed once more
+    if calls["entry.lstat"] > entries or calls["stat"] > symlinks + 1 \
+            or calls["lstat"] or calls["access"] or calls["entry.is_dir"]:
+        print("ERROR: Walker makes redundant metadata calls.")
+        return -1
+    print("Walker makes at most one `lstat()` per entry.")
+    return
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,83 +1,820 @@
-import errno, os, pathlib
-from colorama import Back, Fore, Style
+import concurrent.futures, errno, os, pathlib, stat, sys, typing
 
-def print_tree(path: str, max_level: int | None = None, draw_lines: bool = True, prefix: str = ""):
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import stages
+import sinks
+
+# Real user and groups of the process which are used to check permissions
+# from the mode bits like `os.access()` does. Owner bits are checked if
+# platform doesn't have users.
+if hasattr(os, "getuid"):
+    USER_ID = os.getuid()
+    GROUP_IDS = frozenset(os.getgroups()) | {os.getgid()}
+else:
+    USER_ID = None
+    GROUP_IDS = frozenset()
+# Max number of directory listings which are read ahead of the printer per
+# worker thread
+PREFETCH_PER_WORKER = 4
+SORT_MODES = ("name", "size")
+# Nested directories are opened relative to the descriptor of their parent,
+# so depth of the tree isn't limited by the max path length. Paths are used if
+# platform can't open files relative to the directory.
+DIR_FD = os.open in os.supports_dir_fd and os.scandir in os.supports_fd
+ROOT_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+DIR_FLAGS = ROOT_FLAGS | getattr(os, "O_NOFOLLOW", 0)
+# Max number of directories which keep their descriptors open until their
+# subdirectories are read
+MAX_OPEN_DIRS = 256
+
+class Node:
+    """Directory entry with the metadata required to render it.
+
+    Attributes:
+        name (str): Entry name. It's the path for the root directory.
+        parent (Node or None): Directory of the entry. None for the root.
+        stat (os.stat_result): Result of `lstat()` of the entry.
+        target (str or None): Destination of the symbolic link.
+        target_stat (os.stat_result or None): Result of `stat()` of the
+            symbolic link destination. None if link is broken.
+        is_mount (bool): Entry is a mount point.
+        fd (int or None): Descriptor of the directory while it's open.
+    """
+
+    __slots__ = ("name", "parent", "stat", "target", "target_stat", "is_mount", "fd")
+
+    def __init__(self, name: str, parent: "Node | None", stat: os.stat_result,
+            target: str | None = None, target_stat: os.stat_result | None = None,
+            is_mount: bool = False):
+        self.name = name
+        self.parent = parent
+        self.stat = stat
+        self.target = target
+        self.target_stat = target_stat
+        self.is_mount = is_mount
+        self.fd = None
+
+    @property
+    def path(self) -> str:
+        """Entry path. It's joined from the names of the parents on every
+        access, so it's built only for the consumers which need it."""
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return os.path.join(*reversed(names))
+
+    @property
+    def is_symlink(self) -> bool:
+        return stat.S_ISLNK(self.stat.st_mode)
+
+    @property
+    def is_dir(self) -> bool:
+        """Entry is a real directory (not a link to it)."""
+        return stat.S_ISDIR(self.stat.st_mode)
+
+    @property
+    def mode(self) -> int:
+        """Mode of the entry. Symbolic links are followed, so it's zero for
+        broken links."""
+        if self.is_symlink:
+            return self.target_stat.st_mode if self.target_stat else 0
+        return self.stat.st_mode
+
+def has_access(st: os.stat_result, mask: int) -> bool:
+    """Check permission for the real user from the mode bits.
+
+    Args:
+        st (os.stat_result): Stat of the file.
+        mask (int): `os.R_OK`, `os.W_OK` or `os.X_OK`.
+
+    Returns:
+        bool: True if access is allowed. ACLs aren't taken into account.
+    """
+    mode = st.st_mode
+    if USER_ID == 0:
+        # Superuser needs at least one execute bit to run files
+        return mask != os.X_OK or stat.S_ISDIR(mode) or bool(mode & 0o111)
+    if USER_ID is None or st.st_uid == USER_ID:
+        return bool(mode & (mask << 6))
+    if st.st_gid in GROUP_IDS:
+        return bool(mode & (mask << 3))
+    return bool(mode & mask)
+
+def _sort_key(node: Node) -> tuple[bool, str]:
+    """Sort key which puts directories first."""
+    return not stat.S_ISDIR(node.mode), node.name
+
+def scan_dir(directory: Node, handle: int | str) -> list[Node]:
+    """Read directory entries sorted by name with directories first.
+
+    Every entry costs a single `lstat()` call. Symbolic links additionally
+    need `readlink()` and `stat()` of the destination.
+
+    Args:
+        directory (Node): Directory which becomes the parent of the entries.
+            Its device ID is used to detect mount points.
+        handle (int or str): Descriptor of the open directory or its path.
+
+    Returns:
+        list[Node]: Directory entries.
+
+    Raises:
+        OSError: If directory can't be read.
+    """
+    # Entries of the directory listed by the descriptor have bare names
+    dir_fd = handle if isinstance(handle, int) else None
+    device = directory.stat.st_dev
+    nodes = []
+    with os.scandir(handle) as entries:
+        for entry in entries:
+            try:
+                st = entry.stat(follow_symlinks=False)
+                node = Node(entry.name, directory, st)
+                if stat.S_ISLNK(st.st_mode):
+                    node.target = os.readlink(entry.path, dir_fd=dir_fd)
+                    try:
+                        node.target_stat = os.stat(entry.path, dir_fd=dir_fd)
+                    except OSError:
+                        pass
+                elif stat.S_ISDIR(st.st_mode):
+                    node.is_mount = st.st_dev != device
+            except FileNotFoundError:
+                # Entry was removed after the directory was read
+                continue
+            nodes.append(node)
+    nodes.sort(key=_sort_key)
+    return nodes
+
+def node_kind(node: Node) -> str:
+    """Get kind of the node which defines its color.
+
+    Args:
+        node (Node): Directory entry.
+
+    Returns:
+        str: Node kind from `sinks.KINDS`.
+    """
+    mode = node.mode
+    if stat.S_ISBLK(mode):
+        return "block"
+    if stat.S_ISCHR(mode):
+        return "char"
+    if stat.S_ISFIFO(mode):
+        return "fifo"
+    if stat.S_ISSOCK(mode):
+        return "socket"
+    if node.is_mount:
+        return "mount"
+    if stat.S_ISDIR(mode):
+        return "dir"
+    if node.is_symlink:
+        return "link" if node.target_stat else "broken"
+    if stat.S_ISREG(mode):
+        return "exec" if has_access(node.stat, os.X_OK) else "file"
+    return "other"
+
+class _Reader:
+    """Reads directories opened relative to the descriptors of their parents.
+
+    Path of the nested directory is never resolved as a whole. Descriptor is
+    kept in the node until the traversal closes it, which happens as soon as
+    all its subdirectories are opened. Directories closed earlier because of
+    `MAX_OPEN_DIRS` are reopened name by name from the nearest open parent.
+    Reading is thread-safe as long as the parents aren't closed meanwhile.
+
+    Args:
+        scan (callable): Directory reader with `scan_dir()` signature.
+    """
+
+    def __init__(self, scan=scan_dir):
+        self._scan = scan
+        self._open = set()
+
+    def __call__(self, directory: Node) -> list[Node]:
+        """Open and read the directory. It's left open.
+
+        Args:
+            directory (Node): Directory.
+
+        Returns:
+            list[Node]: Directory entries.
+
+        Raises:
+            OSError: If directory can't be read. Error has the path of the
+                directory, since relative calls report bare names.
+        """
+        try:
+            return self._scan(directory, self.open(directory))
+        except OSError as e:
+            e.filename = directory.path
+            raise
+
+    def open(self, directory: Node) -> int | str:
+        """Get descriptor of the directory opening it if needed.
+
+        Args:
+            directory (Node): Directory.
+
+        Returns:
+            int or str: Descriptor of the directory or its path if platform
+                can't open files relative to the directory.
+
+        Raises:
+            OSError: If directory can't be opened.
+        """
+        if not DIR_FD:
+            return directory.path
+        if directory.fd is not None:
+            return directory.fd
+        chain = [directory]
+        while chain[-1].parent is not None and chain[-1].parent.fd is None:
+            chain.append(chain[-1].parent)
+        node = chain.pop()
+        if node.parent is None:
+            fd = os.open(node.name, ROOT_FLAGS)
+        else:
+            fd = os.open(node.name, DIR_FLAGS, dir_fd=node.parent.fd)
+        # Descriptors of the closed parents are needed only to go down
+        while chain:
+            try:
+                next_fd = os.open(chain.pop().name, DIR_FLAGS, dir_fd=fd)
+            finally:
+                os.close(fd)
+            fd = next_fd
+        directory.fd = fd
+        self._open.add(directory)
+        return fd
+
+    def keep(self, directory: Node, has_subdirs: bool):
+        """Close the directory unless its subdirectories are going to be read
+        and the limit of the open directories isn't reached.
+
+        Args:
+            directory (Node): Directory which was read.
+            has_subdirs (bool): Directory has subdirectories to read.
+        """
+        if not has_subdirs or len(self._open) > MAX_OPEN_DIRS:
+            self.close(directory)
+
+    def close(self, directory: Node):
+        """Close descriptor of the directory if it's open."""
+        if directory.fd is not None:
+            os.close(directory.fd)
+            directory.fd = None
+            self._open.discard(directory)
+
+    def close_all(self):
+        """Close descriptors of all open directories."""
+        for directory in list(self._open):
+            self.close(directory)
+
+class _Prefetcher:
+    """Reads directory listings ahead of the printer with the thread pool.
+
+    Directories are queued on the stack as soon as their parent is listed,
+    so they are read in the same depth-first order as they are printed.
+    Number of the listings in flight or waiting for the printer is limited
+    by the window size. Results are taken back in the printing order.
+
+    Args:
+        executor (Executor): Thread pool.
+        window (int): Max number of the prefetched listings.
+        read (callable): Reader of the directory listing by its node.
+    """
+
+    def __init__(self, executor: concurrent.futures.Executor, window: int, read):
+        self._executor = executor
+        self._window = window
+        self._read = read
+        self._futures = {}
+        self._queued = []
+
+    def queue(self, nodes: list[Node]):
+        """Schedule listing of the subdirectories of the same directory.
+
+        Args:
+            nodes (list[Node]): Directories in the printing order.
+        """
+        self._queued.extend(reversed(nodes))
+        self._fill()
+
+    def _fill(self):
+        """Submit queued directories while there is space in the window."""
+        while self._queued and len(self._futures) < self._window:
+            node = self._queued.pop()
+            self._futures[node] = self._executor.submit(self._read, node)
+
+    def get(self, node: Node) -> list[Node]:
+        """Get listing of the queued directory.
+
+        Args:
+            node (Node): Directory. It must be the next one in the printing
+                order.
+
+        Returns:
+            list[Node]: Directory entries.
+
+        Raises:
+            OSError: If directory can't be read.
+        """
+        future = self._futures.pop(node, None)
+        if future is None:
+            # Window is busy with the later directories, so the next one is
+            # still on top of the stack and is read right away
+            self._queued.pop()
+            self._fill()
+            return self._read(node)
+        self._fill()
+        return future.result()
+
+class Totals:
+    """Recursive totals of the directory.
+
+    Attributes:
+        size (int): Size of all nested files in bytes. Sizes of directories
+            themselves aren't counted.
+        files (int): Number of all nested entries except directories.
+        mtime_ns (int): Newest modification time of the nested entries.
+    """
+
+    __slots__ = ("size", "files", "mtime_ns")
+
+    def __init__(self):
+        self.size = 0
+        self.files = 0
+        self.mtime_ns = 0
+
+def _readable_subdirs(nodes: list[Node]) -> list[Node]:
+    """Select directories which can be scanned."""
+    return [node for node in nodes if node.is_dir and has_access(node.stat, os.R_OK)]
+
+def _aggregate(root: Node, nodes: list[Node], reader: _Reader, prefetcher: _Prefetcher | None,
+        sort: str, top: int | None, skip_errors: bool = False) \
+        -> tuple[dict[Node, list[Node]], dict[Node, Totals], dict[Node, str]]:
+    """Read the whole tree and calculate recursive totals of the directories.
+
+    Directories are read depth-first, so prefetcher can be used. Totals of
+    the directory are calculated when all its subdirectories are read.
+
+    Args:
+        root (Node): Root directory.
+        nodes (list[Node]): Root directory entries.
+        reader (_Reader): Reader of the directories.
+        prefetcher (_Prefetcher or None): Reader of the subdirectories
+            listings. They are read in place if it's not specified.
+        sort (str): Order of the entries from `SORT_MODES`. `size` puts the
+            largest entries first.
+        top (int or None): Keep only N largest entries of each directory.
+        skip_errors (bool): Treat directories which can't be read as empty
+            instead of raising the error.
+
+    Returns:
+        tuple[dict[Node, list[Node]], dict[Node, Totals], dict[Node, str]]:
+            Ordered entries, totals and read errors of the directories by
+            their nodes.
+
+    Raises:
+        OSError: If directory can't be read.
+    """
+    listings = {}
+    totals = {}
+    errors = {}
+
+    def node_size(node: Node) -> int:
+        if node.is_dir:
+            return totals[node].size if node in totals else 0
+        return node.stat.st_size
+
+    subdirs = _readable_subdirs(nodes)
+    reader.keep(root, bool(subdirs))
+    if prefetcher:
+        prefetcher.queue(subdirs)
+    # Frame holds directory, its entries, subdirectories and index of the
+    # next subdirectory to read
+    stack = [[root, nodes, subdirs, 0]]
+    while stack:
+        frame = stack[-1]
+        directory, nodes, subdirs, next_subdir = frame
+        if next_subdir < len(subdirs):
+            node = subdirs[next_subdir]
+            frame[3] += 1
+            try:
+                children = prefetcher.get(node) if prefetcher else reader(node)
+            except OSError as e:
+                if not skip_errors:
+                    raise
+                errors[node] = e.strerror or str(e)
+                children = []
+            if frame[3] == len(subdirs):
+                reader.close(directory)
+            subdirs = _readable_subdirs(children)
+            reader.keep(node, bool(subdirs))
+            if prefetcher:
+                prefetcher.queue(subdirs)
+            stack.append([node, children, subdirs, 0])
+            continue
+
+        stack.pop()
+        total = Totals()
+        for node in nodes:
+            if node.is_dir:
+                child = totals.get(node)
+                if child:
+                    total.size += child.size
+                    total.files += child.files
+                    total.mtime_ns = max(total.mtime_ns, child.mtime_ns)
+            else:
+                total.size += node.stat.st_size
+                total.files += 1
+            total.mtime_ns = max(total.mtime_ns, node.stat.st_mtime_ns)
+        totals[directory] = total
+
+        if sort == "size" or top is not None:
+            nodes = sorted(nodes, key=lambda node: (-node_size(node), node.name))
+            if top is not None:
+                nodes = nodes[:top]
+                if sort == "name":
+                    nodes.sort(key=_sort_key)
+        listings[directory] = nodes
+    return listings, totals, errors
+
+class _Frame:
+    """Directory on the traversal stack.
+
+    Args:
+        directory (Node): Directory.
+        nodes (list[Node]): Directory entries.
+        max_level (int or None): Max depth level for nested directories.
+        depth (int): Depth level of the entries.
+    """
+
+    __slots__ = ("directory", "nodes", "index", "max_level", "depth", "denied", "subdirs",
+        "next_subdir")
+
+    def __init__(self, directory: Node, nodes: list[Node], max_level: int | None, depth: int):
+        self.directory = directory
+        self.nodes = nodes
+        self.index = 0
+        self.max_level = max_level
+        self.depth = depth
+        # Directories without read access aren't scanned
+        self.denied = {node for node in nodes
+            if node.is_dir and not has_access(node.stat, os.R_OK)}
+        self.subdirs = []
+        if max_level is None or max_level > 0:
+            self.subdirs = [node for node in nodes if node.is_dir and node not in self.denied]
+        self.next_subdir = 0
+
+def _node_event(node: Node, depth: int, is_last: bool, totals: dict[Node, Totals] | None,
+        error: str | None) -> sinks.NodeEvent:
+    """Create event of the directory entry. Path is built only if the sink
+    reads it."""
+    total = totals.get(node) if totals is not None and node.is_dir else None
+    if total:
+        size, mtime_ns, files = total.size, total.mtime_ns, total.files
+    else:
+        size, mtime_ns, files = node.stat.st_size, node.stat.st_mtime_ns, None
+    return sinks.NodeEvent(lambda: node.path, node.name, depth, node_kind(node), size, mtime_ns,
+        files, node.target, error, is_last)
+
+def _iter_nodes(root: Node, nodes: list[Node], max_level: int | None, read, reader: _Reader,
+        prefetcher: _Prefetcher | None = None, totals: dict[Node, Totals] | None = None,
+        errors: dict[Node, str] | None = None, skip_errors: bool = False):
+    """Iterate over events of the directory entries and all nested entries.
+
+    Traversal uses explicit stack, so depth isn't limited by the recursion
+    limit. Only the listings of the directories on the current branch are
+    kept.
+
+    Args:
+        root (Node): Root directory.
+        nodes (list[Node]): Root directory entries.
+        max_level (int or None): Max depth level for nested directories.
+        read (callable): Reader of the directory listing by its node.
+        reader (_Reader): Owner of the directory descriptors. Directory is
+            closed when all its subdirectories are read.
+        prefetcher (_Prefetcher or None): Prefetcher used by the reader to
+            queue subdirectories.
+        totals (dict[Node, Totals] or None): Totals of the directories.
+        errors (dict[Node, str] or None): Known read errors of the
+            directories.
+        skip_errors (bool): Report directories which can't be read in the
+            event instead of raising the error.
+
+    Yields:
+        NodeEvent: Node event in the tree order.
+
+    Raises:
+        OSError: If directory can't be read.
+    """
+    frame = _Frame(root, nodes, max_level, 1)
+    reader.keep(root, bool(frame.subdirs))
+    if prefetcher:
+        prefetcher.queue(frame.subdirs)
+    stack = [frame]
+    while stack:
+        frame = stack[-1]
+        if frame.index == len(frame.nodes):
+            stack.pop()
+            continue
+        node = frame.nodes[frame.index]
+        frame.index += 1
+        error = "Permission denied" if node in frame.denied else None
+
+        # Go to the next level if allowed. Listing is read before the event
+        # if errors are reported in it.
+        is_descended = frame.next_subdir < len(frame.subdirs) \
+            and node is frame.subdirs[frame.next_subdir]
+        children = None
+        if is_descended:
+            frame.next_subdir += 1
+            if skip_errors:
+                try:
+                    children = read(node)
+                except OSError as e:
+                    error = e.strerror or str(e)
+                    reader.close(node)
+            if errors:
+                error = errors.get(node, error)
+
+        yield _node_event(node, frame.depth, frame.index == len(frame.nodes), totals, error)
+
+        if is_descended:
+            if not skip_errors:
+                children = read(node)
+            if frame.next_subdir == len(frame.subdirs):
+                reader.close(frame.directory)
+        if children is not None:
+            child = _Frame(node, children, None if frame.max_level is None else frame.max_level - 1,
+                frame.depth + 1)
+            reader.keep(node, bool(child.subdirs))
+            if prefetcher:
+                prefetcher.queue(child.subdirs)
+            stack.append(child)
+
+def _path_error(e: OSError, path: str) -> OSError:
+    """Convert scan error into the error with a readable message.
+
+    Args:
+        e (OSError): Original error.
+        path (str): Path which was scanned. Used if error has no file name.
+
+    Returns:
+        OSError: New error.
+    """
+    path = e.filename or path
+    match e.errno:
+        case errno.ENOENT:
+            return OSError(f"Path `{path}`: Doesn't exist.")
+        case errno.EACCES:
+            return OSError(f"Path `{path}`: Permission denied.")
+        case errno.ENOTDIR:
+            return OSError(f"Path `{path}`: Not a directory.")
+        case _:
+            return OSError(f"Path `{path}` can't be read.\n{e}")
+
+def iter_events(path: str, max_level: int | None = None, workers: int | None = None,
+        index: "treeindex.TreeIndex | None" = None, totals: bool = False, sort: str = "name",
+        top: int | None = None, node_filter=None, skip_errors: bool = False):
+    """Iterate over events of the directory tree nodes.
+
+    Scan doesn't follow symbolic links. If totals, size order or top entries
+    are requested, the whole tree is read before the first event (regardless
+    of `max_level`). Otherwise memory usage doesn't depend on the number of
+    entries. Nested directories are opened relative to their parents, so
+    depth isn't limited by the max path length. Paths of the events are
+    built only if they are read.
+
+    Args:
+        path (str): Path to the directory.
+        max_level (int or None): Max depth level for nested directories.
+        workers (int or None): Number of threads which read directories
+            ahead of the consumer. It helps on high-latency file systems.
+            `0` means default pool size. Directories are read in place if
+            it's not specified. Events are the same in both modes.
+        index (TreeIndex or None): Index of the previous scan. Directories
+            which weren't changed since then aren't re-listed.
+        totals (bool): Calculate total size, number of files and newest
+            modification time of the directories.
+        sort (str): Order of the entries from `SORT_MODES`. `name` puts
+            directories first, `size` puts the largest entries first.
+        top (int or None): Keep only N largest entries of each directory.
+        node_filter (callable or None): Entries for which it returns False
+            are skipped together with their subtrees. See `NodeFilter`.
+        skip_errors (bool): Report nested directories which can't be read
+            in their events instead of raising the error.
+
+    Yields:
+        NodeEvent: Node event in the tree order starting with the root.
+
+    Raises:
+        OSError: If path can't be read.
+        ValueError: If sort mode is unknown.
+    """
+    if sort not in SORT_MODES:
+        raise ValueError(f"Unknown sort mode `{sort}`.")
+    scan = index.scan if index else scan_dir
+    if node_filter:
+        base_scan = scan
+        scan = lambda directory, handle: [
+            node for node in base_scan(directory, handle) if node_filter(node)]
+
+    reader = _Reader(scan)
+    try:
+        root = Node(path, None, os.stat(path))
+        nodes = reader(root)
+    except OSError as e:
+        reader.close_all()
+        # Root is reported anyway, so the output isn't empty
+        yield sinks.NodeEvent(path, path, 0, "dir", error=e.strerror or str(e))
+        if skip_errors:
+            return
+        raise _path_error(e, path) from e
+
+    executor = None
+    try:
+        prefetcher = None
+        read = reader
+        if workers is not None:
+            # Default size of the pool is the same as in `ThreadPoolExecutor`
+            workers = workers or min(32, (os.cpu_count() or 1) + 4)
+            executor = concurrent.futures.ThreadPoolExecutor(workers)
+            prefetcher = _Prefetcher(executor, workers * PREFETCH_PER_WORKER, reader)
+            read = prefetcher.get
+
+        dir_totals = errors = None
+        if totals or sort != "name" or top is not None:
+            listings, dir_totals, errors = _aggregate(root, nodes, reader, prefetcher, sort, top,
+                skip_errors)
+            # Everything is read, so the tree is built from the listings
+            nodes = listings.pop(root)
+            read = listings.pop
+            prefetcher = None
+            root_total = dir_totals[root]
+            yield sinks.NodeEvent(path, path, 0, "dir", root_total.size, root_total.mtime_ns,
+                root_total.files)
+        else:
+            yield sinks.NodeEvent(path, path, 0, "dir", root.stat.st_size, root.stat.st_mtime_ns)
+        if not totals:
+            dir_totals = None
+        yield from _iter_nodes(root, nodes, max_level, read, reader, prefetcher, dir_totals, errors,
+            skip_errors)
+    except OSError as e:
+        raise _path_error(e, path) from e
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        # Workers are stopped, so nothing reads relative to the descriptors
+        reader.close_all()
+
+def write_tree(sink, path: str, max_level: int | None = None, workers: int | None = None,
+        index: "treeindex.TreeIndex | None" = None, totals: bool = False, sort: str = "name",
+        top: int | None = None, node_filter=None, skip_errors: bool = False):
+    """Stream events of the directory tree nodes to the sink.
+
+    Sink is closed (and flushed) even if traversal fails.
+
+    Args:
+        sink (TextSink, JsonSink or BinarySink): Events consumer.
+        path (str): Path to the directory.
+        Other arguments are the same as in `iter_events()`.
+
+    Raises:
+        OSError: If path can't be read.
+        ValueError: If sort mode is unknown.
+    """
+    try:
+        events = iter_events(path, max_level, workers, index, totals, sort, top, node_filter,
+            skip_errors)
+        for event in stages.iter_stage("read", events, "render"):
+            sink.write(event)
+    finally:
+        sink.close()
+
+def print_tree(path: str, max_level: int | None = None, draw_lines: bool = True, prefix: str = "",
+        workers: int | None = None, out: typing.TextIO | None = None, color: bool | None = None,
+        index: "treeindex.TreeIndex | None" = None, sizes: bool = False, sort: str = "name",
+        top: int | None = None, node_filter=None):
     """Print tree-like structure of the specified directory.
 
-    Scan doesn't follow symbolic links.
+    Scan doesn't follow symbolic links. Lines are written in large batches.
 
     Args:
         path (str): Path to the directory.
         max_level (int or None): Max depth level for nested directories.
         draw_lines (bool): Draw lines to visualize branches.
-        prefix (str): Prefix used by recursion to add visual branches.
+        prefix (str): Prefix of the nested lines. Root path isn't printed if
+            it's specified.
+        workers (int or None): Number of threads which read directories
+            ahead of the printer. See `iter_events()`.
+        out (TextIO or None): Output stream. Standard output by default.
+        color (bool or None): Colorize nodes with ANSI codes. By default
+            colors are used only if output is a terminal.
+        index (TreeIndex or None): Index of the previous scan. Directories
+            which weren't changed since then aren't re-listed.
+        sizes (bool): Show sizes of the files and totals of the directories:
+            size, number of files and newest modification time.
+        sort (str): Order of the entries from `SORT_MODES`. `name` puts
+            directories first, `size` puts the largest entries first.
+        top (int or None): Show only N largest entries of each directory.
+        node_filter (callable or None): Entries for which it returns False
+            are skipped together with their subtrees. See `NodeFilter`.
 
     Raises:
         OSError: If path can't be read.
+        ValueError: If sort mode is unknown.
     """
-    if not prefix:
-        print(Fore.BLUE + path + Style.RESET_ALL)
+    sink = sinks.TextSink(out or sys.stdout, draw_lines, color, prefix, sizes)
+    write_tree(sink, path, max_level, workers, index, sizes, sort, top, node_filter)
+
+def _diff_level(old: list[Node] | None, new: list[Node]) -> list[tuple[Node, str]]:
+    """Compare listings of the directory.
+
+    Args:
+        old (list[Node] or None): Previous entries.
+        new (list[Node]): Current entries.
+
+    Returns:
+        list[tuple[Node, str]]: Entries in the tree order with `added`,
+            `removed` or `same` state. Entry which changed its type is
+            reported as removed and added.
+    """
+    old = {node.name: node for node in old or ()}
+    entries = []
+    for node in new:
+        previous = old.pop(node.name, None)
+        if previous and stat.S_IFMT(previous.stat.st_mode) == stat.S_IFMT(node.stat.st_mode):
+            entries.append((node, "same"))
+        else:
+            if previous:
+                entries.append((previous, "removed"))
+            entries.append((node, "added"))
+    entries.extend((node, "removed") for node in old.values())
+    entries.sort(key=lambda entry: _sort_key(entry[0]))
+    return entries
+
+def print_diff(path: str, index: "treeindex.TreeIndex", max_level: int | None = None,
+        out: typing.TextIO | None = None, color: bool | None = None):
+    """Print entries added or removed since the scan saved in the index.
 
+    Entries are printed in the tree order as paths marked with `+` or `-`.
+    Directories have trailing slash. Contents of the added and removed
+    directories are printed as well. All entries are added if index is empty.
+
+    Args:
+        path (str): Path to the directory.
+        index (TreeIndex): Index of the previous scan.
+        max_level (int or None): Max depth level for nested directories.
+        out (TextIO or None): Output stream. Standard output by default.
+        color (bool or None): Colorize marks with ANSI codes. By default
+            colors are used only if output is a terminal.
+
+    Raises:
+        OSError: If path can't be read.
+    """
+    out = out or sys.stdout
+    if color is None:
+        color = out.isatty()
+    colors = sinks.COLORS if color else sinks.NO_COLORS
+    marks = {"added": colors["added"] + "+ ", "removed": colors["removed"] + "- "}
+    writer = sinks.BatchWriter(out)
+    reader = _Reader(index.scan)
     try:
-        path = pathlib.Path(path)
-        # Get sorted list of directory nodes (directories first)
-        nodes = sorted(path.iterdir(), key=lambda node: (not node.is_dir(), node.name))
-        for node in nodes:
-            # Add visual branches
-            line = prefix
-            if node != nodes[-1]:
-                line += "├──" if draw_lines else "   "
+        # Stack holds lines and directories in the reversed output order.
+        # Directory is either compared with the index (`scan`) or listed from
+        # the index only (`removed`). Parent is closed when its last scanned
+        # subdirectory is opened.
+        stack = [("scan", Node(path, None, os.stat(path)), max_level, False)]
+        while stack:
+            item = stack.pop()
+            if item[0] == "line":
+                writer.write(item[1])
+                continue
+            action, directory, level, is_last = item
+            if action == "scan":
+                entries = _diff_level(index.previous(directory), reader(directory))
+                if is_last:
+                    reader.close(directory.parent)
             else:
-                line += "└──" if draw_lines else "   "
-
-            # Colorize nodes
-            if node.is_block_device():
-                line += Back.WHITE + Fore.YELLOW
-            elif node.is_char_device():
-                line += Back.WHITE + Fore.BLACK
-            elif node.is_fifo():
-                line += Back.WHITE + Fore.MAGENTA
-            elif node.is_socket():
-                line += Back.WHITE + Fore.BLUE
-            elif node.is_mount():
-                line += Back.BLUE + Fore.BLACK
-            elif node.is_dir():
-                line += Fore.BLUE
-            elif node.is_symlink():
-                line += Fore.CYAN if node.exists() else Fore.RED
-            elif node.is_file():
-                line += Fore.GREEN if os.access(node, os.X_OK) else Fore.RESET
-
-            print(line + node.name + Style.RESET_ALL, end="")
-
-            # Show "Permission denied" text for directories without read access
-            if node.is_dir() and not node.is_symlink():
-                if not os.access(node, os.R_OK):
-                    print(" : Permission denied", end="")
-
-            # Show destination for symbolic links
-            if node.is_symlink():
-                if node.exists():
-                    print(" -> " + node.readlink().name, end="")
-                else:
-                    print(" -> " + Fore.RED + node.readlink().name, end="")
-
-            print(Style.RESET_ALL)
-
-            # Go to the next level if allowed
-            if node.is_dir() and not node.is_symlink():
-                new_prefix = prefix + ("│  " if draw_lines else "   ")
-                if max_level == None:
-                    print_tree(node.absolute(), None, draw_lines, new_prefix)
-                elif max_level > 0:
-                    print_tree(node.absolute(), max_level - 1, draw_lines, new_prefix)
+                entries = [(node, "removed") for node in index.previous(directory) or ()]
+            next_level = None if level is None else level - 1
+            # Subdirectories are pushed in the reversed order
+            is_last = True
+            for node, state in reversed(entries):
+                if node.is_dir and (level is None or level > 0):
+                    if state == "removed":
+                        stack.append(("removed", node, next_level, False))
+                    elif has_access(node.stat, os.R_OK):
+                        stack.append(("scan", node, next_level, is_last))
+                        is_last = False
+                if state != "same":
+                    name = node.path + "/" if node.is_dir else node.path
+                    stack.append(("line", marks[state] + name + colors["reset"] + "\n"))
+            reader.keep(directory, not is_last)
     except OSError as e:
-        match e.errno:
-            case errno.ENOENT:
-                raise OSError(f"Path `{path}`: Doesn't exist.") from e
-            case errno.EACCES:
-                raise OSError(f"Path `{path}`: Permission denied.") from e
-            case errno.ENOTDIR:
-                raise OSError(f"Path `{path}`: Not a directory.") from e
-            case _:
-                raise OSError(f"Path `{path}` can't be read.\n{e}") from e
+        raise _path_error(e, path) from e
+    finally:
+        reader.close_all()
+        writer.flush()
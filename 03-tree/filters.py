@@ -0,0 +1,59 @@
+import fnmatch, re
+
+def compile_pattern(pattern: str, regex: bool = False) -> re.Pattern:
+    """Compile name pattern.
+
+    Args:
+        pattern (str): Glob pattern which must match the whole name or
+            regular expression which must match any part of it.
+        regex (bool): Pattern is a regular expression.
+
+    Returns:
+        re.Pattern: Compiled pattern.
+
+    Raises:
+        ValueError: If regular expression is invalid.
+    """
+    if not regex:
+        # Translated glob is anchored only at the end
+        return re.compile(r"\A" + fnmatch.translate(pattern))
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regular expression `{pattern}`: {e}.") from e
+
+class NodeFilter:
+    """Filter of the directory entries by name.
+
+    Excluded entries are dropped together with their subtrees, so excluded
+    directories are never listed. Include patterns apply to files only, so
+    directories are always traversed to find matching files.
+
+    Args:
+        include (list[re.Pattern]): Files must match at least one of the
+            patterns if any are specified.
+        exclude (list[re.Pattern]): Entries mustn't match any of the patterns.
+    """
+
+    def __init__(self, include: list[re.Pattern] = (), exclude: list[re.Pattern] = ()):
+        self._include = list(include)
+        self._exclude = list(exclude)
+
+    def __call__(self, node) -> bool:
+        """Check whether entry must be shown.
+
+        Args:
+            node (Node): Directory entry.
+
+        Returns:
+            bool: True if entry passes the filter.
+        """
+        name = node.name
+        if any(pattern.search(name) for pattern in self._exclude):
+            return False
+        if self._include and not node.is_dir:
+            return any(pattern.search(name) for pattern in self._include)
+        return True
+
+    def __bool__(self) -> bool:
+        return bool(self._include or self._exclude)
@@ -1,34 +1,75 @@
-import sys
-import core
+import pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import profiling
+import core, filters, sinks, treeindex
 
 MSG_HELP = """\
 DESCRIPTION:
     This script prints tree-like structure of the specified directory.
     If path argument isn't provided, then current directory is used.
-    Scan doesn't follow symbolic links.
+    Scan doesn't follow symbolic links. Nodes are colorized only if output is a terminal.
 
 USAGE:
     python main.py [ OPTIONS ] [ <path> ]
 
 FLAGS:
-    --draw-lines=<0|1>: Draw lines to visualize branches. Enabled by default.
-            -h, --help: Show this message.
-         --level=<int>: Maximum depth for recursive scan."""
+                         --diff: Print only entries added or removed since the scan saved in the
+                                 index. Requires --index flag. Can't be used with --sizes, --sort,
+                                 --top, --workers and name filters.
+             --draw-lines=<0|1>: Draw lines to visualize branches. Enabled by default.
+               --exclude=<glob>: Skip entries with matching names together with their subtrees. Can
+                                 be used several times.
+              --exclude-re=<re>: Same as --exclude, but with the regular expression.
+    --format=<text|json|binary>: Output format. `text` (default) is the colored tree. `json` writes
+                                 one JSON object per node (NDJSON). `binary` writes compact records
+                                 described in `sinks.BinarySink`. Directories which can't be read
+                                 are reported in the `error` field of the machine-readable formats.
+                     -h, --help: Show this message.
+               --include=<glob>: Show only files with matching names. Directories are always
+                                 scanned. Can be used several times.
+              --include-re=<re>: Same as --include, but with the regular expression.
+                 --index=<file>: Keep listings of the scanned directories in the index file. Only
+                                 directories changed since the previous run are re-listed.
+                  --level=<int>: Maximum depth for recursive scan.
+                      --profile: Print cProfile, tracemalloc and stage timing summaries to the
+                                 standard error on exit.
+                        --sizes: Show sizes of the files. Directories show total size, number of
+                                 files and the newest modification time of all nested entries.
+             --sort=<name|size>: Order of the entries. `name` puts directories first and is used by
+                                 default. `size` puts the largest entries first.
+                    --top=<int>: Show only N largest entries of each directory.
+                --workers=<int>: Number of threads which read directories ahead of the output. Helps
+                                 on network file systems. `0` means default pool size. Directories
+                                 are read one by one by default."""
 
 MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
 MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_MIX = "ERROR: --diff flag requires --index flag and text format."
+MSG_BAD_DIFF_MIX = "ERROR: --diff and {} flags can't be used together."
 
 def main():
     path = ""
     level = None
     draw_lines = True
+    workers = None
+    index_path = ""
+    diff = False
+    sizes = False
+    sort = "name"
+    top = None
+    include = []
+    exclude = []
+    output_format = "text"
     # If argument was passed to the script
     for arg in sys.argv[1:]:
         if arg == "-h" or arg == "--help":
             print(MSG_HELP)
             return
 
-        if arg.startswith("--draw-lines="):
+        if arg == "--diff":
+            diff = True
+        elif arg.startswith("--draw-lines="):
             _, draw_lines = arg.split("=", 1)
             if not draw_lines.isascii() or not draw_lines.isdigit():
                 print(MSG_BAD_FLAG_VAL)
@@ -38,29 +79,92 @@ def main():
                 print(MSG_BAD_FLAG_VAL)
                 return -1
             draw_lines = bool(draw_lines)
+        elif arg.startswith(("--exclude=", "--exclude-re=", "--include=", "--include-re=")):
+            key, pattern = arg[2:].split("=", 1)
+            try:
+                pattern = filters.compile_pattern(pattern, key.endswith("-re"))
+            except ValueError:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            (include if key.startswith("include") else exclude).append(pattern)
+        elif arg.startswith("--format="):
+            _, output_format = arg.split("=", 1)
+            if output_format not in ("text", "json", "binary"):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--index="):
+            _, index_path = arg.split("=", 1)
+            if not index_path:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
         elif arg.startswith("--level="):
             _, level = arg.split("=", 1)
             if not level.isascii() or not level.isdigit():
                 print(MSG_BAD_FLAG_VAL)
                 return -1
             level = int(level)
+        elif arg == "--sizes":
+            sizes = True
+        elif arg.startswith("--sort="):
+            _, sort = arg.split("=", 1)
+            if sort not in core.SORT_MODES:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--top="):
+            _, top = arg.split("=", 1)
+            if not top.isascii() or not top.isdigit():
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            top = int(top)
+        elif arg.startswith("--workers="):
+            _, workers = arg.split("=", 1)
+            if not workers.isascii() or not workers.isdigit():
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            workers = int(workers)
         elif not arg.startswith("-"):
             path = arg
         else:
             print(MSG_BAD_FLAG_KEY)
             return -1
 
+    if diff and (not index_path or output_format != "text"):
+        print(MSG_BAD_FLAG_MIX)
+        return -1
+    # Diff lists paths of the changed entries in name order
+    for flag, is_used in (("--sizes", sizes), ("--sort", sort != "name"),
+            ("--top", top is not None), ("--workers", workers is not None),
+            ("--include", bool(include)), ("--exclude", bool(exclude))):
+        if diff and is_used:
+            print(MSG_BAD_DIFF_MIX.format(flag))
+            return -1
+
     # Fallback to current directory if path wasn't provided
     if not path:
         path = "."
 
     # Perform output
     try:
-        core.print_tree(path, level, draw_lines)
+        index = treeindex.TreeIndex(index_path, path) if index_path else None
+        node_filter = filters.NodeFilter(include, exclude)
+        if diff:
+            core.print_diff(path, index, level)
+        elif output_format == "text":
+            core.print_tree(path, level, draw_lines, workers=workers, index=index, sizes=sizes,
+                sort=sort, top=top, node_filter=node_filter)
+        else:
+            if output_format == "json":
+                sink = sinks.JsonSink(sys.stdout)
+            else:
+                sink = sinks.BinarySink(sys.stdout.buffer)
+            core.write_tree(sink, path, level, workers, index, sizes, sort, top, node_filter,
+                skip_errors=True)
+        if index:
+            index.save()
     except OSError as e:
         print("ERROR:", e)
         return -1
     return
 
 if __name__ == "__main__":
-    main()
+    profiling.run(main)
@@ -0,0 +1,319 @@
+import json, pathlib, struct, time, typing
+from colorama import Back, Fore, Style
+
+# Color codes of the node kinds
+COLORS = {
+    "block": Back.WHITE + Fore.YELLOW,
+    "char": Back.WHITE + Fore.BLACK,
+    "fifo": Back.WHITE + Fore.MAGENTA,
+    "socket": Back.WHITE + Fore.BLUE,
+    "mount": Back.BLUE + Fore.BLACK,
+    "dir": Fore.BLUE,
+    "link": Fore.CYAN,
+    "broken": Fore.RED,
+    "exec": Fore.GREEN,
+    "file": Fore.RESET,
+    "other": "",
+    "added": Fore.GREEN,
+    "removed": Fore.RED,
+    "reset": Style.RESET_ALL,
+}
+NO_COLORS = dict.fromkeys(COLORS, "")
+# Node kinds in the order of their codes in the binary stream
+KINDS = ("dir", "mount", "file", "exec", "link", "broken", "block", "char", "fifo", "socket",
+    "other")
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+SIZE_UNITS = ("B", "KiB", "MiB", "GiB", "TiB", "PiB")
+# Number of records which are joined into a single write
+WRITE_BATCH_SIZE = 4096
+
+BINARY_MAGIC = b"TREEV1\0\0"
+# Depth, kind, flags, size, mtime (ns), number of files and path size
+BINARY_RECORD = struct.Struct("<IBBQqQI")
+BINARY_STRING_SIZE = struct.Struct("<I")
+FLAG_LAST = 1
+FLAG_FILES = 2
+FLAG_TARGET = 4
+FLAG_ERROR = 8
+
+class NodeEvent:
+    """Typed record of the tree node produced by the traversal.
+
+    Attributes:
+        path (str): Path to the node. Producer can pass the function which
+            builds it, then it's called on the first access.
+        name (str): Node name. It's the path for the root node.
+        depth (int): Depth level. Root node has zero depth.
+        kind (str): Node kind from `KINDS`. Symbolic links are followed, so
+            link to the directory has `dir` kind.
+        size (int or None): Size in bytes. It's the total size of the nested
+            files for the directories if totals are calculated.
+        mtime_ns (int or None): Modification time. It's the newest time of
+            the nested entries for the directories if totals are calculated.
+        files (int or None): Number of the nested files if totals are
+            calculated for the directory.
+        target (str or None): Destination of the symbolic link.
+        error (str or None): Reason why directory wasn't scanned.
+        is_last (bool): Node is the last entry of its directory.
+    """
+
+    FIELDS = ("path", "name", "depth", "kind", "size", "mtime_ns", "files", "target", "error",
+        "is_last")
+    __slots__ = ("_path",) + FIELDS[1:]
+
+    def __init__(self, path: str | typing.Callable[[], str], name: str, depth: int, kind: str,
+            size: int | None = None, mtime_ns: int | None = None, files: int | None = None,
+            target: str | None = None, error: str | None = None, is_last: bool = True):
+        self._path = path
+        self.name = name
+        self.depth = depth
+        self.kind = kind
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.files = files
+        self.target = target
+        self.error = error
+        self.is_last = is_last
+
+    @property
+    def path(self) -> str:
+        if not isinstance(self._path, str):
+            self._path = self._path()
+        return self._path
+
+    def to_dict(self) -> dict:
+        """Convert event into the dict."""
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, NodeEvent):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"NodeEvent({self.to_dict()!r})"
+
+def format_size(size: int) -> str:
+    """Format size in bytes with binary units.
+
+    Args:
+        size (int): Size in bytes.
+
+    Returns:
+        str: Formatted size, e.g. `1.5 KiB`.
+    """
+    if size < 1024:
+        return f"{size} B"
+    value = float(size)
+    for unit in SIZE_UNITS[1:]:
+        value /= 1024
+        if value < 1024 or unit == SIZE_UNITS[-1]:
+            return f"{value:.1f} {unit}"
+
+class BatchWriter:
+    """Joins records and writes them to the stream in large batches.
+
+    Args:
+        out (TextIO or BinaryIO): Output stream.
+        binary (bool): Records are bytes.
+    """
+
+    __slots__ = ("_out", "_records", "_empty")
+
+    def __init__(self, out: typing.TextIO | typing.BinaryIO, binary: bool = False):
+        self._out = out
+        self._records = []
+        self._empty = b"" if binary else ""
+
+    def write(self, record: str | bytes):
+        self._records.append(record)
+        if len(self._records) >= WRITE_BATCH_SIZE:
+            self._out.write(self._empty.join(self._records))
+            self._records.clear()
+
+    def flush(self):
+        self._out.write(self._empty.join(self._records))
+        self._records.clear()
+        self._out.flush()
+
+class TextSink:
+    """Renders events as the colored tree with box-drawing branches.
+
+    Args:
+        out (TextIO): Output stream.
+        draw_lines (bool): Draw lines to visualize branches.
+        color (bool or None): Colorize nodes with ANSI codes. By default
+            colors are used only if output is a terminal.
+        prefix (str): Prefix of the nested lines. Root node isn't printed if
+            it's specified.
+        sizes (bool): Show sizes of the files and totals of the directories.
+    """
+
+    def __init__(self, out: typing.TextIO, draw_lines: bool = True, color: bool | None = None,
+            prefix: str = "", sizes: bool = False):
+        self._writer = BatchWriter(out)
+        self._colors = COLORS if (out.isatty() if color is None else color) else NO_COLORS
+        self._branch, self._last_branch = ("├──", "└──") if draw_lines else ("   ", "   ")
+        self._indent = "│  " if draw_lines else "   "
+        self._sizes = sizes
+        self._prefix = prefix
+        # Line prefix of the last depth. Prefixes of all depths aren't kept,
+        # since their total size grows quadratically on deep trees.
+        self._depth = 1
+        self._line_prefix = prefix
+
+    def _format_sizes(self, event: NodeEvent) -> str:
+        """Format size of the file or totals of the directory."""
+        if event.files is not None:
+            mtime = time.strftime("%Y-%m-%d %H:%M", time.localtime(event.mtime_ns / 10 ** 9)) \
+                if event.mtime_ns else "-"
+            return f" ({format_size(event.size)}, {event.files} files, newest {mtime})"
+        if event.size is not None and (event.kind not in ("dir", "mount") or event.target):
+            return f" ({format_size(event.size)})"
+        return ""
+
+    def write(self, event: NodeEvent):
+        colors = self._colors
+        reset = colors["reset"]
+        if not event.depth:
+            if not self._prefix:
+                line = colors["dir"] + event.name + reset
+                if self._sizes:
+                    line += reset + self._format_sizes(event)
+                self._writer.write(line + "\n")
+            return
+
+        if event.depth != self._depth:
+            self._depth = event.depth
+            self._line_prefix = self._prefix + self._indent * (event.depth - 1)
+        # Add visual branches and colorize nodes
+        line = self._line_prefix \
+            + (self._last_branch if event.is_last else self._branch) \
+            + colors[event.kind] + event.name + reset
+
+        # Show the reason why directory isn't scanned, e.g. "Permission
+        # denied"
+        if event.error:
+            line += " : " + event.error
+
+        # Show destination for symbolic links
+        if event.target is not None:
+            target = pathlib.PurePath(event.target).name
+            line += " -> " + (colors["broken"] + target if event.kind == "broken" else target)
+
+        if self._sizes:
+            line += reset + self._format_sizes(event)
+        self._writer.write(line + reset + "\n")
+
+    def close(self):
+        self._writer.flush()
+
+class JsonSink:
+    """Writes events as newline-delimited JSON objects.
+
+    Every object has all `NodeEvent` attributes except `is_last`. Kind is
+    written as `type`. Undecodable file names are kept as lone surrogate
+    escapes, so they round-trip in Python.
+
+    Args:
+        out (TextIO): Output stream.
+    """
+
+    def __init__(self, out: typing.TextIO):
+        self._writer = BatchWriter(out)
+
+    def write(self, event: NodeEvent):
+        self._writer.write(json.dumps({
+            "path": event.path,
+            "name": event.name,
+            "depth": event.depth,
+            "type": event.kind,
+            "size": event.size,
+            "mtime_ns": event.mtime_ns,
+            "files": event.files,
+            "target": event.target,
+            "error": event.error,
+        }) + "\n")
+
+    def close(self):
+        self._writer.flush()
+
+def _encode(value: str) -> bytes:
+    """Encode string with its size prefix."""
+    value = value.encode("utf-8", errors="surrogateescape")
+    return BINARY_STRING_SIZE.pack(len(value)) + value
+
+class BinarySink:
+    """Writes events as the compact binary record stream.
+
+    Stream starts with `BINARY_MAGIC`. Every record is `BINARY_RECORD`
+    (little-endian depth, kind code from `KINDS`, flags, size, mtime in ns,
+    number of files and path size) followed by UTF-8 path and, if flagged,
+    size-prefixed target and error. Missing numbers are written as zeros.
+    Read the stream with `iter_binary_events()`.
+
+    Args:
+        out (BinaryIO): Output stream.
+    """
+
+    def __init__(self, out: typing.BinaryIO):
+        self._writer = BatchWriter(out, binary=True)
+        self._writer.write(BINARY_MAGIC)
+
+    def write(self, event: NodeEvent):
+        flags = FLAG_LAST if event.is_last else 0
+        tail = b""
+        if event.files is not None:
+            flags |= FLAG_FILES
+        if event.target is not None:
+            flags |= FLAG_TARGET
+            tail += _encode(event.target)
+        if event.error is not None:
+            flags |= FLAG_ERROR
+            tail += _encode(event.error)
+        path = event.path.encode("utf-8", errors="surrogateescape")
+        self._writer.write(BINARY_RECORD.pack(event.depth, KIND_CODES[event.kind], flags,
+            event.size or 0, event.mtime_ns or 0, event.files or 0, len(path)) + path + tail)
+
+    def close(self):
+        self._writer.flush()
+
+def iter_binary_events(fh: typing.BinaryIO):
+    """Read events written by `BinarySink`.
+
+    Names are restored from paths. Root name is the whole path.
+
+    Args:
+        fh (BinaryIO): Input stream.
+
+    Yields:
+        NodeEvent: Node event.
+
+    Raises:
+        ValueError: If stream has invalid format.
+    """
+    if fh.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError("Stream isn't a tree binary stream.")
+
+    def read(size: int) -> bytes:
+        data = fh.read(size)
+        if len(data) != size:
+            raise ValueError("Tree binary stream is truncated.")
+        return data
+
+    def read_string() -> str:
+        size, = BINARY_STRING_SIZE.unpack(read(BINARY_STRING_SIZE.size))
+        return read(size).decode("utf-8", errors="surrogateescape")
+
+    while header := fh.read(BINARY_RECORD.size):
+        if len(header) != BINARY_RECORD.size:
+            raise ValueError("Tree binary stream is truncated.")
+        depth, code, flags, size, mtime_ns, files, path_size = BINARY_RECORD.unpack(header)
+        if code >= len(KINDS):
+            raise ValueError(f"Unknown node kind code {code}.")
+        path = read(path_size).decode("utf-8", errors="surrogateescape")
+        target = read_string() if flags & FLAG_TARGET else None
+        error = read_string() if flags & FLAG_ERROR else None
+        yield NodeEvent(path, pathlib.PurePath(path).name if depth else path, depth, KINDS[code],
+            size, mtime_ns, files if flags & FLAG_FILES else None, target, error,
+            bool(flags & FLAG_LAST))
@@ -0,0 +1,129 @@
+import io, os, tempfile, unittest
+from unittest import mock
+import core
+
+# Depth of the generated chain. Its paths are far longer than `PATH_MAX`.
+DEPTH = 10_000
+
+def make_chain(root: str, depth: int, names: tuple = ("d",)):
+    """Create nested directories `d` with file `f` at every level.
+
+    Directories are created relative to the descriptors, since their paths
+    can't be resolved. Extra names are created as empty sibling directories.
+    """
+    fd = os.open(root, os.O_RDONLY)
+    try:
+        for _ in range(depth):
+            for name in names:
+                os.mkdir(name, dir_fd=fd)
+            os.close(os.open("f", os.O_WRONLY | os.O_CREAT, dir_fd=fd))
+            next_fd = os.open(names[0], os.O_RDONLY, dir_fd=fd)
+            os.close(fd)
+            fd = next_fd
+    finally:
+        os.close(fd)
+
+def remove_chain(root: str, names: tuple = ("d",)):
+    """Remove the chain created by `make_chain()` level by level.
+
+    Nested directory is moved up before its parent is removed, so paths stay
+    short and recursion isn't needed.
+    """
+    fd = os.open(root, os.O_RDONLY)
+    try:
+        while "d" in os.listdir(fd):
+            child_fd = os.open("d", os.O_RDONLY, dir_fd=fd)
+            try:
+                # The deepest directory is empty
+                if "f" in os.listdir(child_fd):
+                    os.unlink("f", dir_fd=child_fd)
+                    for name in names[1:]:
+                        os.rmdir(name, dir_fd=child_fd)
+                    os.rename("d", "next", src_dir_fd=child_fd, dst_dir_fd=fd)
+            finally:
+                os.close(child_fd)
+            os.rmdir("d", dir_fd=fd)
+            if "next" in os.listdir(fd):
+                os.rename("next", "d", src_dir_fd=fd, dst_dir_fd=fd)
+        os.unlink("f", dir_fd=fd)
+        for name in names[1:]:
+            os.rmdir(name, dir_fd=fd)
+    finally:
+        os.close(fd)
+
+def render(path: str, **kwargs) -> list[str]:
+    """Print the tree without colors and split it into lines."""
+    out = io.StringIO()
+    core.print_tree(path, out=out, color=False, **kwargs)
+    return out.getvalue().splitlines()
+
+def open_fds() -> int:
+    """Count descriptors of the process."""
+    return len(os.listdir("/proc/self/fd"))
+
+@unittest.skipUnless(core.DIR_FD, "platform can't open files relative to the directory")
+class DeepTreeTest(unittest.TestCase):
+    """Tree deeper than the max path length is walked by descriptors."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.root = cls.temp_dir.name
+        make_chain(cls.root, DEPTH)
+        cls.lines = render(cls.root, draw_lines=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        remove_chain(cls.root)
+        cls.temp_dir.cleanup()
+
+    def test_renders_whole_depth(self):
+        # Root, every directory and every file
+        self.assertEqual(len(self.lines), 1 + 2 * DEPTH)
+        self.assertEqual(self.lines[DEPTH], "   " * DEPTH + "d")
+        self.assertEqual(self.lines[DEPTH + 1], "   " * DEPTH + "f")
+        self.assertEqual(self.lines[-1], "   f")
+
+    def test_modes_render_the_same(self):
+        self.assertEqual(render(self.root, draw_lines=False, workers=4), self.lines)
+        lines = render(self.root, draw_lines=False, sizes=True)
+        self.assertEqual(len(lines), len(self.lines))
+        self.assertTrue(lines[-1].startswith("   f"))
+
+    def test_paths_are_built_on_access(self):
+        events = list(core.iter_events(self.root))
+        self.assertEqual(events[DEPTH].path, os.path.join(self.root, *["d"] * DEPTH))
+
+class DescriptorsTest(unittest.TestCase):
+    """Directories closed because of the limit are reopened from the parents."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        # Every level has pending sibling, so every parent keeps descriptor
+        make_chain(self.root, 30, ("d", "e"))
+
+    def tearDown(self):
+        remove_chain(self.root, ("d", "e"))
+        self.temp_dir.cleanup()
+
+    def test_limit_doesnt_change_output(self):
+        lines = render(self.root)
+        with mock.patch.object(core, "MAX_OPEN_DIRS", 1):
+            self.assertEqual(render(self.root), lines)
+            self.assertEqual(render(self.root, workers=4), lines)
+
+    @unittest.skipUnless(os.path.isdir("/proc/self/fd"), "descriptors can't be counted")
+    def test_descriptors_are_closed(self):
+        before = open_fds()
+        render(self.root, workers=4)
+        self.assertEqual(open_fds(), before)
+        events = core.iter_events(self.root, workers=4)
+        for _ in range(10):
+            next(events)
+        self.assertGreater(open_fds(), before)
+        events.close()
+        self.assertEqual(open_fds(), before)
+
+if __name__ == "__main__":
+    unittest.main()
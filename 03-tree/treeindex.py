@@ -0,0 +1,138 @@
+import json, os, stat, time
+import core
+
+INDEX_VERSION = 1
+# Directories changed shortly before the scan can be changed again within the
+# same mtime tick (up to 2s on FAT), so they are always re-listed next time
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+def _node_record(node: core.Node) -> list:
+    """Convert node into the JSON-friendly record."""
+    st = node.stat
+    target_mode = node.target_stat.st_mode if node.target_stat else None
+    return [node.name, st.st_mode, st.st_ino, st.st_dev, st.st_nlink, st.st_uid, st.st_gid,
+        st.st_size, st.st_mtime_ns, node.target, target_mode]
+
+def _make_stat(mode: int, ino: int = 0, dev: int = 0, nlink: int = 0, uid: int = 0, gid: int = 0,
+        size: int = 0, mtime_ns: int = 0) -> os.stat_result:
+    """Build stat result from the indexed fields. Access and change times
+    aren't indexed and are set to the modification time."""
+    mtime = mtime_ns // 10 ** 9
+    return os.stat_result((mode, ino, dev, nlink, uid, gid, size, mtime, mtime, mtime), {
+        "st_atime": mtime_ns / 10 ** 9, "st_mtime": mtime_ns / 10 ** 9,
+        "st_ctime": mtime_ns / 10 ** 9, "st_atime_ns": mtime_ns, "st_mtime_ns": mtime_ns,
+        "st_ctime_ns": mtime_ns})
+
+class TreeIndex:
+    """Persistent index of the directory listings.
+
+    Index keeps mtime, inode and entries metadata of every scanned directory.
+    Directory is re-listed only if its mtime or inode has changed, so cost of
+    the unchanged directory is a single `stat()` call. Note that mtime of the
+    directory isn't updated if its entries are only modified (not added,
+    removed or renamed), so their cached metadata can be outdated.
+
+    Only directories scanned by the current run are saved, so the index
+    always reflects the last printed tree.
+
+    Args:
+        path (str): Path to the index file. Missing, broken or foreign index
+            is treated as empty.
+        root (str): Path to the scanned directory.
+    """
+
+    def __init__(self, path: str, root: str):
+        self.path = path
+        self._root = root
+        self._previous = self._load()
+        self._current = {}
+        self._started_ns = time.time_ns()
+
+    def _load(self) -> dict:
+        """Read directories of the previous scan from the index file."""
+        try:
+            with open(self.path, mode="r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data["version"] == INDEX_VERSION and data["root"] == os.path.abspath(self._root):
+                return data["dirs"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return {}
+
+    def _key(self, directory: core.Node) -> str:
+        return os.path.relpath(directory.path, self._root)
+
+    def _nodes(self, directory: core.Node, record: list) -> list[core.Node]:
+        """Restore directory entries from the index record."""
+        device = record[2]
+        nodes = []
+        for name, mode, ino, dev, nlink, uid, gid, size, mtime_ns, target, target_mode \
+                in record[3]:
+            node = core.Node(name, directory,
+                _make_stat(mode, ino, dev, nlink, uid, gid, size, mtime_ns), target)
+            if target_mode is not None:
+                node.target_stat = _make_stat(target_mode)
+            node.is_mount = stat.S_ISDIR(mode) and dev != device
+            nodes.append(node)
+        return nodes
+
+    def previous(self, directory: core.Node) -> list[core.Node] | None:
+        """Get directory entries saved by the previous scan.
+
+        Args:
+            directory (Node): Directory.
+
+        Returns:
+            list[Node] or None: Directory entries or None if directory isn't
+                indexed.
+        """
+        record = self._previous.get(self._key(directory))
+        return None if record is None else self._nodes(directory, record)
+
+    def scan(self, directory: core.Node, handle: int | str) -> list[core.Node]:
+        """Read directory entries from the index or from the file system.
+
+        Drop-in replacement of `core.scan_dir()`. It's thread-safe.
+
+        Args:
+            directory (Node): Directory which becomes the parent of the
+                entries.
+            handle (int or str): Descriptor of the open directory or its
+                path.
+
+        Returns:
+            list[Node]: Directory entries.
+
+        Raises:
+            OSError: If directory can't be read.
+        """
+        st = os.stat(handle)
+        key = self._key(directory)
+        record = self._previous.get(key)
+        if record and record[0] == st.st_mtime_ns and record[1] == st.st_ino \
+                and record[2] == st.st_dev:
+            self._current[key] = record
+            return self._nodes(directory, record)
+
+        # Directory is stat'ed before it's listed, so changes made in the
+        # meantime are detected by the next run
+        nodes = core.scan_dir(directory, handle)
+        mtime_ns = st.st_mtime_ns if st.st_mtime_ns < self._started_ns - RACY_WINDOW_NS else None
+        self._current[key] = [mtime_ns, st.st_ino, st.st_dev, [_node_record(n) for n in nodes]]
+        return nodes
+
+    def save(self):
+        """Write directories scanned by the current run to the index file.
+
+        Raises:
+            OSError: If index can't be written.
+        """
+        data = {"version": INDEX_VERSION, "root": os.path.abspath(self._root),
+            "dirs": self._current}
+        try:
+            # Replace index atomically, so it's never left half-written
+            with open(self.path + ".tmp", mode="w", encoding="utf-8") as fh:
+                json.dump(data, fh, separators=(",", ":"))
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            raise OSError(f"Index `{self.path}` can't be written.") from e
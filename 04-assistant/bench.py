@@ -0,0 +1,144 @@
+import os, pathlib, random, sys, tempfile, time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import datagen
+import core, search, storage
+
+MSG_HELP = """\
+DESCRIPTION:
+    This script measures latency of the contact book operations on both storages while the book
+    grows. Latency of every operation must stay nearly flat, since lookups are O(1) in memory and
+    O(log n) in SQLite. Book is filled in steps up to the specified size. Temporary database is
+    used if database path isn't provided.
+
+USAGE:
+    python bench.py [ OPTIONS ]
+
+FLAGS:
+     --db=<file>: SQLite database file. It must not exist.
+      -h, --help: Show this message.
+     --ops=<int>: Number of timed operations of every kind per step. 2000 by default.
+    --size=<int>: Number of persons in the final book. 1000000 by default."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
+# Number of persons inserted by a single transaction while filling the book
+FILL_BATCH_SIZE = 10_000
+# Book size is multiplied by this factor on every step
+STEP_FACTOR = 10
+
+def fill(backend, start: int, stop: int):
+    """Add persons from `datagen.person()` with a phone and an email each.
+    SQLite storage is filled directly in large transactions, since
+    committing every contact would measure only the disk."""
+    if isinstance(backend, storage.MemoryStorage):
+        for name, phone, email in map(datagen.person, range(start, stop)):
+            backend.add(name, "phone", phone)
+            backend.add(name, "email", email)
+        return
+
+    db = backend._db
+    for batch in range(start, stop, FILL_BATCH_SIZE):
+        persons = [(i + 1, *datagen.person(i))
+            for i in range(batch, min(batch + FILL_BATCH_SIZE, stop))]
+        with db:
+            db.executemany("INSERT INTO persons (id, name) VALUES (?, ?)",
+                ((person_id, name) for person_id, name, _, _ in persons))
+            db.executemany("INSERT INTO phones (person_id, value) VALUES (?, ?)",
+                ((person_id, phone) for person_id, _, phone, _ in persons))
+            db.executemany("INSERT INTO emails (person_id, value, domain) VALUES (?, ?, ?)",
+                ((person_id, email, storage.email_domain(email))
+                    for person_id, _, _, email in persons))
+            db.executemany("INSERT INTO name_keys (key, person_id) VALUES (?, ?)",
+                ((key, person_id) for person_id, name, _, _ in persons
+                    for key in search.name_keys(name)))
+
+def measure(size: int, ops: int) -> dict:
+    """Time every core operation on random persons of the book.
+
+    Returns:
+        dict: Mean latency in microseconds by operation name.
+    """
+    persons = [datagen.person(random.randrange(size)) for _ in range(ops)]
+    results = {}
+    for op, func in (
+            ("add", lambda name, email: core.add_contact(name, "1")),
+            ("phone", lambda name, email: core.show_phone(name)),
+            ("email", lambda name, email: core.show_email(name)),
+            ("owner", lambda name, email: core.find_owners(email)),
+            ("find", lambda name, email: core.find_persons(name[:-1])),
+            # Typo: swapped characters
+            ("similar", lambda name, email: core.find_similar("preson" + name[6:])),
+            ("change", lambda name, email: core.change_contact(name, "2")),
+            ("delete", lambda name, email: core.delete_contact(name, "2"))):
+        started = time.perf_counter()
+        for name, _, email in persons:
+            try:
+                func(name, email)
+            except ValueError:
+                # Person can be picked twice
+                pass
+        results[op] = (time.perf_counter() - started) / ops * 10 ** 6
+    return results
+
+def main():
+    db_path = ""
+    ops = 2000
+    size = 1_000_000
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        if arg.startswith("--db="):
+            _, db_path = arg.split("=", 1)
+        elif arg.startswith("--ops=") or arg.startswith("--size="):
+            key, value = arg.split("=", 1)
+            if not value.isascii() or not value.isdigit() or not int(value):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            if key == "--ops":
+                ops = int(value)
+            else:
+                size = int(value)
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    if db_path and os.path.exists(db_path):
+        print(f"ERROR: Database `{db_path}` already exists.")
+        return -1
+
+    temp_dir = tempfile.TemporaryDirectory()
+    db_path = db_path or os.path.join(temp_dir.name, "bench.db")
+    random.seed(0)
+    try:
+        for backend in (storage.MemoryStorage(), storage.SqliteStorage(db_path)):
+            core.set_backend(backend)
+            print(f"{type(backend).__name__}, mean latency (µs):")
+            filled = 0
+            step = min(size, 1000)
+            while filled < size:
+                fill(backend, filled, step)
+                filled = step
+                # Search indexes of the memory storage are built on demand
+                started = time.perf_counter()
+                core.find_persons("", 1)
+                core.find_similar("", 1)
+                indexed = time.perf_counter() - started
+                results = measure(filled, ops)
+                print(f"{filled:>10} persons: " + ", ".join(
+                    f"{op}={value:.1f}" for op, value in results.items())
+                    + f" (search indexes ready in {indexed:.2f}s)")
+                step = min(size, step * STEP_FACTOR)
+            backend.close()
+    except OSError as e:
+        print("ERROR:", e)
+        return -1
+    finally:
+        temp_dir.cleanup()
+    return
+
+if __name__ == "__main__":
+    sys.exit(main())
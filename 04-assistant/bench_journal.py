@@ -0,0 +1,131 @@
+import os, pathlib, sys, tempfile, time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import datagen
+import storage
+
+MSG_HELP = """\
+DESCRIPTION:
+    This script measures durability costs of the journal storage. First it generates the
+    operation log and measures recovery time: replay of the whole log and load of its compacted
+    snapshot. Then it measures mutation throughput under every fsync policy, when every
+    mutation is committed alone and when mutations are committed in groups. Place files on the
+    real disk, since fsync on tmpfs costs nothing.
+
+USAGE:
+    python bench_journal.py [ OPTIONS ]
+
+FLAGS:
+          --dir=<path>: Directory for the files. Temporary directory by default.
+            -h, --help: Show this message.
+    --mutations=<int>: Number of mutations per fsync policy. 20000 by default.
+          --ops=<int>: Number of operations in the generated log. 10000000 by default."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
+# Number of operations per commit of the generated log
+LOG_GROUP_SIZE = 1000
+# Storage methods and their operations in the log
+LOG_OPS = {"add": "+", "replace": "=", "remove": "-"}
+# Number of mutations per commit of the grouped run
+GROUP_SIZE = 100
+# Fsync policies: name and interval in seconds
+POLICIES = (("always", 0), ("10ms", 0.01), ("never", None))
+
+def generate_log(path: str, ops: int):
+    """Write the log of mutations from `datagen.iter_mutations()`."""
+    with open(path, mode="w", encoding="utf-8", newline="\n") as fh:
+        fh.write("LOG 0\n")
+        lines = []
+        for method, name, kind, value in datagen.iter_mutations(ops):
+            lines.append(f"{LOG_OPS[method]}\t{name}\t{storage.KIND_CODES[kind]}\t{value}\n")
+            if len(lines) == LOG_GROUP_SIZE:
+                lines.append("\n")
+                fh.write("".join(lines))
+                lines.clear()
+        if lines:
+            lines.append("\n")
+            fh.write("".join(lines))
+
+def measure_recovery(directory: str, ops: int):
+    """Print time of the log replay and of the snapshot load."""
+    path = os.path.join(directory, "recovery.log")
+    started = time.perf_counter()
+    generate_log(path, ops)
+    print(f"Generated {ops} operations ({os.path.getsize(path) / 2 ** 20:.0f} MiB) in "
+        f"{time.perf_counter() - started:.2f}s.")
+
+    started = time.perf_counter()
+    book = storage.JournalStorage(path, snapshot_size=2 ** 62)
+    elapsed = time.perf_counter() - started
+    print(f"Replayed log in {elapsed:.2f}s ({ops / elapsed:.0f} operations/s), "
+        f"{len(book.persons)} persons.")
+
+    started = time.perf_counter()
+    book.snapshot()
+    book.close()
+    print(f"Compacted snapshot in {time.perf_counter() - started:.2f}s "
+        f"({os.path.getsize(path + '.snapshot') / 2 ** 20:.0f} MiB).")
+
+    started = time.perf_counter()
+    book = storage.JournalStorage(path)
+    print(f"Loaded snapshot in {time.perf_counter() - started:.2f}s.")
+    book.close()
+
+def measure_throughput(directory: str, mutations: int):
+    """Print mutation throughput under every fsync policy."""
+    for name, fsync in POLICIES:
+        results = []
+        for group in (1, GROUP_SIZE):
+            path = os.path.join(directory, f"{name}-{group}.log")
+            book = storage.JournalStorage(path, fsync)
+            started = time.perf_counter()
+            for batch in range(0, mutations, group):
+                with book.transaction():
+                    for i in range(batch, min(batch + group, mutations)):
+                        person_name, phone, _ = datagen.person(i)
+                        book.add(person_name, "phone", phone)
+            book.close()
+            results.append(mutations / (time.perf_counter() - started))
+        print(f"fsync={name:>6}: {results[0]:>9.0f} mutations/s single, "
+            f"{results[1]:>9.0f} mutations/s in groups of {GROUP_SIZE}")
+
+def main():
+    directory = ""
+    ops = 10_000_000
+    mutations = 20_000
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        if arg.startswith("--dir="):
+            _, directory = arg.split("=", 1)
+            if not os.path.isdir(directory):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--ops=") or arg.startswith("--mutations="):
+            key, value = arg.split("=", 1)
+            if not value.isascii() or not value.isdigit() or not int(value):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            if key == "--ops":
+                ops = int(value)
+            else:
+                mutations = int(value)
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    try:
+        with tempfile.TemporaryDirectory(dir=directory or None) as temp_dir:
+            measure_recovery(temp_dir, ops)
+            measure_throughput(temp_dir, mutations)
+    except OSError as e:
+        print("ERROR:", e)
+        return -1
+    return
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import gc, pathlib, sys, time, tracemalloc
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import datagen
+import storage
+
+MSG_HELP = """\
+DESCRIPTION:
+    This script measures memory taken by the in-memory contact book and compares it with the
+    legacy layout, where every person was a dict of two sets, phones were boxed ints and every
+    contact referred to the set of its owners. Every person has a phone and an email. Memory is
+    traced by `tracemalloc`. Names and input values are allocated before tracing, since they're
+    shared by both layouts.
+
+USAGE:
+    python bench_memory.py [ OPTIONS ]
+
+FLAGS:
+      -h, --help: Show this message.
+    --size=<int>: Number of persons in the book. 1000000 by default."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
+def fill_legacy(names: list, phones: list, emails: list) -> tuple:
+    """Build the book with the legacy layout."""
+    persons = {}
+    owners = {"phone": {}, "email": {}}
+    domains = {}
+    for name, phone, email in zip(names, phones, emails):
+        person = persons[name] = {"phones": set(), "emails": set()}
+        phone = int(phone)
+        person["phones"].add(phone)
+        owners["phone"].setdefault(phone, set()).add(name)
+        person["emails"].add(email)
+        owners["email"].setdefault(email, set()).add(name)
+        names_at_domain = domains.setdefault(storage.email_domain(email), {})
+        names_at_domain[name] = names_at_domain.get(name, 0) + 1
+    return persons, owners, domains
+
+def fill_compact(names: list, phones: list, emails: list) -> storage.MemoryStorage:
+    """Build the book with `MemoryStorage`."""
+    book = storage.MemoryStorage()
+    for name, phone, email in zip(names, phones, emails):
+        book.add(name, "phone", phone)
+        book.add(name, "email", email)
+    return book
+
+def measure(fill, names: list, phones: list, emails: list) -> tuple[int, float]:
+    """Build the book and trace its memory.
+
+    Returns:
+        tuple[int, float]: Size of the book in bytes and build time in
+            seconds.
+    """
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    book = fill(names, phones, emails)
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del book
+    return size, elapsed
+
+def main():
+    size = 1_000_000
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        if arg.startswith("--size="):
+            _, value = arg.split("=", 1)
+            if not value.isascii() or not value.isdigit() or not int(value):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            size = int(value)
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    names, phones, emails = (list(values) for values in zip(*map(datagen.person, range(size))))
+    contacts = size * 2
+    print(f"{size} persons, {contacts} contacts:")
+    for layout, fill in (("legacy", fill_legacy), ("compact", fill_compact)):
+        total, elapsed = measure(fill, names, phones, emails)
+        print(f"{layout:>10}: {total / 2 ** 20:.1f} MiB, {total / contacts:.1f} bytes per contact"
+            f" (built in {elapsed:.2f}s)")
+    return
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import asyncio, collections, os, pathlib, subprocess, sys, tempfile, time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import datagen
+
+MSG_HELP = """\
+DESCRIPTION:
+    This script is the load generator for the server mode of the assistant. Server is started on
+    the temporary Unix socket and filled with persons. Then every client connects, sends random
+    commands keeping several of them in flight and measures latency from sending the command to
+    receiving its whole output. Report has throughput and latency percentiles of the reads and
+    writes, so the reads are measured while writes are committed. Note that clients share CPU
+    with the server.
+
+USAGE:
+    python bench_server.py [ OPTIONS ]
+
+FLAGS:
+    --clients=<int>: Number of concurrent connections. 1000 by default.
+        --db=<file>: SQLite database file of the server. Contacts are kept in memory by
+                     default.
+         -h, --help: Show this message.
+       --log=<file>: Operation log file of the server. Log is synced on every commit.
+   --pipeline=<int>: Number of commands in flight per connection. 4 by default.
+   --requests=<int>: Number of commands per connection. 100 by default.
+       --size=<int>: Number of persons in the book. 10000 by default.
+     --writes=<int>: Percentage of commands which change the book. 10 by default."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
+# Terminator of the command output
+END = b"\n.\n"
+# Number of commands sent by a single write while filling the book
+FILL_BATCH_SIZE = 1000
+# Relative frequencies of the read commands. Reports of all persons at the
+# domain are left out, since their size grows with the book.
+READ_MIX = {"phone": 1, "owner": 1, "find": 1, "similar": 1}
+
+async def fill(path: str, size: int):
+    """Add persons from `datagen.person()` with a phone and an email each."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    for batch in range(0, size, FILL_BATCH_SIZE):
+        persons = [datagen.person(i) for i in range(batch, min(batch + FILL_BATCH_SIZE, size))]
+        writer.write(b"".join(f"add {name} {phone}\nadd {name} {email}\n".encode()
+            for name, phone, email in persons))
+        for _ in range(len(persons) * 2):
+            await reader.readuntil(END)
+    writer.close()
+
+async def run_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+        commands: list[tuple[bytes, bool]], pipeline: int, latencies: dict[bool, list[float]]):
+    """Send commands keeping up to `pipeline` of them in flight. Latencies
+    of the writes and reads are collected separately."""
+    commands = iter(commands)
+    # Send times and kinds of the commands in flight
+    sent = collections.deque()
+    for line, is_write in commands:
+        writer.write(line)
+        sent.append((time.perf_counter(), is_write))
+        if len(sent) == pipeline:
+            break
+    while sent:
+        await reader.readuntil(END)
+        started, is_write = sent.popleft()
+        latencies[is_write].append(time.perf_counter() - started)
+        command = next(commands, None)
+        if command is not None:
+            writer.write(command[0])
+            sent.append((time.perf_counter(), command[1]))
+    writer.close()
+
+async def run(path: str, clients: int, pipeline: int, requests: int, size: int,
+        writes: int) -> tuple[dict[bool, list[float]], float]:
+    """Fill the book and run clients.
+
+    Returns:
+        tuple[dict[bool, list[float]], float]: Latencies of the reads and
+            writes (by True key) and total time in seconds.
+    """
+    await fill(path, size)
+    # Every client gets its own command stream
+    commands = [[(line.encode(), line.split(" ", 1)[0] in datagen.WRITE_MIX)
+        for line in datagen.iter_commands(requests, size, client, writes / 100, READ_MIX)]
+        for client in range(clients)]
+    # Connections are opened before the clock starts
+    connections = await asyncio.gather(*(asyncio.open_unix_connection(path)
+        for _ in range(clients)))
+    latencies = {False: [], True: []}
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(reader, writer, client_commands, pipeline, latencies)
+        for (reader, writer), client_commands in zip(connections, commands)))
+    return latencies, time.perf_counter() - started
+
+def main():
+    db_path = ""
+    log_path = ""
+    options = {"clients": 1000, "pipeline": 4, "requests": 100, "size": 10_000, "writes": 10}
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        key, _, value = arg.partition("=")
+        if key == "--db":
+            db_path = value
+        elif key == "--log":
+            log_path = value
+        elif key[2:] in options and key.startswith("--"):
+            if not value.isascii() or not value.isdigit() or not int(value):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            options[key[2:]] = int(value)
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+    if options["writes"] > 100 or db_path and log_path:
+        print(MSG_BAD_FLAG_VAL)
+        return -1
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "bench.sock")
+        args = [sys.executable, os.path.join(os.path.dirname(__file__), "main.py"),
+            f"--serve={path}"] + ([f"--db={db_path}"] if db_path else []) \
+            + ([f"--log={log_path}"] if log_path else [])
+        server = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+        try:
+            # Server reports when it's listening
+            if not server.stdout.readline().startswith("Serving"):
+                print("ERROR: Server failed to start.")
+                return -1
+            latencies, elapsed = asyncio.run(run(path, **options))
+        except OSError as e:
+            print("ERROR:", e)
+            return -1
+        finally:
+            server.terminate()
+            server.wait()
+
+    count = sum(map(len, latencies.values()))
+    print(f"{options['clients']} clients, {count} commands in {elapsed:.2f}s: "
+        f"{count / elapsed:.0f} commands/s")
+    for is_write, kind_latencies in latencies.items():
+        if not kind_latencies:
+            continue
+        kind_latencies.sort()
+        count = len(kind_latencies)
+        print(f"{'Writes' if is_write else 'Reads'}: {count}, latency (ms): "
+            f"p50={kind_latencies[count // 2] * 1000:.2f}, "
+            f"p99={kind_latencies[count * 99 // 100] * 1000:.2f}, "
+            f"max={kind_latencies[-1] * 1000:.2f}")
+    return
+
+if __name__ == "__main__":
+    sys.exit(main())
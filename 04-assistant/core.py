@@ -1,7 +1,101 @@
+import itertools
+import storage
+
 E_UNKNOWN_FORMAT = "\
-Unknown contact format. Phone number must contain only digits. Email must contain '@' character."
+Unknown contact format. Phone number must contain only digits with optional leading '+' and \
+'-', '.', '(', ')' separators. Email must contain '@' character."
+E_CONTACT_EXISTS = {
+    "phone": "Such phone number already exists for the specified person.",
+    "email": "Such email address already exists for the specified person.",
+}
+E_CONTACT_MISSING = {
+    "phone": "Specified phone number doesn't exist.",
+    "email": "Specified email address doesn't exist.",
+}
+
+# Characters which are dropped from phone numbers
+PHONE_SEPARATORS = str.maketrans("", "", "-.()")
+
+# Max number of names found by search
+SEARCH_LIMIT = 20
+# Max number of similar names suggested for the missing person
+SUGGEST_LIMIT = 3
 
+# Number of persons per page of the rendered book
+PAGE_SIZE = 20
+# Constant lines of the person's table
+TABLE_TOP = "/" + "═" * 80 + "\\\n"
+TABLE_HEADER = "├" + "─" * 80 + "┤\n" + "│ " + "Phones".center(30) + "│ " \
+    + "Emails".center(47) + "│\n" + "│" + "-" * 80 + "│\n"
+TABLE_BOTTOM = "└" + "─" * 80 + "┘\n"
+
+# Persons of the default in-memory storage
 persons = {}
+# Storage of the contact book. See `set_backend()`.
+backend = storage.MemoryStorage(persons)
+
+def set_backend(new_backend):
+    """Replace storage of the contact book.
+
+    Args:
+        new_backend (MemoryStorage or SqliteStorage): New storage.
+    """
+    global backend
+    backend = new_backend
+
+def missing_person_error(name: str) -> ValueError:
+    """Build error of the missing person which suggests similar names.
+
+    Args:
+        name (str): Person's name.
+
+    Returns:
+        ValueError: Error to raise.
+    """
+    message = "Specified person doesn't exist."
+    similar = backend.find_similar(name, SUGGEST_LIMIT)
+    if similar:
+        message += " Did you mean " + " or ".join(f"'{name}'" for name in similar) + "?"
+    return ValueError(message)
+
+def normalize_phone(value: str) -> str | None:
+    """Convert phone number into the canonical form.
+
+    Separators are dropped. Leading `+` and zeros are kept, so `0501234567`
+    and `501234567` are different numbers.
+
+    Args:
+        value (str): Phone number, e.g. `+38(050)123-45-67`.
+
+    Returns:
+        str or None: ASCII digits with optional leading `+` or None if value
+            isn't a phone number.
+    """
+    phone = value.translate(PHONE_SEPARATORS)
+    digits = phone[1:] if phone.startswith("+") else phone
+    if digits.isascii() and digits.isdigit():
+        return phone
+    return None
+
+def parse_contact(value: str) -> tuple[str, str]:
+    """Determine type of the contact and normalize it.
+
+    Args:
+        value (str): Contact value for phone number or email address.
+
+    Returns:
+        tuple[str, str]: Type of contact ("phone" or "email") and its
+            normalized value.
+
+    Raises:
+        ValueError: If contact has unknown format.
+    """
+    phone = normalize_phone(value)
+    if phone is not None:
+        return "phone", phone
+    elif value.find("@") != -1:
+        return "email", value
+    raise ValueError(E_UNKNOWN_FORMAT)
 
 def add_contact(name: str, value: str) -> str:
     """Add new contact record to the specified person.
@@ -18,20 +112,10 @@ def add_contact(name: str, value: str) -> str:
     Raises:
         ValueError: If contact already exists for the specified person.
     """
-    if value.isascii and value.isdigit():
-        persons.setdefault(name, {"phones": set(), "emails": set()})
-        phone_number = int(value)
-        if phone_number in persons[name]["phones"]:
-            raise ValueError("Such phone number already exists for the specified person.")
-        persons[name]["phones"].add(phone_number)
-        return "phone"
-    elif value.find("@") != -1:
-        persons.setdefault(name, {"phones": set(), "emails": set()})
-        if value in persons[name]["emails"]:
-            raise ValueError("Such email address already exists for the specified person.")
-        persons[name]["emails"].add(value)
-        return "email"
-    raise ValueError(E_UNKNOWN_FORMAT)
+    kind, value = parse_contact(value)
+    if not backend.add(name, kind, value):
+        raise ValueError(E_CONTACT_EXISTS[kind])
+    return kind
 
 def change_contact(name: str, value: str) -> str:
     """Rewrite person's contacts of the determined type with new record.
@@ -46,15 +130,11 @@ def change_contact(name: str, value: str) -> str:
     Raises:
         ValueError: If person doesn't exist.
     """
-    if name not in persons:
-        raise ValueError("Specified person doesn't exist.")
-    if value.isascii and value.isdigit():
-        persons[name]["phones"] = {int(value)}
-        return "phone"
-    elif value.find("@") != -1:
-        persons[name]["emails"] = {value}
-        return "email"
-    raise ValueError(E_UNKNOWN_FORMAT)
+    if not backend.has_person(name):
+        raise missing_person_error(name)
+    kind, value = parse_contact(value)
+    backend.replace(name, kind, value)
+    return kind
 
 def delete_contact(name: str, value: str) -> str:
     """Delete contact by value for the specified person.
@@ -69,21 +149,12 @@ def delete_contact(name: str, value: str) -> str:
     Raises:
         ValueError: If contact doesn't exists for the specified person.
     """
-    if name not in persons:
-        raise ValueError("Specified person doesn't exist.")
-    if value.isascii and value.isdigit():
-        try:
-            persons[name]["phones"].remove(int(value))
-        except KeyError as e:
-            raise ValueError("Specified phone number doesn't exist.") from e
-        return "phone"
-    elif value.find("@") != -1:
-        try:
-            persons[name]["emails"].remove(value)
-        except KeyError as e:
-            raise ValueError("Specified email address doesn't exist.") from e
-        return "email"
-    raise ValueError(E_UNKNOWN_FORMAT)
+    if not backend.has_person(name):
+        raise missing_person_error(name)
+    kind, value = parse_contact(value)
+    if not backend.remove(name, kind, value):
+        raise ValueError(E_CONTACT_MISSING[kind])
+    return kind
 
 def show_phone(name: str) -> list:
     """Return all phones for the specified person.
@@ -97,9 +168,9 @@ def show_phone(name: str) -> list:
     Raises:
         ValueError: If person doesn't exist.
     """
-    if name not in persons:
-        raise ValueError("Specified person doesn't exist.")
-    return sorted(persons[name]["phones"])
+    if not backend.has_person(name):
+        raise missing_person_error(name)
+    return backend.get(name, "phone")
 
 def show_email(name: str) -> list:
     """Return all emails for the specified person.
@@ -113,14 +184,68 @@ def show_email(name: str) -> list:
     Raises:
         ValueError: If person doesn't exist.
     """
-    if name not in persons:
-        raise ValueError("Specified person doesn't exist.")
-    return sorted(persons[name]["emails"])
+    if not backend.has_person(name):
+        raise missing_person_error(name)
+    return backend.get(name, "email")
+
+def find_owners(value: str) -> list:
+    """Return all persons who have the contact.
+
+    Args:
+        value (str): Contact value for phone number or email address.
+
+    Returns:
+        list: Sorted list of person names.
+
+    Raises:
+        ValueError: If contact has unknown format.
+    """
+    kind, value = parse_contact(value)
+    return backend.owners(kind, value)
+
+def find_domain(domain: str) -> list:
+    """Return all persons who have email addresses at the domain.
+
+    Args:
+        domain (str): Email domain. Leading `@` character is optional.
+            Domain is case-insensitive.
+
+    Returns:
+        list: Sorted list of person names.
+    """
+    return backend.domain_persons(storage.email_domain(domain))
+
+def find_persons(prefix: str, limit: int = SEARCH_LIMIT) -> list:
+    """Return persons whose names start with the prefix.
+
+    Args:
+        prefix (str): Case-sensitive name prefix.
+        limit (int): Max number of names.
+
+    Returns:
+        list: Sorted list of person names.
+    """
+    return backend.find_prefix(prefix, limit)
+
+def find_similar(name: str, limit: int = SEARCH_LIMIT) -> list:
+    """Return persons whose names differ from the specified one by a single
+    typo at most, i.e. a character is added, removed, replaced or swapped
+    with the neighbour. Case is ignored.
+
+    Args:
+        name (str): Person's name.
+        limit (int): Max number of names.
+
+    Returns:
+        list: Sorted list of person names.
+    """
+    return backend.find_similar(name, limit)
 
 def render_person_table(name: str = None) -> str:
     """Render person's contacts as a 2-col table of phones and emails.
 
-    Renders single person if name is provided. Otherwise renders all.
+    Renders single person if name is provided. Otherwise renders all sorted
+    by name. See `iter_person_tables()` to render large books.
 
     Args:
         name (str): Person's name.
@@ -131,29 +256,40 @@ def render_person_table(name: str = None) -> str:
     Raises:
         ValueError: If person doesn't exist.
     """
-    render_dict = persons
+    return "".join(iter_person_tables(name))
+
+def iter_person_tables(name: str = None, page: int | None = None, limit: int | None = None):
+    """Render persons' contacts as 2-col tables one by one.
+
+    Renders single person if name is provided. Otherwise renders persons
+    sorted by name. Persons are read from the storage only as the tables
+    are consumed, so memory usage doesn't depend on the book size.
+
+    Args:
+        name (str): Person's name.
+        page (int or None): Number of the page starting from 1. Page has
+            `PAGE_SIZE` persons if limit isn't specified.
+        limit (int or None): Max number of persons per page.
+
+    Yields:
+        str: Rendered person's table of contacts.
+
+    Raises:
+        ValueError: If person doesn't exist.
+    """
     if name:
-        if name not in persons:
-            raise ValueError("Specified person doesn't exist.")
-        render_dict = {name: persons[name]}
-
-    output = ""
-    for name, contacts in render_dict.items():
-        output += "/" + '═' * 80 + "\\\n"
-        output += "│ " + f"Person: {name}".ljust(79) + "│\n"
-        output += "├" + "─" * 80 + "┤\n"
-        output += "│ " + "Phones".center(30) + "│ " + "Emails".center(47) + "│\n"
-        output += "│" + "-" * 80 + "│\n"
-        # Sort sets
-        phones = sorted(contacts["phones"])
-        emails = sorted(contacts["emails"])
-        # Equalize lists for equal zip loop
-        length_diff = len(phones) - len(emails)
-        if length_diff > 0:
-            emails.extend([""] * length_diff)
-        elif length_diff < 0:
-            phones.extend([""] * abs(length_diff))
-        for phone, email in zip(phones, emails):
-            output += "│ " + str(phone).ljust(30) + "│ " + email.ljust(47) + "│\n"
-        output += "└" + "─" * 80 + "┘\n"
-    return output
+        if not backend.has_person(name):
+            raise missing_person_error(name)
+        persons = backend.iter_persons(name)
+    else:
+        if page is not None and limit is None:
+            limit = PAGE_SIZE
+        offset = (page - 1) * limit if page else 0
+        persons = backend.iter_sorted(offset, limit)
+
+    for name, phones, emails in persons:
+        lines = [TABLE_TOP, "│ " + f"Person: {name}".ljust(79) + "│\n", TABLE_HEADER]
+        for phone, email in itertools.zip_longest(phones, emails, fillvalue=""):
+            lines.append("│ " + str(phone).ljust(30) + "│ " + email.ljust(47) + "│\n")
+        lines.append(TABLE_BOTTOM)
+        yield "".join(lines)
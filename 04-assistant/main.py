@@ -1,14 +1,21 @@
-import readline
-import core
+import asyncio, gc, itertools, os, pathlib, readline, shutil, sys, tempfile, time, typing
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import profiling, stages
+import core, storage
 
 MSG_HELP = """\
 DESCRIPTION:
     This script provides CLI for contact management.
 
 USAGE:
+    python main.py [ OPTIONS ]
+
+COMMANDS:
     - add <person> <value>
         Analyzes content of <value>, determines its type (phone/email) and adds contact record for\
- the specified person. Duplicates aren't allowed.
+ the specified person. Duplicates aren't allowed. Phone separators '-', '.', '(', ')' are dropped\
+, leading '+' and zeros are kept.
     - change <person> <value>
         Rewrites all contact records of the determined <value> type (phone/email) for the \
 specified person.
@@ -18,9 +25,18 @@ specified person.
         Prints all person's phone numbers.
     - email <person>
         Prints all person's email addresses.
-    - all [ <person> ]
+    - owner <value>
+        Prints persons who have the specified phone number or email address.
+    - domain <domain>
+        Prints persons who have email addresses at the specified domain.
+    - find <prefix>
+        Prints persons whose names start with the case-sensitive prefix.
+    - similar <person>
+        Prints persons whose names differ from the specified one by a single typo at most.
+    - all [ <person> ] [ --page=<int> ] [ --limit=<int> ]
         If person is specified, prints all associated email addresses and phone numbers.
-        Otherwise prints complete contacts database.
+        Otherwise prints complete contacts database sorted by name. Use --page and --limit to
+        print a single page of the database. Page has 20 persons by default.
     - help
         Prints this message.
     - hello
@@ -28,10 +44,49 @@ specified person.
     - exit | close
         Quits application.
 
+FLAGS:
+       --batch=<file>: Execute commands from the file without prompts and report the number of
+                       commands per second. Use `-` to read standard input.
+          --db=<file>: Keep contact book in the SQLite database file. It's created if it doesn't
+                       exist. Contacts are kept in memory and lost on exit by default.
+       --fsync=<mode>: Sync the operation log on every commit (`always`, default), at most once
+                       per the number of milliseconds or leave syncing to the OS (`never`).
+           -h, --help: Show this message.
+         --log=<file>: Keep contact book in memory and make it durable by the operation log in
+                       the file and its snapshot `<file>.snapshot`. They're created if they
+                       don't exist.
+            --profile: Print cProfile, tracemalloc and stage timing summaries to the standard error
+                       on exit.
+    --serve=<address>: Serve clients on the TCP address `[host]:port` or on the Unix socket
+                       path containing `/` instead of running the interactive loop.
+
 NOTES:
-    Person name can contain spaces."""
+    Person name can contain spaces. Press Tab to complete command or person name.
+
+    Server reads commands line by line. Output of every command is terminated by the line with
+    a single `.` character. Output lines starting with `.` get another `.` prepended. Client can
+    send next commands without waiting for output. Empty lines are skipped."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
 
 MSG_BAD_ARG_COUNT = "Wrong number of arguments. Use -h flag to read about command usage."
+MSG_BAD_ARG_VAL = "Invalid argument format. Use -h flag to read about command usage."
+
+COMMANDS = ("add", "change", "delete", "phone", "email", "owner", "domain", "find", "similar",
+    "all", "help", "hello", "exit", "close")
+# Commands which take person name as the first argument
+NAME_COMMANDS = ("add", "change", "delete", "phone", "email", "find", "similar", "all")
+# Max number of names offered by completion
+COMPLETION_LIMIT = 100
+# Number of batch commands executed by a single transaction
+BATCH_SIZE = 10_000
+# Number of output chunks which are joined into a single write
+OUTPUT_BATCH_SIZE = 4096
+# Commands which change the contact book
+WRITE_COMMANDS = ("add", "change", "delete")
+# Max number of pending connections of the server
+SERVER_BACKLOG = 1024
 
 def parse_input(user_input: str) -> tuple[str, dict[str, str]]:
     """Parse string into a tuple of command name and its arguments.
@@ -50,36 +105,149 @@ def parse_input(user_input: str) -> tuple[str, dict[str, str]]:
         return "", {}
 
     cmd, *args = user_input.strip().split()
+    cmd = cmd.lower()
     match cmd:
         case "add" | "change" | "delete":
             if len(args) < 2:
                 raise ValueError(MSG_BAD_ARG_COUNT)
             args = {"name": " ".join(args[:-1]), "value": args[-1]}
-        case "phone" | "email":
+        case "phone" | "email" | "similar":
             if len(args) < 1:
                 raise ValueError(MSG_BAD_ARG_COUNT)
             args = {"name": " ".join(args)}
+        case "find":
+            if len(args) < 1:
+                raise ValueError(MSG_BAD_ARG_COUNT)
+            args = {"prefix": " ".join(args)}
+        case "owner" | "domain":
+            if len(args) != 1:
+                raise ValueError(MSG_BAD_ARG_COUNT)
+            args = {"value" if cmd == "owner" else "domain": args[0]}
         case "all":
-            args = {} if len(args) == 0 else {"name": " ".join(args)}
+            options = {}
+            names = []
+            for arg in args:
+                if arg.startswith("--page=") or arg.startswith("--limit="):
+                    key, value = arg[2:].split("=", 1)
+                    if not value.isascii() or not value.isdigit() or not int(value):
+                        raise ValueError(MSG_BAD_ARG_VAL)
+                    options[key] = int(value)
+                else:
+                    names.append(arg)
+            args = options
+            if names:
+                args["name"] = " ".join(names)
 
-    return cmd.lower(), args
+    return cmd, args
 
-def print_contact_list(person_name: str, contact_type: str, contacts: list):
-    """Prints user-friendly list of person's contacts by type.
+def format_contact_list(person_name: str, contact_type: str, contacts: list) -> str:
+    """Format user-friendly list of person's contacts by type.
 
     Args:
         person_name (str): Person's name.
         contact_type (str): Contact type ("phone" or "email")
         contacts (list): List of contacts to output.
+
+    Returns:
+        str: Lines of the list.
     """
     if contacts:
-        print(f"List of {contact_type} contacts for {person_name}:")
-        for contact in contacts:
-            print(contact)
-    else:
-        print(f"{person_name} doesn't have any {contact_type} contacts.")
+        return f"List of {contact_type} contacts for {person_name}:\n" \
+            + "".join(f"{contact}\n" for contact in contacts)
+    return f"{person_name} doesn't have any {contact_type} contacts.\n"
 
-def main():
+def format_person_list(title: str, names: list) -> str:
+    """Format user-friendly list of persons found by contact.
+
+    Args:
+        title (str): Search description, e.g. "phone 123".
+        names (list): List of person names to output.
+
+    Returns:
+        str: Lines of the list.
+    """
+    if names:
+        return f"List of persons with {title}:\n" + "".join(f"{name}\n" for name in names)
+    return f"Nobody has {title}.\n"
+
+def run_command(cmd: str, args: dict):
+    """Execute parsed command. Exit commands aren't handled.
+
+    Output is produced in chunks, so long reports are written as soon as
+    they're rendered.
+
+    Args:
+        cmd (str): Command name.
+        args (dict): Command arguments.
+
+    Yields:
+        str: Output chunk ending with the line break.
+
+    Raises:
+        ValueError: If command is unknown or fails.
+    """
+    match cmd:
+        case "hello":
+            yield "Hello! How can I help you?\n"
+        case "help":
+            yield MSG_HELP + "\n"
+        case "add":
+            result = core.add_contact(**args)
+            yield f"{result.title()} contact added.\n"
+        case "change":
+            result = core.change_contact(**args)
+            yield f"Contact updated. All previous {result} contacts were rewritten.\n"
+        case "delete":
+            result = core.delete_contact(**args)
+            yield f"{result.title()} contact deleted.\n"
+        case "phone":
+            result = core.show_phone(**args)
+            yield format_contact_list(args["name"], cmd, result)
+        case "email":
+            result = core.show_email(**args)
+            yield format_contact_list(args["name"], cmd, result)
+        case "owner":
+            result = core.find_owners(**args)
+            yield format_person_list(args["value"], result)
+        case "domain":
+            result = core.find_domain(**args)
+            yield format_person_list(f"emails at {args['domain']}", result)
+        case "find":
+            result = core.find_persons(**args)
+            yield format_person_list(f"name starting with '{args['prefix']}'", result)
+        case "similar":
+            result = core.find_similar(**args)
+            yield format_person_list(f"name similar to '{args['name']}'", result)
+        case "all":
+            yield from core.iter_person_tables(**args)
+            yield "\n"
+        case _:
+            raise ValueError("Unknown command.")
+
+class Completer:
+    """Readline completer of the command and person names.
+
+    Completer delimiters must be disabled, so the whole line is completed
+    and names can contain spaces.
+    """
+
+    def __init__(self):
+        self._matches = []
+
+    def __call__(self, text: str, state: int) -> str | None:
+        if not state:
+            cmd, sep, name = text.partition(" ")
+            if not sep:
+                self._matches = [command + " " for command in COMMANDS if command.startswith(cmd)]
+            elif cmd in NAME_COMMANDS:
+                self._matches = [cmd + " " + name
+                    for name in core.find_persons(name.lstrip(), COMPLETION_LIMIT)]
+            else:
+                self._matches = []
+        return self._matches[state] if state < len(self._matches) else None
+
+def repl():
+    """Run interactive command loop until exit command or interrupt."""
     print(MSG_HELP)
 
     while True:
@@ -97,36 +265,333 @@ def main():
             continue
 
         # Handle commands
+        if cmd == "exit" or cmd == "close":
+            print("Exiting program. Good bye!")
+            break
         try:
-            match cmd:
-                case "exit" | "close":
-                    print("Exiting program. Good bye!")
-                    break
-                case "hello":
-                    print("Hello! How can I help you?")
-                case "help":
-                    print(MSG_HELP)
-                case "add":
-                    result = core.add_contact(**args)
-                    print(f"{result.title()} contact added.")
-                case "change":
-                    result = core.change_contact(**args)
-                    print(f"Contact updated. All previous {result} contacts were rewritten.")
-                case "delete":
-                    result = core.delete_contact(**args)
-                    print(f"{result.title()} contact deleted.")
-                case "phone":
-                    result = core.show_phone(**args)
-                    print_contact_list(args["name"], cmd, result)
-                case "email":
-                    result = core.show_email(**args)
-                    print_contact_list(args["name"], cmd, result)
-                case "all":
-                    print(core.render_person_table(**args))
-                case _:
-                    print("ERROR: Unknown command. Try again.")
+            # Write every chunk as soon as it's rendered
+            for chunk in run_command(cmd, args):
+                sys.stdout.write(chunk)
         except ValueError as e:
             print("ERROR:", e, "Try again.")
 
+def run_batch(fh: typing.TextIO, out: typing.TextIO) -> tuple[int, int]:
+    """Execute commands from the stream without prompts.
+
+    Commands are executed in groups of `BATCH_SIZE`. Every group is a
+    single storage transaction and its output is written at once when the
+    transaction is committed. Long output is kept in the temporary file
+    meanwhile. Failed commands are reported with their line numbers and
+    don't stop the execution. Empty lines and lines starting with `#` are
+    skipped. Exit command stops the execution.
+
+    Args:
+        fh (TextIO): Stream of commands.
+        out (TextIO): Output stream.
+
+    Returns:
+        tuple[int, int]: Number of executed commands and number of failed
+            ones.
+
+    Raises:
+        OSError: If group can't be committed. Its output isn't written.
+    """
+    count = errors = 0
+    output = []
+    spill = None
+    number = 0
+    # Bulk import creates millions of containers, which makes the garbage
+    # collector scan the growing heap over and over. Commands don't create
+    # reference cycles.
+    gc.disable()
+    try:
+        while True:
+            with stages.stage("read"):
+                lines = list(itertools.islice(fh, BATCH_SIZE))
+            if not lines:
+                break
+            first = number + 1
+            # Commands are parsed and executed line by line, so parsing is
+            # timed as execution
+            try:
+                with stages.stage("execute"), core.backend.transaction():
+                    for number, line in enumerate(lines, first):
+                        line = line.strip()
+                        if not line or line.startswith("#"):
+                            continue
+                        count += 1
+                        try:
+                            cmd, args = parse_input(line)
+                            if cmd == "exit" or cmd == "close":
+                                count -= 1
+                                lines = None
+                                break
+                            for chunk in run_command(cmd, args):
+                                output.append(chunk)
+                                # Long reports are spilled to the file until
+                                # the group is committed
+                                if len(output) >= OUTPUT_BATCH_SIZE:
+                                    if spill is None:
+                                        spill = tempfile.TemporaryFile(mode="w+",
+                                            encoding="utf-8", errors="surrogatepass")
+                                    spill.write("".join(output))
+                                    output.clear()
+                        except ValueError as e:
+                            errors += 1
+                            output.append(f"ERROR: Line {number}: {e}\n")
+            except OSError as e:
+                raise OSError(f"Lines {first}-{number} aren't committed. {e}") from e
+            with stages.stage("render"):
+                if spill is not None and spill.tell():
+                    spill.seek(0)
+                    shutil.copyfileobj(spill, out)
+                    spill.seek(0)
+                    spill.truncate()
+                out.write("".join(output))
+            output.clear()
+            if lines is None:
+                break
+    finally:
+        gc.enable()
+        if spill is not None:
+            spill.close()
+    out.flush()
+    return count, errors
+
+def frame_output(output: str) -> bytes:
+    """Terminate output of the server command with the `.` line. Lines
+    starting with `.` are escaped by another `.` character."""
+    if output.startswith(".") or "\n." in output:
+        output = ("\n" + output).replace("\n.", "\n..")[1:]
+    return (output + ".\n").encode("utf-8")
+
+class Server:
+    """Serves concurrent clients with the shared contact book.
+
+    All commands are executed by the event loop thread, so reads don't
+    need locks and no write can interleave with them. Writes are queued to
+    the single writer task, which executes all queued writes by a single
+    storage transaction. Its commit (log write, fsync and compaction) is
+    made by the executor thread, so reads aren't blocked by the disk. They
+    wait only while the writer executes the group. Reads can see the group
+    which is being committed, while its clients get results after the
+    commit. Every connection executes its commands in order, so output of
+    the pipelined commands follows their order.
+    """
+
+    def __init__(self):
+        self._queue = None
+
+    async def _write_loop(self):
+        """Execute queued writes in groups until cancelled.
+
+        Clients get results only after their group is committed. Failed
+        command fails only itself, while failed commit fails the whole
+        group. Storage errors don't stop the loop, so later writes aren't
+        stuck. Next group isn't executed until the previous one is
+        committed.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            # Output or error of every command
+            results = []
+            try:
+                with core.backend.transaction(defer=True):
+                    for cmd, args, _ in batch:
+                        # Command is executed even if client is gone, since
+                        # it was received
+                        try:
+                            results.append(("".join(run_command(cmd, args)), None))
+                        except Exception as e:
+                            results.append((None, e))
+                await loop.run_in_executor(None, core.backend.commit)
+            except Exception as e:
+                results = [(None, error or e) for _, error in results]
+                results += [(None, e)] * (len(batch) - len(results))
+            for (_, _, future), (output, error) in zip(batch, results):
+                if future.cancelled():
+                    continue
+                if error is None:
+                    future.set_result(output)
+                else:
+                    future.set_exception(error)
+
+    async def _execute(self, line: str) -> str | None:
+        """Execute command line of the client.
+
+        Returns:
+            str or None: Command output or None if connection must be
+                closed.
+        """
+        try:
+            cmd, args = parse_input(line)
+            if cmd == "exit" or cmd == "close":
+                return None
+            if cmd in WRITE_COMMANDS:
+                future = asyncio.get_running_loop().create_future()
+                self._queue.put_nowait((cmd, args, future))
+                return await future
+            # Whole output is rendered at once, since book can change while
+            # the client reads it
+            return "".join(run_command(cmd, args))
+        except Exception as e:
+            # Storage errors (e.g. locked database) fail the command rather
+            # than the connection
+            return f"ERROR: {e}\n"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Execute commands of the single connection until it's closed."""
+        try:
+            while line := await reader.readline():
+                try:
+                    line = line.decode("utf-8").strip()
+                except UnicodeDecodeError as e:
+                    writer.write(frame_output(f"ERROR: {e}\n"))
+                    continue
+                if not line:
+                    continue
+                output = await self._execute(line)
+                if output is None:
+                    writer.write(frame_output("Good bye!\n"))
+                    break
+                writer.write(frame_output(output))
+                # Pipelined commands are executed without waiting until
+                # the output buffer is full
+                await writer.drain()
+        except ValueError:
+            # Line is longer than the stream limit
+            writer.write(frame_output("ERROR: Line is too long.\n"))
+        except (ConnectionError, asyncio.CancelledError):
+            # Connection is cancelled when server stops
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address: str):
+        """Serve clients until interrupted.
+
+        Args:
+            address (str): TCP address `[host]:port` or Unix socket path
+                containing `/`.
+
+        Raises:
+            OSError: If address can't be bound.
+        """
+        self._queue = asyncio.Queue()
+        write_task = asyncio.create_task(self._write_loop())
+        if "/" in address:
+            server = await asyncio.start_unix_server(self._handle, address,
+                backlog=SERVER_BACKLOG)
+        else:
+            host, _, port = address.rpartition(":")
+            server = await asyncio.start_server(self._handle, host or None, int(port),
+                backlog=SERVER_BACKLOG)
+        try:
+            print(f"Serving on {address}. Press Ctrl+C to stop.", flush=True)
+            async with server:
+                await server.serve_forever()
+        finally:
+            write_task.cancel()
+            if "/" in address:
+                os.unlink(address)
+
+def main():
+    batch_path = ""
+    db_path = ""
+    address = ""
+    log_path = ""
+    fsync = 0
+    fsync_mode = ""
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        if arg.startswith("--batch="):
+            _, batch_path = arg.split("=", 1)
+            if not batch_path:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--db="):
+            _, db_path = arg.split("=", 1)
+            if not db_path:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--log="):
+            _, log_path = arg.split("=", 1)
+            if not log_path:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--fsync="):
+            _, fsync_mode = arg.split("=", 1)
+            if fsync_mode == "always":
+                fsync = 0
+            elif fsync_mode == "never":
+                fsync = None
+            elif fsync_mode.isascii() and fsync_mode.isdigit():
+                fsync = int(fsync_mode) / 1000
+            else:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif arg.startswith("--serve="):
+            _, address = arg.split("=", 1)
+            port = address.rpartition(":")[2]
+            if "/" not in address and (not port.isascii() or not port.isdigit()
+                    or int(port) > 65535):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    # Book can't be kept in both places. Flags without effect are rejected
+    # too, so they don't promise durability or batch execution.
+    if db_path and log_path or fsync_mode and not log_path or batch_path and address:
+        print(MSG_BAD_FLAG_VAL)
+        return -1
+
+    try:
+        if db_path:
+            core.set_backend(storage.SqliteStorage(db_path))
+        elif log_path:
+            core.set_backend(storage.JournalStorage(log_path, fsync))
+    except OSError as e:
+        print("ERROR:", e)
+        return -1
+
+    try:
+        if batch_path:
+            started = time.perf_counter()
+            if batch_path == "-":
+                count, errors = run_batch(sys.stdin, sys.stdout)
+            else:
+                with open(batch_path, mode="r", encoding="utf-8") as fh:
+                    count, errors = run_batch(fh, sys.stdout)
+            elapsed = time.perf_counter() - started
+            # Report isn't mixed with the output of the commands
+            print(f"Executed {count} commands in {elapsed:.2f}s ({count / elapsed:.0f} \
+commands/s), {errors} failed.", file=sys.stderr)
+            if errors:
+                return -1
+        elif address:
+            try:
+                asyncio.run(Server().serve(address))
+            except KeyboardInterrupt:
+                print("Server stopped.")
+        else:
+            readline.set_completer_delims("")
+            readline.set_completer(Completer())
+            readline.parse_and_bind("tab: complete")
+            repl()
+    except (OSError, UnicodeDecodeError) as e:
+        print("ERROR:", e)
+        return -1
+    finally:
+        core.backend.close()
+    return
+
 if __name__ == "__main__":
-    main()
+    sys.exit(profiling.run(main))
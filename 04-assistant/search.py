@@ -0,0 +1,174 @@
+import array, bisect, zlib
+
+# Number of pending names which are inserted one by one instead of sorting
+INSORT_LIMIT = 64
+# Min number of pending keys which triggers merge into the sorted array
+MERGE_MIN_SIZE = 4096
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+def name_keys(name: str) -> set[int]:
+    """Get keys of the name in the deletion index.
+
+    Keys are CRC32 hashes of the casefolded name and of all its variants
+    with a single deleted character. Names within one edit share at least
+    one key (symmetric delete algorithm of SymSpell).
+
+    Args:
+        name (str): Person's name.
+
+    Returns:
+        set[int]: Unsigned 32-bit hashes.
+    """
+    name = name.casefold()
+    crc32 = zlib.crc32
+    keys = {crc32(name.encode("utf-8", errors="surrogatepass"))}
+    for i in range(len(name)):
+        keys.add(crc32((name[:i] + name[i + 1:]).encode("utf-8", errors="surrogatepass")))
+    return keys
+
+def is_similar(query: str, name: str) -> bool:
+    """Check whether names differ by at most a single insertion, deletion,
+    substitution or transposition of adjacent characters. Case is ignored.
+    """
+    a, b = query.casefold(), name.casefold()
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+
+    # Skip common prefix
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) != len(b):
+        # Single insertion
+        return a[i:] == b[i + 1:]
+    # Single substitution or transposition
+    return a[i + 1:] == b[i + 1:] or i + 1 < len(a) and a[i] == b[i + 1] \
+        and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+
+class SortedNames:
+    """Sorted list of names for the prefix search.
+
+    Added names are kept aside and merged before the next search, so bulk
+    inserts don't shift the list on every name.
+
+    Args:
+        names (Iterable[str]): Initial names.
+    """
+
+    def __init__(self, names=()):
+        self._names = sorted(names)
+        self._pending = []
+
+    def add(self, name: str):
+        """Add new name. Name mustn't be in the list."""
+        self._pending.append(name)
+
+    def _merge(self):
+        """Move pending names into the sorted list."""
+        if len(self._pending) <= INSORT_LIMIT:
+            for name in self._pending:
+                bisect.insort(self._names, name)
+        else:
+            # Sort merges two sorted runs in linear time
+            self._pending.sort()
+            self._names.extend(self._pending)
+            self._names.sort()
+        self._pending.clear()
+
+    def slice(self, offset: int, limit: int | None = None) -> list[str]:
+        """Get names by their position in the sorted list.
+
+        Args:
+            offset (int): Number of names to skip.
+            limit (int or None): Max number of names. All the rest are
+                returned if it's None.
+
+        Returns:
+            list[str]: Sorted names.
+        """
+        if self._pending:
+            self._merge()
+        return self._names[offset:None if limit is None else offset + limit]
+
+    def find(self, prefix: str, limit: int) -> list[str]:
+        """Find names starting with the prefix.
+
+        Args:
+            prefix (str): Case-sensitive prefix.
+            limit (int): Max number of names.
+
+        Returns:
+            list[str]: Sorted names.
+        """
+        if self._pending:
+            self._merge()
+        start = bisect.bisect_left(self._names, prefix)
+        names = self._names[start:start + limit]
+        # Names with the prefix go in a row
+        for i, name in enumerate(names):
+            if not name.startswith(prefix):
+                return names[:i]
+        return names
+
+class SimilarNames:
+    """Deletion index of names for the search within one edit.
+
+    Every name is stored under all its keys (see `name_keys()`) as the
+    sorted array of 64-bit integers, where high bits are the key and low
+    bits are the name ID. Search takes a binary search per key of the
+    query, so it doesn't depend on the number of names. Added names are
+    kept in the dict until there are enough of them to re-sort the array,
+    so insertion takes amortized O(log n) time.
+
+    Args:
+        names (Iterable[str]): Initial names.
+    """
+
+    def __init__(self, names=()):
+        self._names = list(names)
+        self._index = array.array("Q", sorted(key << ID_BITS | name_id
+            for name_id, name in enumerate(self._names) for key in name_keys(name)))
+        # Key to the list of IDs of the names added since the last merge
+        self._pending = {}
+        self._pending_size = 0
+
+    def add(self, name: str):
+        """Add new name. Name mustn't be in the index."""
+        name_id = len(self._names)
+        self._names.append(name)
+        for key in name_keys(name):
+            self._pending.setdefault(key, []).append(name_id)
+            self._pending_size += 1
+        if self._pending_size >= max(MERGE_MIN_SIZE, len(self._index) // 4):
+            index = self._index.tolist()
+            index.extend(key << ID_BITS | name_id
+                for key, ids in self._pending.items() for name_id in ids)
+            index.sort()
+            self._index = array.array("Q", index)
+            self._pending.clear()
+            self._pending_size = 0
+
+    def find(self, query: str, limit: int) -> list[str]:
+        """Find names which differ from the query by at most one edit.
+
+        Args:
+            query (str): Name to look for. Case is ignored.
+            limit (int): Max number of names.
+
+        Returns:
+            list[str]: Sorted names.
+        """
+        index = self._index
+        ids = set()
+        for key in name_keys(query):
+            i = bisect.bisect_left(index, key << ID_BITS)
+            while i < len(index) and index[i] >> ID_BITS == key:
+                ids.add(index[i] & ID_MASK)
+                i += 1
+            ids.update(self._pending.get(key, ()))
+        # Keys are hashes, so candidates are verified
+        return sorted(name for name in map(self._names.__getitem__, ids)
+            if is_similar(query, name))[:limit]
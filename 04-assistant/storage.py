@@ -0,0 +1,831 @@
+import asyncio, bisect, contextlib, functools, gc, inspect, os, sqlite3, sys, threading, time
+import search
+
+# Contact kinds and their attributes in the person record
+CONTACT_KINDS = {"phone": "phones", "email": "emails"}
+# Contact kinds and their codes in the journal files
+KIND_CODES = {"phone": "p", "email": "e"}
+CODE_KINDS = {code: kind for kind, code in KIND_CODES.items()}
+# Log size in bytes which triggers compaction into the snapshot
+SNAPSHOT_LOG_SIZE = 64 * 2 ** 20
+# Size of the log chunks which are read at once by replay
+REPLAY_CHUNK_SIZE = 16 * 2 ** 20
+# Number of snapshot lines which are joined into a single write
+SNAPSHOT_BATCH_SIZE = 4096
+# Max number of values bound to a single SQLite statement. Old SQLite builds
+# allow 999 variables.
+SQL_VARIABLES_LIMIT = 500
+
+def email_domain(email: str) -> str:
+    """Get lowercase domain of the email address, i.e. the part after the
+    last `@` character."""
+    return email.rpartition("@")[2].lower()
+
+class Person:
+    """Contacts of the person.
+
+    Contacts are kept in sorted tuples. Tuple of a few strings takes less
+    than a quarter of the set's memory, and it's already sorted for output.
+    Updates copy the tuple, which is cheap for a few contacts.
+
+    Attributes:
+        phones (tuple[str, ...]): Sorted normalized phone numbers.
+        emails (tuple[str, ...]): Sorted email addresses.
+    """
+
+    __slots__ = ("phones", "emails")
+
+    def __init__(self, phones: tuple = (), emails: tuple = ()):
+        self.phones = phones
+        self.emails = emails
+
+    def __repr__(self) -> str:
+        return f"Person(phones={self.phones!r}, emails={self.emails!r})"
+
+class MemoryStorage:
+    """Contact book which is kept in the dict. It's lost on exit.
+
+    Owners of every phone and email and persons of every email domain are
+    kept in the reverse indexes, which are updated in O(1) time by every
+    mutation. Contact with a single owner (the usual case) refers to the
+    name itself rather than to the set of names. Domains are interned, so
+    they're shared by all indexed emails. Name search indexes are built on
+    the first search.
+
+    Args:
+        persons (dict or None): Dict of person names to their `Person`
+            records. New dict is used if it's None.
+    """
+
+    def __init__(self, persons: dict | None = None):
+        self.persons = {} if persons is None else persons
+        # Contact value to the owner's name or the set of names by kind
+        self._owners = {kind: {} for kind in CONTACT_KINDS}
+        # Email domain to the number of person's emails at it by name
+        self._domains = {}
+        self._sorted_names = None
+        self._similar_names = None
+        for name, person in self.persons.items():
+            for kind, attr in CONTACT_KINDS.items():
+                for value in getattr(person, attr):
+                    self._index(name, kind, value)
+
+    def _index(self, name: str, kind: str, value: str):
+        """Add contact to the reverse indexes."""
+        owners = self._owners[kind]
+        current = owners.get(value)
+        if current is None:
+            owners[value] = name
+        elif isinstance(current, str):
+            if current != name:
+                owners[value] = {current, name}
+        else:
+            current.add(name)
+        if kind == "email":
+            names = self._domains.setdefault(sys.intern(email_domain(value)), {})
+            names[name] = names.get(name, 0) + 1
+
+    def _unindex(self, name: str, kind: str, value: str):
+        """Remove contact from the reverse indexes."""
+        owners = self._owners[kind]
+        current = owners[value]
+        if isinstance(current, str):
+            del owners[value]
+        else:
+            current.discard(name)
+            if len(current) == 1:
+                owners[value] = current.pop()
+        if kind == "email":
+            domain = email_domain(value)
+            names = self._domains[domain]
+            names[name] -= 1
+            if not names[name]:
+                del names[name]
+                if not names:
+                    del self._domains[domain]
+
+    def has_person(self, name: str) -> bool:
+        """Check whether person exists."""
+        return name in self.persons
+
+    def add(self, name: str, kind: str, value: str) -> bool:
+        """Add contact to the person. Creates person if it doesn't exist.
+
+        Args:
+            name (str): Person's name.
+            kind (str): Contact kind from `CONTACT_KINDS`.
+            value (str): Normalized phone number or email address.
+
+        Returns:
+            bool: False if contact already exists.
+        """
+        person = self.persons.get(name)
+        if person is None:
+            person = self.persons[name] = Person()
+            if self._sorted_names is not None:
+                self._sorted_names.add(name)
+            if self._similar_names is not None:
+                self._similar_names.add(name)
+        attr = CONTACT_KINDS[kind]
+        values = getattr(person, attr)
+        i = bisect.bisect_left(values, value)
+        if i < len(values) and values[i] == value:
+            return False
+        setattr(person, attr, values[:i] + (value,) + values[i:])
+        self._index(name, kind, value)
+        return True
+
+    def replace(self, name: str, kind: str, value: str):
+        """Replace all person's contacts of the kind with the single one.
+
+        Person must exist.
+        """
+        person = self.persons[name]
+        attr = CONTACT_KINDS[kind]
+        for old_value in getattr(person, attr):
+            self._unindex(name, kind, old_value)
+        setattr(person, attr, (value,))
+        self._index(name, kind, value)
+
+    def remove(self, name: str, kind: str, value: str) -> bool:
+        """Remove person's contact. Person must exist.
+
+        Returns:
+            bool: False if contact doesn't exist.
+        """
+        person = self.persons[name]
+        attr = CONTACT_KINDS[kind]
+        values = getattr(person, attr)
+        i = bisect.bisect_left(values, value)
+        if i == len(values) or values[i] != value:
+            return False
+        setattr(person, attr, values[:i] + values[i + 1:])
+        self._unindex(name, kind, value)
+        return True
+
+    def get(self, name: str, kind: str) -> list:
+        """Get sorted person's contacts of the kind. Person must exist."""
+        return list(getattr(self.persons[name], CONTACT_KINDS[kind]))
+
+    def owners(self, kind: str, value: str) -> list[str]:
+        """Get sorted names of the persons who have the contact.
+
+        Args:
+            kind (str): Contact kind from `CONTACT_KINDS`.
+            value (str): Normalized phone number or email address.
+
+        Returns:
+            list[str]: Names of the persons.
+        """
+        owners = self._owners[kind].get(value)
+        if owners is None:
+            return []
+        return [owners] if isinstance(owners, str) else sorted(owners)
+
+    def domain_persons(self, domain: str) -> list[str]:
+        """Get sorted names of the persons who have emails at the domain.
+
+        Args:
+            domain (str): Lowercase email domain.
+
+        Returns:
+            list[str]: Names of the persons.
+        """
+        return sorted(self._domains.get(domain, ()))
+
+    def _get_sorted_names(self) -> search.SortedNames:
+        """Get sorted names index. It's built on the first call."""
+        if self._sorted_names is None:
+            self._sorted_names = search.SortedNames(self.persons)
+        return self._sorted_names
+
+    def find_prefix(self, prefix: str, limit: int) -> list[str]:
+        """Find persons whose names start with the prefix.
+
+        Args:
+            prefix (str): Case-sensitive name prefix.
+            limit (int): Max number of names.
+
+        Returns:
+            list[str]: Sorted names.
+        """
+        return self._get_sorted_names().find(prefix, limit)
+
+    def find_similar(self, name: str, limit: int) -> list[str]:
+        """Find persons whose names differ from the specified one by at most
+        a single edit. See `search.is_similar()`.
+
+        Args:
+            name (str): Person's name.
+            limit (int): Max number of names.
+
+        Returns:
+            list[str]: Sorted names.
+        """
+        if self._similar_names is None:
+            self._similar_names = search.SimilarNames(self.persons)
+        return self._similar_names.find(name, limit)
+
+    def iter_sorted(self, offset: int = 0, limit: int | None = None):
+        """Iterate over persons sorted by name.
+
+        Args:
+            offset (int): Number of persons to skip.
+            limit (int or None): Max number of persons.
+
+        Yields:
+            tuple[str, Sequence, Sequence]: Name, sorted phones and sorted
+                emails.
+        """
+        for name in self._get_sorted_names().slice(offset, limit):
+            person = self.persons[name]
+            yield name, person.phones, person.emails
+
+    def iter_persons(self, name: str | None = None):
+        """Iterate over persons in the order of their creation.
+
+        Args:
+            name (str or None): Yield only the specified person.
+
+        Yields:
+            tuple[str, Sequence, Sequence]: Name, sorted phones and sorted
+                emails.
+        """
+        names = (name,) if name is not None else self.persons
+        for name in names:
+            person = self.persons[name]
+            yield name, person.phones, person.emails
+
+    def transaction(self, defer: bool = False):
+        """Group mutations. They're applied at once in memory.
+
+        Args:
+            defer (bool): Leave the commit to `commit()`, so it can be made
+                by another thread. Mutations mustn't be made until then.
+        """
+        return contextlib.nullcontext()
+
+    def commit(self):
+        """Commit mutations of the deferred transaction."""
+
+    def close(self):
+        pass
+
+def _fsync_dir(path: str):
+    """Make renaming of the file within its directory durable."""
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class JournalStorage(MemoryStorage):
+    """Contact book which is kept in memory and made durable by the
+    operation log and snapshots.
+
+    Every mutation is appended to the log as `<op>\t<name>\t<kind>\t<value>`
+    line, where op is `+` (add), `=` (replace) or `-` (remove) and kind is
+    the code from `KIND_CODES`. Group of mutations is committed by the empty
+    line, so mutations of the `transaction()` block take a single write and
+    a single fsync. When log grows over `snapshot_size`, the whole book is
+    written to the snapshot file `<path>.snapshot` as `<name>[\t<code><value>]*`
+    lines and the log is started over. Both files start with the generation
+    line, so the log of the previous generation is ignored if process
+    stopped between these steps. On open the snapshot is loaded and log is
+    replayed in large chunks. Uncommitted tail of the log is cut off.
+
+    Args:
+        path (str): Path to the log file. Log and snapshot are created if
+            they don't exist.
+        fsync (float or None): Min interval in seconds between fsync calls.
+            Log is synced on every commit if it's 0 and left to the OS if
+            it's None. Otherwise it's synced by the first commit after the
+            interval, or by the timer when the interval elapses, so commits
+            are never left unsynced for longer. Timer is the event loop
+            callback if commit is made in the running loop and the daemon
+            thread otherwise.
+        snapshot_size (int): Log size in bytes which triggers compaction.
+
+    Raises:
+        OSError: If files can't be opened or they're corrupted.
+    """
+
+    def __init__(self, path: str, fsync: float | None = 0, snapshot_size: int = SNAPSHOT_LOG_SIZE):
+        self.path = path
+        self._snapshot_path = path + ".snapshot"
+        self._fsync = fsync
+        self._snapshot_size = snapshot_size
+        self._records = []
+        self._in_transaction = False
+        self._synced = time.monotonic()
+        self._unsynced = False
+        self._sync_timer = None
+        # Timer thread syncs the log while it can be written or replaced
+        self._lock = threading.RLock()
+        self._generation = 0
+        # Load is much faster without scans of the growing heap
+        gc.disable()
+        try:
+            persons = self._load_snapshot()
+            replay = self._replay(persons)
+            super().__init__(persons)
+        finally:
+            gc.enable()
+        if not replay:
+            self._start_log()
+        self._log = open(path, mode="ab")
+
+    def _load_snapshot(self) -> dict:
+        """Read persons from the snapshot and set its generation."""
+        persons = {}
+        try:
+            fh = open(self._snapshot_path, mode="r", encoding="utf-8", errors="surrogatepass",
+                newline="\n")
+        except FileNotFoundError:
+            return persons
+        with fh:
+            header = fh.readline().split()
+            if len(header) != 2 or header[0] != "SNAPSHOT" or not header[1].isdigit():
+                raise OSError(f"Snapshot `{self._snapshot_path}` is corrupted.")
+            self._generation = int(header[1])
+            for line in fh:
+                name, *contacts = line[:-1].split("\t")
+                persons[name] = Person(
+                    tuple(contact[1:] for contact in contacts if contact[0] == "p"),
+                    tuple(contact[1:] for contact in contacts if contact[0] == "e"))
+        return persons
+
+    def _replay(self, persons: dict) -> bool:
+        """Apply committed mutations of the log to the persons.
+
+        Mutations are folded into the contact sets of the persons before
+        indexes are built, so every contact is indexed once rather than by
+        every mutation.
+
+        Args:
+            persons (dict): Dict of person names to their `Person` records.
+
+        Returns:
+            bool: False if log doesn't exist or belongs to the previous
+                generation.
+        """
+        try:
+            fh = open(self.path, mode="r+b")
+        except FileNotFoundError:
+            return False
+        with fh:
+            header = fh.readline()
+            fields = header.split()
+            if len(fields) != 2 or fields[0] != b"LOG" or not fields[1].isdigit():
+                raise OSError(f"Log `{self.path}` is corrupted.")
+            generation = int(fields[1])
+            if generation < self._generation:
+                return False
+            if generation > self._generation:
+                raise OSError(f"Log `{self.path}` is newer than its snapshot.")
+
+            # Contact sets by kind code of the mutated persons
+            contacts = {}
+            committed = len(header)
+            tail = b""
+            while chunk := fh.read(REPLAY_CHUNK_SIZE):
+                tail += chunk
+                end = tail.rfind(b"\n\n")
+                if end == -1:
+                    continue
+                try:
+                    for line in tail[:end].decode("utf-8", errors="surrogatepass").split("\n"):
+                        if not line:
+                            continue
+                        op, name, code, value = line.split("\t")
+                        sets = contacts.get(name)
+                        if sets is None:
+                            person = persons.get(name)
+                            if person is None:
+                                # Keep the order of creation
+                                person = persons[name] = Person()
+                            sets = contacts[name] = {"p": set(person.phones),
+                                "e": set(person.emails)}
+                        if op == "+":
+                            sets[code].add(value)
+                        elif op == "=":
+                            sets[code].clear()
+                            sets[code].add(value)
+                        elif op == "-":
+                            sets[code].remove(value)
+                        else:
+                            raise ValueError(f"Unknown operation `{op}`.")
+                except (KeyError, ValueError) as e:
+                    raise OSError(f"Log `{self.path}` is corrupted.") from e
+                committed += end + 2
+                tail = tail[end + 2:]
+            for name, sets in contacts.items():
+                persons[name] = Person(tuple(sorted(sets["p"])), tuple(sorted(sets["e"])))
+            # Drop mutations which weren't committed
+            if tail:
+                fh.truncate(committed)
+        return True
+
+    def _start_log(self):
+        """Replace the log with the empty one of the current generation."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, mode="wb") as fh:
+            fh.write(f"LOG {self._generation}\n".encode())
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(temp_path, self.path)
+        _fsync_dir(self.path)
+
+    def _append(self, op: str, name: str, kind: str, value: str):
+        """Add mutation to the current group and commit it unless
+        transaction is open."""
+        self._records.append(f"{op}\t{name}\t{KIND_CODES[kind]}\t{value}\n")
+        if not self._in_transaction:
+            self._commit()
+
+    def _commit(self):
+        """Write the current group to the log."""
+        if not self._records:
+            return
+        self._records.append("\n")
+        with self._lock:
+            self._log.write("".join(self._records).encode("utf-8", errors="surrogatepass"))
+            self._records.clear()
+            self._log.flush()
+            if self._fsync is not None:
+                self._unsynced = True
+                delay = self._synced + self._fsync - time.monotonic()
+                if delay <= 0:
+                    self._sync()
+                elif self._sync_timer is None:
+                    self._schedule_sync(delay)
+        if self._log.tell() >= self._snapshot_size:
+            self.snapshot()
+
+    def _sync(self):
+        """Sync the log to the disk."""
+        os.fsync(self._log.fileno())
+        self._synced = time.monotonic()
+        self._unsynced = False
+
+    def _schedule_sync(self, delay: float):
+        """Start the timer which syncs the log after the delay in seconds."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._sync_timer = threading.Timer(delay, self._sync_pending)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+        else:
+            self._sync_timer = loop.call_later(delay, self._sync_pending)
+
+    def _sync_pending(self):
+        """Sync commits made since the last sync. It's called by the timer."""
+        with self._lock:
+            self._sync_timer = None
+            if self._unsynced and not self._log.closed:
+                try:
+                    self._sync()
+                except OSError:
+                    # Next commit or close syncs again and reports the error
+                    pass
+
+    def _check(self, name: str, value: str):
+        """Reject values which break the log lines."""
+        if "\t" in name or "\n" in name or "\t" in value or "\n" in value:
+            raise ValueError("Name and contact can't contain tabs or line breaks.")
+
+    def add(self, name: str, kind: str, value: str) -> bool:
+        """See `MemoryStorage.add()`."""
+        self._check(name, value)
+        if not super().add(name, kind, value):
+            return False
+        self._append("+", name, kind, value)
+        return True
+
+    def replace(self, name: str, kind: str, value: str):
+        """See `MemoryStorage.replace()`."""
+        self._check(name, value)
+        super().replace(name, kind, value)
+        self._append("=", name, kind, value)
+
+    def remove(self, name: str, kind: str, value: str) -> bool:
+        """See `MemoryStorage.remove()`."""
+        if not super().remove(name, kind, value):
+            return False
+        self._append("-", name, kind, value)
+        return True
+
+    @contextlib.contextmanager
+    def transaction(self, defer: bool = False):
+        """Commit mutations of the block by a single log write. Mutations
+        are committed even if the block raises an error, since they're
+        already applied in memory. Nested blocks join the outer
+        transaction. See `MemoryStorage.transaction()`."""
+        if self._in_transaction:
+            yield
+            return
+        self._in_transaction = True
+        try:
+            yield
+        finally:
+            self._in_transaction = False
+            if not defer:
+                self._commit()
+
+    def commit(self):
+        """Write the deferred group to the log. Sync and compaction are made
+        by the calling thread like in the usual commit."""
+        self._commit()
+
+    def snapshot(self):
+        """Write the whole book to the snapshot and start the new log."""
+        self._commit()
+        self._generation += 1
+        temp_path = self._snapshot_path + ".tmp"
+        with open(temp_path, mode="w", encoding="utf-8", errors="surrogatepass",
+                newline="\n") as fh:
+            fh.write(f"SNAPSHOT {self._generation}\n")
+            lines = []
+            for name, person in self.persons.items():
+                lines.append("\t".join((name, *("p" + phone for phone in person.phones),
+                    *("e" + email for email in person.emails))) + "\n")
+                if len(lines) >= SNAPSHOT_BATCH_SIZE:
+                    fh.write("".join(lines))
+                    lines.clear()
+            fh.write("".join(lines))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(temp_path, self._snapshot_path)
+        _fsync_dir(self._snapshot_path)
+        with self._lock:
+            self._log.close()
+            self._start_log()
+            self._log = open(self.path, mode="ab")
+            # Whole book is synced by the snapshot
+            self._unsynced = False
+
+    def close(self):
+        """Commit pending mutations and sync the log unless syncing is
+        left to the OS. Pending sync timer is cancelled."""
+        self._commit()
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._fsync is not None:
+                os.fsync(self._log.fileno())
+            self._log.close()
+
+def _database_errors(method):
+    """Decorate method of `SqliteStorage`, so SQLite errors (e.g. locked or
+    read-only database, full disk) are raised as OSError like other I/O
+    errors. Generator methods are decorated too."""
+    def translate(self, e: sqlite3.Error) -> OSError:
+        return OSError(f"Database `{self.path}` failed: {e}.")
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return (yield from method(self, *args, **kwargs))
+            except sqlite3.Error as e:
+                raise translate(self, e) from e
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.Error as e:
+                raise translate(self, e) from e
+    return wrapper
+
+class SqliteStorage:
+    """Contact book which is kept in the SQLite database.
+
+    Database runs in WAL mode, so readers aren't blocked by the writer.
+    Names, phones, emails, email domains and name keys of the deletion index
+    (see `search.name_keys()`) are indexed by B-trees, so every operation
+    takes O(log n) time. Statements are prepared once and reused from the
+    connection's statement cache. Every mutation is committed at once unless
+    it's made within `transaction()` block.
+
+    Args:
+        path (str): Path to the database file. It's created if it doesn't
+            exist.
+
+    Raises:
+        OSError: If database can't be opened. Methods raise OSError if
+            database fails.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS persons (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS phones (
+            person_id INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (person_id, value)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS phones_value ON phones (value);
+        CREATE TABLE IF NOT EXISTS emails (
+            person_id INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            domain TEXT NOT NULL,
+            PRIMARY KEY (person_id, value)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS emails_value ON emails (value);
+        CREATE INDEX IF NOT EXISTS emails_domain ON emails (domain);
+        CREATE TABLE IF NOT EXISTS name_keys (
+            key INTEGER NOT NULL,
+            person_id INTEGER NOT NULL,
+            PRIMARY KEY (key, person_id)
+        ) WITHOUT ROWID;
+    """
+
+    INSERT_NAME_KEY = "INSERT OR IGNORE INTO name_keys (key, person_id) VALUES (?, ?)"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._in_transaction = False
+        self._pending_keys = []
+        try:
+            self._db = sqlite3.connect(path)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            # Commits in WAL mode stay consistent without fsync of every one
+            self._db.execute("PRAGMA synchronous = NORMAL")
+            self._db.create_function("email_domain", 1, email_domain, deterministic=True)
+            with self._db:
+                self._db.executescript(self.SCHEMA)
+        except sqlite3.Error as e:
+            raise OSError(f"Database `{path}` can't be opened: {e}.") from e
+
+        # Statements of every contact kind. Text of the statement is the key
+        # of the connection's prepared statements cache.
+        self._sql = {}
+        for kind, table in CONTACT_KINDS.items():
+            columns, values = ("value, domain", "?1, email_domain(?1)") if kind == "email" \
+                else ("value", "?1")
+            self._sql[kind] = {
+                "add": f"INSERT OR IGNORE INTO {table} (person_id, {columns}) \
+SELECT id, {values} FROM persons WHERE name = ?2",
+                "clear": f"DELETE FROM {table} \
+WHERE person_id = (SELECT id FROM persons WHERE name = ?)",
+                "remove": f"DELETE FROM {table} \
+WHERE person_id = (SELECT id FROM persons WHERE name = ?) AND value = ?",
+                "get": f"SELECT value FROM {table} \
+WHERE person_id = (SELECT id FROM persons WHERE name = ?) ORDER BY value",
+                "get_by_id": f"SELECT value FROM {table} WHERE person_id = ? ORDER BY value",
+                "owners": f"SELECT name FROM {table} JOIN persons ON persons.id = person_id \
+WHERE value = ? ORDER BY name",
+            }
+
+    def _add_name_keys(self, person_id: int, name: str):
+        """Add keys of the person's name to the deletion index. Keys which
+        are added within transaction are inserted in order on commit, since
+        random inserts into the large index are slow."""
+        rows = ((key, person_id) for key in search.name_keys(name))
+        if self._in_transaction:
+            self._pending_keys.extend(rows)
+        else:
+            self._db.executemany(self.INSERT_NAME_KEY, rows)
+
+    def _flush_name_keys(self):
+        """Insert name keys added within transaction."""
+        if self._pending_keys:
+            self._pending_keys.sort()
+            self._db.executemany(self.INSERT_NAME_KEY, self._pending_keys)
+            self._pending_keys.clear()
+
+    @contextlib.contextmanager
+    def _write(self):
+        """Commit mutations of the block unless transaction is open."""
+        if self._in_transaction:
+            yield
+        else:
+            with self._db:
+                yield
+
+    @contextlib.contextmanager
+    @_database_errors
+    def transaction(self, defer: bool = False):
+        """Commit mutations of the block at once. They're rolled back if the
+        block raises an error. Nested blocks join the outer transaction.
+        Connection can't be shared between threads, so commit isn't
+        deferred. See `MemoryStorage.transaction()`."""
+        if self._in_transaction:
+            yield
+            return
+        self._in_transaction = True
+        try:
+            with self._db:
+                yield
+                self._flush_name_keys()
+        finally:
+            self._in_transaction = False
+            self._pending_keys.clear()
+
+    @_database_errors
+    def has_person(self, name: str) -> bool:
+        """Check whether person exists."""
+        return self._db.execute("SELECT 1 FROM persons WHERE name = ?", (name,)).fetchone() \
+            is not None
+
+    @_database_errors
+    def add(self, name: str, kind: str, value: str) -> bool:
+        """See `MemoryStorage.add()`."""
+        with self._write():
+            cursor = self._db.execute("INSERT OR IGNORE INTO persons (name) VALUES (?)", (name,))
+            if cursor.rowcount == 1:
+                self._add_name_keys(cursor.lastrowid, name)
+            return self._db.execute(self._sql[kind]["add"], (value, name)).rowcount == 1
+
+    @_database_errors
+    def replace(self, name: str, kind: str, value: str):
+        """See `MemoryStorage.replace()`."""
+        with self._write():
+            self._db.execute(self._sql[kind]["clear"], (name,))
+            self._db.execute(self._sql[kind]["add"], (value, name))
+
+    @_database_errors
+    def remove(self, name: str, kind: str, value: str) -> bool:
+        """See `MemoryStorage.remove()`."""
+        with self._write():
+            return self._db.execute(self._sql[kind]["remove"], (name, value)).rowcount == 1
+
+    @_database_errors
+    def get(self, name: str, kind: str) -> list:
+        """See `MemoryStorage.get()`."""
+        return [row[0] for row in self._db.execute(self._sql[kind]["get"], (name,))]
+
+    @_database_errors
+    def owners(self, kind: str, value: str) -> list[str]:
+        """See `MemoryStorage.owners()`."""
+        return [row[0] for row in self._db.execute(self._sql[kind]["owners"], (value,))]
+
+    @_database_errors
+    def domain_persons(self, domain: str) -> list[str]:
+        """See `MemoryStorage.domain_persons()`."""
+        return [row[0] for row in self._db.execute("SELECT DISTINCT name FROM emails \
+JOIN persons ON persons.id = person_id WHERE domain = ? ORDER BY name", (domain,))]
+
+    @_database_errors
+    def find_prefix(self, prefix: str, limit: int) -> list[str]:
+        """See `MemoryStorage.find_prefix()`."""
+        # Names are compared as UTF-8 bytes, so the max code point is the
+        # upper bound of the names with the prefix
+        return [row[0] for row in self._db.execute("SELECT name FROM persons \
+WHERE name >= ?1 AND name < ?1 || char(1114111) ORDER BY name LIMIT ?2", (prefix, limit))]
+
+    @_database_errors
+    def find_similar(self, name: str, limit: int) -> list[str]:
+        """See `MemoryStorage.find_similar()`."""
+        self._flush_name_keys()
+        keys = sorted(search.name_keys(name))
+        names = set()
+        # Long names have more keys than a statement can bind
+        for i in range(0, len(keys), SQL_VARIABLES_LIMIT):
+            chunk = keys[i:i + SQL_VARIABLES_LIMIT]
+            names.update(row[0] for row in self._db.execute(f"SELECT DISTINCT name \
+FROM name_keys JOIN persons ON persons.id = person_id WHERE key IN ({', '.join('?' * len(chunk))})",
+                chunk))
+        # Keys are hashes, so candidates are verified
+        return sorted(other for other in names if search.is_similar(name, other))[:limit]
+
+    @_database_errors
+    def iter_persons(self, name: str | None = None):
+        """See `MemoryStorage.iter_persons()`."""
+        if name is None:
+            persons = self._db.execute("SELECT id, name FROM persons ORDER BY id")
+        else:
+            persons = self._db.execute("SELECT id, name FROM persons WHERE name = ?", (name,))
+        yield from self._iter_contacts(persons)
+
+    @_database_errors
+    def iter_sorted(self, offset: int = 0, limit: int | None = None):
+        """See `MemoryStorage.iter_sorted()`."""
+        # Negative limit means no limit
+        yield from self._iter_contacts(self._db.execute(
+            "SELECT id, name FROM persons ORDER BY name LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)))
+
+    def _iter_contacts(self, persons):
+        """Add sorted contacts to the rows of person IDs and names."""
+        for person_id, name in persons:
+            phones = [row[0] for row in self._db.execute(
+                self._sql["phone"]["get_by_id"], (person_id,))]
+            emails = [row[0] for row in self._db.execute(
+                self._sql["email"]["get_by_id"], (person_id,))]
+            yield name, phones, emails
+
+    @_database_errors
+    def commit(self):
+        """Transactions are committed at the end of the block."""
+
+    def close(self):
+        """Close the database. Pending changes are already committed."""
+        self._db.close()
@@ -0,0 +1,36 @@
+import contextlib, io, unittest
+from unittest import mock
+import core, main, storage
+
+class BatchTest(unittest.TestCase):
+    """Output of the batch group is written only after its commit."""
+
+    def setUp(self):
+        core.set_backend(storage.MemoryStorage())
+
+    def test_failed_commit_drops_output(self):
+        @contextlib.contextmanager
+        def transaction():
+            yield
+            raise OSError("Disk is full.")
+
+        out = io.StringIO()
+        with mock.patch.object(core.backend, "transaction", transaction):
+            with self.assertRaisesRegex(OSError, "Lines 1-3 aren't committed. Disk is full."):
+                main.run_batch(io.StringIO("add Ann 123\nadd Bob 456\n\n"), out)
+        self.assertEqual(out.getvalue(), "")
+
+    def test_long_output_is_written_after_commit(self):
+        commands = "".join(f"add Person{i} {i:03}\n" for i in range(50)) + "all\n"
+        expected = io.StringIO()
+        main.run_batch(io.StringIO(commands), expected)
+
+        core.set_backend(storage.MemoryStorage())
+        out = io.StringIO()
+        with mock.patch.object(main, "OUTPUT_BATCH_SIZE", 4):
+            self.assertEqual(main.run_batch(io.StringIO(commands), out), (51, 0))
+        self.assertEqual(out.getvalue(), expected.getvalue())
+        self.assertIn("Person49", out.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
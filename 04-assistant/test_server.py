@@ -0,0 +1,71 @@
+import asyncio, contextlib, os, sqlite3, tempfile, threading, unittest
+from unittest import mock
+import core, main, storage
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+    """Server on the Unix socket with the single client."""
+
+    async def asyncSetUp(self):
+        core.set_backend(storage.MemoryStorage())
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.temp_dir.name, "server.sock")
+        with contextlib.redirect_stdout(None):
+            self.server = asyncio.create_task(main.Server().serve(self.address))
+            while not os.path.exists(self.address):
+                await asyncio.sleep(0.01)
+        self.reader, self.writer = await asyncio.open_unix_connection(self.address)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.server.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.server
+        self.temp_dir.cleanup()
+
+    async def request(self, line: str, connection: tuple | None = None) -> str:
+        """Send command and read its output without the terminator."""
+        reader, writer = connection or (self.reader, self.writer)
+        writer.write(line.encode("utf-8") + b"\n")
+        output = []
+        while (line := (await reader.readline()).decode("utf-8")) != ".\n":
+            output.append(line)
+        return "".join(output)
+
+    async def test_storage_error_fails_only_its_write(self):
+        error = sqlite3.OperationalError("database is locked")
+        with mock.patch.object(core.backend, "add", side_effect=error):
+            output = await asyncio.wait_for(self.request("add Ann 123"), 5)
+        self.assertEqual(output, "ERROR: database is locked\n")
+        output = await asyncio.wait_for(self.request("add Bob 456"), 5)
+        self.assertEqual(output, "Phone contact added.\n")
+        output = await asyncio.wait_for(self.request("owner 456"), 5)
+        self.assertEqual(output, "List of persons with 456:\nBob\n")
+
+    async def test_failed_commit_fails_group(self):
+        error = OSError("Disk is full.")
+        with mock.patch.object(core.backend, "commit", side_effect=error):
+            output = await asyncio.wait_for(self.request("add Ann 123"), 5)
+        self.assertEqual(output, "ERROR: Disk is full.\n")
+        output = await asyncio.wait_for(self.request("add Bob 456"), 5)
+        self.assertEqual(output, "Phone contact added.\n")
+
+    async def test_reads_dont_wait_for_commit(self):
+        committing, committed = threading.Event(), threading.Event()
+
+        def commit():
+            committing.set()
+            committed.wait(5)
+
+        with mock.patch.object(core.backend, "commit", commit):
+            write = asyncio.create_task(self.request("add Ann 123"))
+            await asyncio.get_running_loop().run_in_executor(None, committing.wait, 5)
+            connection = await asyncio.open_unix_connection(self.address)
+            output = await asyncio.wait_for(self.request("owner 123", connection), 5)
+            self.assertEqual(output, "List of persons with 123:\nAnn\n")
+            self.assertFalse(write.done())
+            committed.set()
+            self.assertEqual(await asyncio.wait_for(write, 5), "Phone contact added.\n")
+            connection[1].close()
+
+if __name__ == "__main__":
+    unittest.main()
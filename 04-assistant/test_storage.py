@@ -0,0 +1,48 @@
+import asyncio, os, tempfile, time, unittest
+from unittest import mock
+import storage
+
+# Fsync interval of the tests in seconds
+INTERVAL = 0.2
+
+class JournalSyncTest(unittest.TestCase):
+    """Deferred fsync of the journal with the interval policy."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.book = storage.JournalStorage(os.path.join(self.temp_dir.name, "book.log"),
+            INTERVAL)
+        # Commit right after open is within the interval
+        self.book._synced = time.monotonic()
+        self.fsync = mock.patch.object(os, "fsync", wraps=os.fsync).start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+        if not self.book._log.closed:
+            self.book.close()
+        self.temp_dir.cleanup()
+
+    def test_idle_commit_is_synced_by_timer(self):
+        self.book.add("Ann", "phone", "123")
+        self.fsync.assert_not_called()
+        time.sleep(INTERVAL * 3)
+        self.fsync.assert_called_once()
+
+    def test_idle_commit_is_synced_by_event_loop(self):
+        async def run():
+            self.book.add("Ann", "phone", "123")
+            self.fsync.assert_not_called()
+            await asyncio.sleep(INTERVAL * 3)
+
+        asyncio.run(run())
+        self.fsync.assert_called_once()
+
+    def test_close_cancels_timer(self):
+        self.book.add("Ann", "phone", "123")
+        self.book.close()
+        self.fsync.assert_called_once()
+        time.sleep(INTERVAL * 3)
+        self.fsync.assert_called_once()
+
+if __name__ == "__main__":
+    unittest.main()
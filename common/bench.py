@@ -0,0 +1,195 @@
+import concurrent.futures, datetime, importlib, json, multiprocessing, os, pathlib, platform, sys, \
+    tempfile, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+from common import datagen, profiling, stages
+
+MSG_HELP = """\
+DESCRIPTION:
+    This script benchmarks all four tools on the generated data. Every case runs in a fresh
+    process, since tools have modules with the same names, and the best of the repeated runs is
+    reported with its stage timings and peak memory. Data is generated by the deterministic
+    generators of `common/datagen.py`, so runs with the same scale and seed process the same
+    data. Results can be saved as JSON and compared with the previous run.
+
+USAGE:
+    python bench.py [ OPTIONS ]
+
+FLAGS:
+      --cases=<list>: Comma-separated cases to run. All cases by default: salary, salary-group,
+                      cats, tree, assistant.
+    --compare=<file>: Print change of the times relative to the saved results.
+          -h, --help: Show this message.
+        --out=<file>: Save results as JSON.
+      --repeat=<int>: Number of runs of every case. 3 by default.
+     --scale=<float>: Multiplier of the data sizes. 1 by default, i.e. 1M payroll records, 1M cat
+                      records, 20K tree entries and 200K assistant commands.
+        --seed=<int>: Seed of the data generators. 0 by default."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
+# Case name to the tool directory, data generator, data size at scale 1 and
+# other arguments of the generator
+CASES = {
+    "salary": ("01-total_salary", datagen.write_payroll, 1_000_000, {}),
+    "salary-group": ("01-total_salary", datagen.write_payroll, 1_000_000, {"departments": True}),
+    "cats": ("02-get_cats_info", datagen.write_cats, 1_000_000, {}),
+    "tree": ("03-tree", datagen.make_tree, 20_000, {}),
+    "assistant": ("04-assistant", datagen.write_commands, 200_000, {}),
+}
+# Max relative change of the time which isn't reported as a regression
+TOLERANCE = 0.1
+
+def _max_rss() -> int | None:
+    """Get peak resident memory of the process in bytes if platform reports
+    it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB and macOS reports bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def run_case(case: str, path: str) -> dict:
+    """Run the case on the data. It's called in a fresh process.
+
+    Args:
+        case (str): Case name from `CASES`.
+        path (str): Path to the data.
+
+    Returns:
+        dict: Time in seconds, stage timings and peak memory in bytes.
+    """
+    sys.path.insert(0, str(ROOT / CASES[case][0]))
+    # Assistant executes command files in its script
+    tool = importlib.import_module("main" if case == "assistant" else "core")
+    with open(os.devnull, mode="w", encoding="utf-8") as out:
+        stages.enable()
+        started = time.perf_counter()
+        if case == "salary":
+            tool.total_salary(path)
+        elif case == "salary-group":
+            tool.group_salary(path, "department")
+        elif case == "cats":
+            tool.get_cats_info(path)
+        elif case == "tree":
+            tool.print_tree(path, out=out, color=False, sizes=True)
+        else:
+            with open(path, mode="r", encoding="utf-8") as fh:
+                tool.run_batch(fh, out)
+        seconds = time.perf_counter() - started
+        stages.disable()
+    return {"seconds": seconds, "stages": dict(stages.timings), "max_rss": _max_rss()}
+
+def run(cases: list[str], scale: float, repeat: int, seed: int) -> dict:
+    """Generate data and run every case.
+
+    Returns:
+        dict: Results of the cases by name. Run with the least time is
+            kept.
+    """
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for case in cases:
+            _, generate, size, options = CASES[case]
+            size = max(1, int(size * scale))
+            path = os.path.join(temp_dir, case)
+            if generate is datagen.make_tree:
+                os.mkdir(path)
+            generate(path, size, seed=seed, **options)
+            best = None
+            for _ in range(repeat):
+                with concurrent.futures.ProcessPoolExecutor(1, mp_context=spawn) as executor:
+                    result = executor.submit(run_case, case, path).result()
+                if best is None or result["seconds"] < best["seconds"]:
+                    best = result
+            results[case] = {"size": size, **best}
+    return results
+
+def format_change(seconds: float, previous: float) -> str:
+    """Format relative change of the time."""
+    change = seconds / previous - 1 if previous else 0
+    mark = " REGRESSION" if change > TOLERANCE else ""
+    return f" ({change:+.1%} vs {previous:.3f}s){mark}"
+
+def main():
+    cases = list(CASES)
+    compare_path = ""
+    out_path = ""
+    repeat = 3
+    scale = 1.0
+    seed = 0
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        key, _, value = arg.partition("=")
+        if key == "--cases":
+            cases = value.split(",")
+            if not all(case in CASES for case in cases):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        elif key == "--compare" or key == "--out":
+            if not value:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            if key == "--compare":
+                compare_path = value
+            else:
+                out_path = value
+        elif key == "--repeat" or key == "--seed":
+            if not value.isascii() or not value.isdigit() or key == "--repeat" and not int(value):
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            if key == "--repeat":
+                repeat = int(value)
+            else:
+                seed = int(value)
+        elif key == "--scale":
+            try:
+                scale = float(value)
+            except ValueError:
+                scale = 0
+            if not scale > 0:
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    try:
+        previous = {}
+        if compare_path:
+            with open(compare_path, mode="r", encoding="utf-8") as fh:
+                previous = json.load(fh)["cases"]
+        results = {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": scale,
+            "seed": seed,
+            "cases": run(cases, scale, repeat, seed),
+        }
+        if out_path:
+            with open(out_path, mode="w", encoding="utf-8") as fh:
+                json.dump(results, fh, indent=2)
+    except (OSError, ValueError, KeyError) as e:
+        print("ERROR:", e)
+        return -1
+
+    for case, result in results["cases"].items():
+        line = f"{case}: {result['size']} items in {result['seconds']:.3f}s"
+        if case in previous:
+            line += format_change(result["seconds"], previous[case]["seconds"])
+        if result["max_rss"]:
+            line += f", peak memory {result['max_rss'] / 2 ** 20:.0f} MiB"
+        print(line + "\n" + profiling.format_stages(result["stages"]), end="")
+    return
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import os, pathlib, sys, tempfile, time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import datagen, reader
+
+MSG_HELP = """\
+DESCRIPTION:
+    This script compares throughput of the memory-mapped line reader with the text mode
+    `readline()` loop which was used by the CSV tools before.
+    Both loops extract the second field of the payroll-like rows. Temporary file of the
+    requested size is generated if file path isn't provided.
+
+USAGE:
+    python bench_reader.py [ OPTIONS ] [ <file_path> ]
+
+FLAGS:
+         -h, --help: Show this message.
+       --size=<int>: Size of the generated file in MiB. 1024 by default."""
+
+MSG_BAD_FLAG_KEY = "ERROR: Unknown flag. Use -h flag to see the list of available options."
+MSG_BAD_FLAG_VAL = "ERROR: Invalid flag format. Use -h flag to see the list of available options."
+
+LINE_MAX_SIZE = 100
+# Number of generated rows which are repeated to fill the file
+BLOCK_ROWS = 10_000
+
+def read_text(path: str) -> int:
+    """Legacy text mode loop."""
+    count = 0
+    with open(path, mode="r", encoding="utf-8", errors="strict") as fh:
+        for line in iter(lambda: fh.readline(LINE_MAX_SIZE), ""):
+            line = line.strip().split(",", 1)
+            count += len(line[1])
+    return count
+
+def read_mmap(path: str) -> int:
+    """Memory-mapped loop which decodes only the second field."""
+    count = 0
+    for lines in reader.iter_blocks(path, LINE_MAX_SIZE):
+        for line in lines:
+            count += len(line.strip().partition(b",")[2].decode("utf-8"))
+    return count
+
+def main():
+    path = ""
+    size = 1024
+    for arg in sys.argv[1:]:
+        if arg == "-h" or arg == "--help":
+            print(MSG_HELP)
+            return
+
+        if arg.startswith("--size="):
+            _, size = arg.split("=", 1)
+            if not size.isascii() or not size.isdigit():
+                print(MSG_BAD_FLAG_VAL)
+                return -1
+            size = int(size)
+        elif not arg.startswith("-"):
+            path = arg
+        else:
+            print(MSG_BAD_FLAG_KEY)
+            return -1
+
+    temp_path = ""
+    if not path:
+        fd, temp_path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        print(f"Generating {size} MiB file...")
+        datagen.write_payroll(temp_path, BLOCK_ROWS)
+        datagen.repeat_file(temp_path, size * 1024 * 1024)
+        path = temp_path
+
+    try:
+        file_size = os.path.getsize(path)
+        timings = {}
+        for name, func in (("text", read_text), ("mmap", read_mmap)):
+            started = time.perf_counter()
+            func(path)
+            timings[name] = time.perf_counter() - started
+            print(f"{name}: {timings[name]:.3f}s, {file_size / timings[name] / 2 ** 20:.1f} MiB/s")
+        print(f"Speedup: {timings['text'] / timings['mmap']:.2f}x")
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import itertools, os, random
+
+FIRST_NAMES = ("Alex", "Nikita", "Sitarama", "John", "Олена", "Maria", "Taras", "Li", "Ahmed",
+    "Sofia", "Ivan", "Emma")
+LAST_NAMES = ("Korp", "Borisenko", "Raju", "Lee", "Петренко", "Garcia", "Shevchenko", "Wang",
+    "Hassan", "Rossi", "Kovalenko", "Smith")
+DEPARTMENTS = ("Sales", "Engineering", "Support", "Finance", "Marketing", "Legal")
+CAT_NAMES = ("Tayson", "Vika", "Barsik", "Simon", "Tessi", "Murzik", "Luna", "Кузя", "Oscar")
+EMAIL_DOMAINS = ("example.com", "mail.example.org", "corp.example.net")
+# Phone number of the first generated person
+PHONE_BASE = 380_000_000_000
+# Relative frequencies of the assistant commands
+WRITE_MIX = {"add": 3, "change": 1, "delete": 1}
+READ_MIX = {"phone": 4, "owner": 3, "domain": 2, "find": 3, "similar": 2, "all": 1}
+# Number of lines which are joined into a single write
+WRITE_BATCH_SIZE = 4096
+# Entries per directory of the generated tree
+FAN_OUT = 20
+
+def _write_lines(path: str, lines):
+    """Write lines to the UTF-8 file in large batches."""
+    with open(path, mode="w", encoding="utf-8", newline="\n") as fh:
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= WRITE_BATCH_SIZE:
+                fh.write("".join(batch))
+                batch.clear()
+        fh.write("".join(batch))
+
+def repeat_file(path: str, size: int):
+    """Append copies of the file content until the file reaches the size.
+    It's a fast way to get a large file from the generated lines.
+
+    Args:
+        path (str): Path to the file ending with the line break.
+        size (int): Min size in bytes.
+    """
+    with open(path, mode="r+b") as fh:
+        block = fh.read()
+        if not block:
+            return
+        for _ in range(size // len(block)):
+            fh.write(block)
+
+def write_payroll(path: str, rows: int, seed: int = 0, departments: bool = False):
+    """Write payroll records in `name,salary` or `name,salary,department`
+    format.
+
+    Salaries are integers or have two decimal places.
+
+    Args:
+        path (str): Path to the output file.
+        rows (int): Number of records.
+        seed (int): Seed of the random generator. Same seed gives the same
+            file.
+        departments (bool): Add department column.
+    """
+    rng = random.Random(seed)
+    names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    _write_lines(path, (f"{rng.choice(names)},{rng.randint(100, 99999)}"
+        + (f".{rng.randint(0, 99):02}" if rng.random() < 0.5 else "")
+        + (f",{rng.choice(DEPARTMENTS)}\n" if departments else "\n") for _ in range(rows)))
+
+def write_cats(path: str, rows: int, seed: int = 0):
+    """Write cat records in `id,name,age` format with unique 24-digit hex
+    IDs.
+
+    Args:
+        path (str): Path to the output file.
+        rows (int): Number of records.
+        seed (int): Seed of the random generator.
+    """
+    rng = random.Random(seed)
+    # Row number in the low digits makes IDs unique
+    _write_lines(path, (f"{rng.getrandbits(64):016x}{i:08x},{rng.choice(CAT_NAMES)},"
+        f"{rng.randint(1, 20)}\n" for i in range(rows)))
+
+def make_tree(path: str, entries: int, seed: int = 0):
+    """Create directory tree with files, subdirectories and symbolic links.
+
+    Directories are filled breadth-first with up to `FAN_OUT` entries.
+    Files are sparse, so their sizes don't take disk space.
+
+    Args:
+        path (str): Path to the empty directory.
+        entries (int): Number of entries.
+        seed (int): Seed of the random generator.
+    """
+    rng = random.Random(seed)
+    directories = [path]
+    count = 0
+    for directory in directories:
+        if count >= entries:
+            break
+        for i in range(min(FAN_OUT, entries - count)):
+            node = os.path.join(directory, f"node{i}")
+            kind = rng.random()
+            if kind < 0.2:
+                os.mkdir(node)
+                directories.append(node)
+            elif kind < 0.25 and hasattr(os, "symlink"):
+                os.symlink("node0" if rng.random() < 0.5 else "missing", node)
+            else:
+                with open(node, mode="wb") as fh:
+                    fh.truncate(rng.randint(0, 10 ** 6))
+            count += 1
+
+def person(i: int) -> tuple[str, str, str]:
+    """Get name, phone and email of the generated person.
+
+    Args:
+        i (int): Number of the person.
+
+    Returns:
+        tuple[str, str, str]: Name, normalized phone number and email.
+    """
+    return f"person {i}", str(PHONE_BASE + i), f"person{i}@{EMAIL_DOMAINS[i % len(EMAIL_DOMAINS)]}"
+
+def iter_commands(commands: int, persons: int, seed: int = 0, writes: float = 0.25,
+        reads: dict[str, int] = READ_MIX):
+    """Generate commands of the contact assistant on the existing persons.
+
+    Args:
+        commands (int): Number of commands.
+        persons (int): Number of persons, see `person()`.
+        seed (int): Seed of the random generator.
+        writes (float): Share of commands which change the book. They're
+            mixed by `WRITE_MIX`.
+        reads (dict[str, int]): Relative frequencies of the read commands.
+
+    Yields:
+        str: Command line ending with the line break.
+    """
+    rng = random.Random(seed)
+    write_names, write_weights = tuple(WRITE_MIX), tuple(WRITE_MIX.values())
+    read_names, read_weights = tuple(reads), tuple(reads.values())
+    for _ in range(commands):
+        i = rng.randrange(persons)
+        if rng.random() < writes:
+            cmd = rng.choices(write_names, write_weights)[0]
+        else:
+            cmd = rng.choices(read_names, read_weights)[0]
+        name, phone, _ = person(i)
+        match cmd:
+            case "add":
+                yield f"add {name} person{i}@{rng.choice(EMAIL_DOMAINS)}\n"
+            case "change":
+                yield f"change {name} {person(rng.randrange(persons))[1]}\n"
+            case "delete":
+                yield f"delete {name} {phone}\n"
+            case "phone":
+                yield f"phone {name}\n"
+            case "owner":
+                yield f"owner {person(rng.randrange(persons))[1]}\n"
+            case "domain":
+                yield f"domain {rng.choice(EMAIL_DOMAINS)}\n"
+            case "find":
+                yield f"find {name}\n"
+            case "similar":
+                # Typo: swapped characters
+                yield f"similar preson {i}\n"
+            case "all":
+                yield f"all --page={rng.randrange(persons // 20 + 1) + 1}\n"
+
+def write_commands(path: str, commands: int, persons: int | None = None, seed: int = 0):
+    """Write command stream of the contact assistant.
+
+    Persons are added first, so the rest of commands mostly find them. Then
+    reads are mixed with changes and deletions by `iter_commands()`.
+
+    Args:
+        path (str): Path to the output file.
+        commands (int): Number of commands.
+        persons (int or None): Number of persons. A tenth of commands by
+            default.
+        seed (int): Seed of the random generator.
+    """
+    persons = persons or max(1, commands // 10)
+    added = min(persons, commands)
+    _write_lines(path, itertools.chain(
+        (f"add {name} {phone}\n" for name, phone, _ in map(person, range(added))),
+        iter_commands(commands - added, persons, seed)))
+
+def iter_mutations(ops: int, per_person: int = 10):
+    """Generate mutations of the contact book in the storage method terms.
+
+    The first round over persons adds their phones. The next rounds cycle
+    over adding emails, replacing phones and removing emails added two
+    rounds before, so every mutation is valid when they're applied in
+    order.
+
+    Args:
+        ops (int): Number of mutations.
+        per_person (int): Number of mutations per person.
+
+    Yields:
+        tuple[str, str, str, str]: Method (`add`, `replace` or `remove`),
+            person's name, contact kind and value.
+    """
+    persons = max(1, ops // per_person)
+    for op in range(ops):
+        i, r = op % persons, op // persons
+        name, phone, _ = person(i)
+        if not r:
+            yield "add", name, "phone", phone
+        elif r % 3 == 1:
+            yield "add", name, "email", f"person{i}.{r}@example.com"
+        elif r % 3 == 2:
+            yield "replace", name, "phone", str(PHONE_BASE + i + r)
+        else:
+            yield "remove", name, "email", f"person{i}.{r - 2}@example.com"
@@ -0,0 +1,61 @@
+import cProfile, io, pstats, sys, tracemalloc
+from common import stages
+
+# Number of functions and allocation sites in the summaries
+TOP_SIZE = 20
+
+def format_stages(timings: dict[str, float]) -> str:
+    """Format stage timings as lines sorted by time."""
+    total = sum(timings.values()) or 1
+    return "".join(f"    {name:>10}: {seconds:.3f}s ({seconds / total:.0%})\n"
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1]))
+
+def run(main):
+    """Run the entry point of the script. If `--profile` flag is passed, it's
+    removed from the arguments and the entry point is run under cProfile
+    and tracemalloc with stage timing enabled. Summaries are printed to the
+    standard error on exit, so they aren't mixed with the output.
+
+    Note that tracemalloc slows down allocations, so functions which
+    allocate a lot take a larger share of the profile.
+
+    Args:
+        main (callable): Entry point without arguments.
+
+    Returns:
+        Any: Result of the entry point.
+    """
+    if "--profile" not in sys.argv[1:]:
+        return main()
+    sys.argv.remove("--profile")
+
+    profiler = cProfile.Profile()
+    stages.enable()
+    tracemalloc.start()
+    try:
+        return profiler.runcall(main)
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        # Allocations of the profilers aren't reported
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        tracemalloc.stop()
+        stages.disable()
+
+        stats = io.StringIO()
+        pstats.Stats(profiler, stream=stats).sort_stats("cumulative").print_stats(TOP_SIZE)
+        report = [f"PROFILE: Top {TOP_SIZE} functions by cumulative time:\n",
+            stats.getvalue().lstrip("\n")]
+        report.append(f"PROFILE: Peak traced memory is {peak / 2 ** 20:.1f} MiB. "
+            f"Top {TOP_SIZE} allocation sites of the memory left on exit:\n")
+        for stat in snapshot.statistics("lineno")[:TOP_SIZE]:
+            frame = stat.traceback[0]
+            report.append(f"    {stat.size / 2 ** 10:>10.1f} KiB in {stat.count:>8} blocks: "
+                f"{frame.filename}:{frame.lineno}\n")
+        if stages.timings:
+            report.append("PROFILE: Stage timings:\n" + format_stages(stages.timings))
+        sys.stdout.flush()
+        sys.stderr.write("".join(report))
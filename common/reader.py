@@ -0,0 +1,308 @@
+import gzip, io, mmap, os, typing
+
+# Size of the block which is split into lines at once
+BLOCK_SIZE = 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+def _check_lines(lines: list[bytes], max_size: int, validate: bool = True):
+    """Cut long lines and validate UTF-8 encoding of the rest.
+
+    Args:
+        lines (list[bytes]): Raw lines. List is updated in place.
+        max_size (int): Max line length in bytes.
+        validate (bool): Validate UTF-8 encoding.
+
+    Yields:
+        list[bytes]: Lines preceding the one with wrong encoding.
+
+    Raises:
+        UnicodeDecodeError: If line has wrong UTF-8 encoding.
+    """
+    for i, line in enumerate(lines):
+        if len(line) > max_size:
+            lines[i] = line[:max_size + 1]
+        elif validate and not line.isascii():
+            try:
+                line.decode("utf-8", errors="strict")
+            except UnicodeDecodeError:
+                # Let the caller process valid rows before the error
+                yield lines[:i]
+                raise
+
+def _split_blocks(chunks, max_size: int, validate: bool = True):
+    """Split stream of raw data chunks into lists of lines.
+
+    See `iter_blocks()` for details.
+
+    Args:
+        chunks (Iterable[bytes]): Raw data chunks.
+        max_size (int): Max line length in bytes (without line break).
+        validate (bool): Validate UTF-8 encoding.
+
+    Yields:
+        list[bytes]: Lines without trailing `\\n`.
+
+    Raises:
+        UnicodeDecodeError: If line has wrong UTF-8 encoding.
+    """
+    tail = b""
+    for chunk in chunks:
+        data = tail + chunk
+        cut = data.rfind(b"\n") + 1
+        # Keep unfinished line for the next block
+        tail = data[cut:cut + max_size + 1]
+        if not cut:
+            continue
+        lines = data[:cut - 1].split(b"\n")
+        if max(map(len, lines)) > max_size:
+            yield from _check_lines(lines, max_size, validate)
+        elif validate and not data.isascii():
+            # Validate the whole block at once and look for the bad line on failure
+            try:
+                data[:cut].decode("utf-8", errors="strict")
+            except UnicodeDecodeError:
+                yield from _check_lines(lines, max_size)
+        yield lines
+    if tail:
+        lines = [tail]
+        yield from _check_lines(lines, max_size, validate)
+        yield lines
+
+def _iter_mmap_chunks(path: str, start: int, end: int | None):
+    """Iterate over chunks of the memory-mapped file.
+
+    Args:
+        path (str): Path to the source data.
+        start (int): Offset of the first byte.
+        end (int or None): Offset right after the last byte.
+
+    Yields:
+        bytes: Chunk of `BLOCK_SIZE` bytes or less.
+
+    Raises:
+        OSError: If file can't be read.
+    """
+    with open(path, mode="rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        end = size if end is None else min(end, size)
+        # Empty files can't be mapped
+        if start >= end:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for pos in range(start, end, BLOCK_SIZE):
+                yield mm[pos:min(pos + BLOCK_SIZE, end)]
+
+def iter_blocks(path: str, max_size: int, start: int = 0, end: int | None = None,
+        validate: bool = True):
+    """Iterate over raw lines of the memory-mapped file block by block.
+
+    File is split into lines over the raw bytes, so nothing is decoded here.
+    Blocks with non-ASCII data are validated as strict UTF-8. If some line has
+    wrong encoding, then lines before it are yielded first, so the error is
+    raised in the order of rows.
+
+    Lines longer than `max_size` bytes are cut to `max_size + 1` bytes and
+    aren't validated. It keeps memory usage bounded and lets the caller
+    detect and report them.
+
+    Args:
+        path (str): Path to the source data.
+        max_size (int): Max line length in bytes (without line break).
+        start (int): Offset of the first byte. Must point to the line start.
+        end (int or None): Offset right after the last byte. End of file is
+            used if not specified.
+        validate (bool): Validate UTF-8 encoding. Can be disabled if caller
+            decodes all lines on its own.
+
+    Yields:
+        list[bytes]: Lines without trailing `\\n`.
+
+    Raises:
+        OSError: If file can't be read.
+        UnicodeDecodeError: If line has wrong UTF-8 encoding.
+    """
+    return _split_blocks(_iter_mmap_chunks(path, start, end), max_size, validate)
+
+def iter_stream_blocks(fh: typing.BinaryIO, max_size: int):
+    """Iterate over raw lines of the binary stream block by block.
+
+    Same as `iter_blocks()`, but data is read from the stream. Chunks are
+    processed as soon as they are available, so slow pipes are handled
+    without waiting for the whole block to be filled.
+
+    Args:
+        fh (BinaryIO): Binary stream.
+        max_size (int): Max line length in bytes (without line break).
+
+    Yields:
+        list[bytes]: Lines without trailing `\\n`.
+
+    Raises:
+        OSError: If stream can't be read.
+        UnicodeDecodeError: If line has wrong UTF-8 encoding.
+    """
+    read = getattr(fh, "read1", fh.read)
+    return _split_blocks(iter(lambda: read(BLOCK_SIZE), b""), max_size)
+
+def _open_zstd(fh: typing.BinaryIO) -> typing.BinaryIO:
+    """Wrap binary stream with Zstandard decompressor.
+
+    Uses standard library module if available (Python 3.14+) and falls back
+    to the optional `zstandard` package.
+
+    Args:
+        fh (BinaryIO): Binary stream with compressed data.
+
+    Returns:
+        BinaryIO: Stream of decompressed data.
+
+    Raises:
+        ValueError: If no Zstandard implementation is available.
+    """
+    try:
+        from compression import zstd
+        return zstd.ZstdFile(fh)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("Reading Zstandard-compressed data requires Python 3.14+ or \
+`zstandard` package.") from None
+    return zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True)
+
+def open_stream(fh: typing.BinaryIO) -> typing.BinaryIO:
+    """Wrap binary stream with decompressor if its data is compressed.
+
+    Compression format is detected by the magic bytes. Gzip and Zstandard
+    formats are supported.
+
+    Args:
+        fh (BinaryIO): Binary stream.
+
+    Returns:
+        BinaryIO: Stream of uncompressed data.
+
+    Raises:
+        OSError: If stream can't be read.
+        ValueError: If no Zstandard implementation is available.
+    """
+    # Peek requires buffered stream
+    if not hasattr(fh, "peek"):
+        fh = io.BufferedReader(fh)
+    magic = fh.peek(len(ZSTD_MAGIC))
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=fh, mode="rb")
+    if magic.startswith(ZSTD_MAGIC):
+        return _open_zstd(fh)
+    return fh
+
+def is_compressed(path: str) -> bool:
+    """Check if file contains data compressed with supported format.
+
+    Args:
+        path (str): Path to the source data.
+
+    Returns:
+        bool: True if file is compressed.
+
+    Raises:
+        OSError: If file can't be read.
+    """
+    with open(path, mode="rb") as fh:
+        magic = fh.read(len(ZSTD_MAGIC))
+    return magic.startswith(GZIP_MAGIC) or magic.startswith(ZSTD_MAGIC)
+
+def read_blocks(source: str | typing.BinaryIO, max_size: int):
+    """Iterate over raw lines of the file or binary stream block by block.
+
+    Plain files are memory-mapped. Compressed files and streams are
+    decompressed on the fly.
+
+    Args:
+        source (str or BinaryIO): Path to the source data or binary stream.
+        max_size (int): Max line length in bytes (without line break).
+
+    Yields:
+        list[bytes]: Lines without trailing `\\n`.
+
+    Raises:
+        OSError: If source can't be read.
+        UnicodeDecodeError: If line has wrong UTF-8 encoding.
+        ValueError: If no Zstandard implementation is available.
+    """
+    if not isinstance(source, str):
+        yield from iter_stream_blocks(open_stream(source), max_size)
+    elif is_compressed(source):
+        with open(source, mode="rb") as fh:
+            yield from iter_stream_blocks(open_stream(fh), max_size)
+    else:
+        yield from iter_blocks(source, max_size)
+
+def iter_lines(path: str, max_size: int, start: int = 0, end: int | None = None):
+    """Iterate over raw lines of the memory-mapped file.
+
+    Same as `iter_blocks()`, but yields lines one by one.
+
+    Yields:
+        bytes: Line without trailing `\\n`.
+    """
+    for lines in iter_blocks(path, max_size, start, end):
+        yield from lines
+
+def split_ranges(path: str, parts: int, max_chunk_size: int, start: int = 0,
+        end: int | None = None) -> list[tuple[int, int]]:
+    """Split file into byte ranges aligned to the line boundaries.
+
+    Args:
+        path (str): Path to the source data.
+        parts (int): Desired minimal number of ranges.
+        max_chunk_size (int): Desired max size of the range in bytes. Range
+            can be larger since it always ends with a complete line.
+        start (int): Offset of the first byte. Must point to the line start.
+        end (int or None): Offset right after the last byte. End of file is
+            used if not specified.
+
+    Returns:
+        list[tuple[int, int]]: List of (start, end) byte offsets.
+
+    Raises:
+        OSError: If file can't be read.
+    """
+    with open(path, mode="rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        end = size if end is None else min(end, size)
+        chunk_size = max(min(max_chunk_size, -(-(end - start) // parts)), 1)
+        bounds = [start]
+        if start < end:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                while bounds[-1] + chunk_size < end:
+                    # Move boundary forward to the beginning of the next line
+                    eol = mm.find(b"\n", bounds[-1] + chunk_size - 1, end)
+                    if eol == -1 or eol + 1 >= end:
+                        break
+                    bounds.append(eol + 1)
+    bounds.append(max(start, end))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def find_lines_end(path: str, start: int = 0) -> tuple[int, int]:
+    """Find the end of the last complete line of the file.
+
+    Args:
+        path (str): Path to the source data.
+        start (int): Offset to search from.
+
+    Returns:
+        tuple[int, int]: Offset right after the last `\\n` (or `start` if
+            there is no complete line after it) and the file size.
+
+    Raises:
+        OSError: If file can't be read.
+    """
+    with open(path, mode="rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if start >= size:
+            return start, size
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.rfind(b"\n", start) + 1 or start, size
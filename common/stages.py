@@ -0,0 +1,99 @@
+import contextlib, time
+
+# Total seconds by stage name
+timings = {}
+_enabled = False
+# Stage which is timed now and the time it was entered
+_current = None
+_since = 0.0
+
+def enable():
+    """Start timing stages. Timings of the previous run are dropped."""
+    global _enabled, _current
+    timings.clear()
+    _enabled = True
+    _current = None
+
+def disable():
+    """Stop timing stages. Collected timings are kept."""
+    global _enabled
+    _switch(None)
+    _enabled = False
+
+def is_enabled() -> bool:
+    return _enabled
+
+def _switch(name: str | None) -> str | None:
+    """Charge time since the last switch to the current stage and make the
+    specified stage current.
+
+    Returns:
+        str or None: Previous stage.
+    """
+    global _current, _since
+    now = time.perf_counter()
+    previous = _current
+    if previous is not None:
+        timings[previous] = timings.get(previous, 0.0) + now - _since
+    _current = name
+    _since = now
+    return previous
+
+@contextlib.contextmanager
+def _stage(name: str):
+    previous = _switch(name)
+    try:
+        yield
+    finally:
+        _switch(previous)
+
+def stage(name: str):
+    """Time the block as the stage. Time of the nested stages is charged to
+    them, so every moment belongs to a single stage. It does nothing unless
+    timing is enabled.
+
+    Args:
+        name (str): Stage name, e.g. `read`, `parse`, `validate`,
+            `aggregate` or `render`.
+
+    Returns:
+        ContextManager: Context manager of the block.
+    """
+    if not _enabled:
+        return contextlib.nullcontext()
+    return _stage(name)
+
+def _iter_stage(name: str, iterable, rest: str | None):
+    consumer = rest or _current
+    outer = _current
+    iterator = iter(iterable)
+    try:
+        while True:
+            _switch(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            _switch(consumer)
+            yield item
+    finally:
+        _switch(outer)
+
+def iter_stage(name: str, iterable, rest: str | None = None):
+    """Time producing items of the iterable as the stage.
+
+    Hot loops are timed this way, since it costs nothing unless timing is
+    enabled: the iterable itself is returned.
+
+    Args:
+        name (str): Stage of the producer.
+        iterable (Iterable): Items.
+        rest (str or None): Stage of the consumer, i.e. time between the
+            items. It's the stage around the loop by default.
+
+    Returns:
+        Iterable: Same items.
+    """
+    if not _enabled:
+        return iterable
+    return _iter_stage(name, iterable, rest)